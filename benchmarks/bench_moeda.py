@@ -0,0 +1,54 @@
+"""
+Micro-benchmark do formatador de moeda.
+
+Compara a implementação antiga (locale.setlocale + locale.currency a cada
+chamada, com fallback manual) com o formatador compartilhado de cogs/_moeda.py.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_moeda
+"""
+
+import locale
+import random
+import timeit
+
+from cogs._moeda import format_brl, format_centavos
+
+
+def format_brl_legado(valor):
+    """Cópia da implementação que existia em cada cog antes do cogs/_moeda.py."""
+    try:
+        locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+        return locale.currency(float(valor), grouping=True, symbol="R$")
+    except (ValueError, TypeError, ImportError, locale.Error):
+        try:
+            a = f'{float(valor):,.2f}'
+            b = a.replace(',', 'v').replace('.', ',').replace('v', '.')
+            return f"R$ {b}"
+        except (ValueError, TypeError):
+            return "R$ 0,00"
+
+
+def main():
+    rng = random.Random(42)
+    valores = [round(rng.uniform(0, 1_000_000), 2) for _ in range(1000)]
+    centavos = [round(v * 100) for v in valores]
+
+    try:
+        locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+        print("Locale pt_BR.UTF-8 disponível: o legado usa locale.currency.")
+    except locale.Error:
+        print("Locale pt_BR.UTF-8 indisponível: o legado cai no fallback manual.")
+
+    casos = {
+        "legado (setlocale por chamada)": lambda: [format_brl_legado(v) for v in valores],
+        "format_brl (reais)": lambda: [format_brl(v) for v in valores],
+        "format_centavos (inteiros)": lambda: [format_centavos(c) for c in centavos],
+    }
+    for nome, funcao in casos.items():
+        melhor = min(timeit.repeat(funcao, number=20, repeat=5)) / (20 * len(valores))
+        print(f"{nome:<32} {melhor * 1e6:8.3f} µs/chamada")
+
+
+if __name__ == "__main__":
+    main()
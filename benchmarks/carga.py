@@ -0,0 +1,136 @@
+"""
+Teste de carga offline: N usuários simultâneos executando uma mistura
+realista de comandos (!trabalhar, !pagar, !comprar, !bj) contra os cogs reais
+rodando no BotFalso, sobre fixtures sintéticas.
+
+Reporta latência p50/p99 por operação, vazão total, bytes escritos em disco
+e o tempo gasto em cada fase (fila do lock, armazenamento, API do Discord).
+Com '--guilds N' os usuários simultâneos são distribuídos entre N guilds, cada
+uma com a sua partição de dados (a guild 1 adota a base sintética).
+
+Uso:
+    python -m benchmarks.carga --base 10000 --usuarios 1000 --operacoes 3 --guilds 4
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.fixtures import ACOES, ID_BASE, escrever_fixtures
+from benchmarks.harness import BotFalso, CanalFalso, GuildFalsa, InteracaoFalsa
+from cogs._metricas import metricas
+
+# Peso de cada operação na mistura de carga
+MISTURA = {"trabalhar": 4, "pagar": 3, "comprar": 2, "bj": 1}
+
+
+def bytes_escritos() -> Optional[int]:
+    """Total de bytes escritos pelo processo (Linux: /proc/self/io)."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("wchar:"):
+                    return int(linha.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+async def operacao(bot: BotFalso, nome: str, user_id: int, rng: random.Random, total_base: int, guild: GuildFalsa) -> float:
+    autor = bot.membro(user_id)
+    if nome == "trabalhar":
+        return await bot.executar("trabalhar", autor, guild=guild)
+    if nome == "pagar":
+        receptor = bot.membro(ID_BASE + rng.randrange(total_base))
+        if receptor == autor:
+            receptor = bot.membro(ID_BASE + (user_id - ID_BASE + 1) % total_base)
+        return await bot.executar("pagar", autor, receptor, "10", guild=guild)
+    if nome == "comprar":
+        return await bot.executar("comprar", autor, rng.choice(list(ACOES)), rng.randint(1, 3), guild=guild)
+
+    # Blackjack: inicia a partida e clica em "Parar" se ela não terminou sozinha
+    canal = CanalFalso()
+    inicio = time.perf_counter()
+    await bot.executar("blackjack", autor, "5", canal=canal, guild=guild)
+    jogo = bot.get_cog("Cassino").game_manager.get_game(user_id)
+    if jogo is not None and canal.mensagens:
+        mensagem = canal.mensagens[-1]
+        view = mensagem.envios[0].view
+        await view.stand_button.callback(InteracaoFalsa(autor, mensagem))
+    return time.perf_counter() - inicio
+
+
+async def usuario_simulado(bot, user_id, operacoes, seed, total_base, guild, latencias: Dict[str, List[float]]):
+    rng = random.Random(seed)
+    nomes, pesos = zip(*MISTURA.items())
+    for _ in range(operacoes):
+        nome = rng.choices(nomes, pesos)[0]
+        latencias[nome].append(await operacao(bot, nome, user_id, rng, total_base, guild))
+
+
+async def executar_carga(diretorio: Path, base: int, usuarios: int, operacoes: int, seed: int, guilds: int = 1) -> None:
+    escrever_fixtures(diretorio, base, seed)
+    latencias: Dict[str, List[float]] = defaultdict(list)
+    lista_guilds = [GuildFalsa(i + 1) for i in range(guilds)]
+
+    async with BotFalso(diretorio) as bot:
+        await bot.carregar_cogs()
+        bytes_antes = bytes_escritos()
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            usuario_simulado(bot, ID_BASE + (i % base), operacoes, seed + i, base, lista_guilds[i % guilds], latencias)
+            for i in range(usuarios)
+        ))
+        duracao = time.perf_counter() - inicio
+    # As partições são gravadas em segundo plano e no fechamento do bot: mede depois dele.
+    bytes_depois = bytes_escritos()
+
+    total = sum(len(v) for v in latencias.values())
+    print(f"Base: {base} usuários | Simultâneos: {usuarios} | Guilds: {guilds} | Operações: {total} em {duracao:.2f}s")
+    print(f"Vazão: {total / duracao:.1f} ops/s")
+    print(f"{'operação':<10} {'qtd':>6} {'p50':>10} {'p99':>10}")
+    for nome, valores in sorted(latencias.items()):
+        print(f"{nome:<10} {len(valores):>6} {percentil(valores, 50) * 1000:>8.1f}ms {percentil(valores, 99) * 1000:>8.1f}ms")
+    if bytes_antes is not None and bytes_depois is not None:
+        escritos = bytes_depois - bytes_antes
+        print(f"Bytes escritos: {escritos / 2**20:.1f} MiB ({escritos / max(total, 1) / 1024:.1f} KiB/op)")
+    else:
+        print("Bytes escritos: indisponível nesta plataforma")
+
+    print("Tempo por fase (soma de todas as operações):")
+    for fase in ("fila_lock", "armazenamento", "api_discord"):
+        soma = sum(h.soma for (_, f), h in metricas.latencias.items() if f == fase)
+        print(f"  {fase:<14} {soma:8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", type=int, default=1000, help="Usuários no economia.json sintético (1k a 1M).")
+    parser.add_argument("--usuarios", type=int, default=1000, help="Usuários simultâneos executando comandos.")
+    parser.add_argument("--operacoes", type=int, default=3, help="Comandos por usuário simultâneo.")
+    parser.add_argument("--guilds", type=int, default=1, help="Guilds entre as quais os usuários simultâneos são distribuídos.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--diretorio", type=Path, default=None, help="Onde gerar as fixtures (padrão: temporário).")
+    args = parser.parse_args()
+
+    if args.diretorio:
+        asyncio.run(executar_carga(args.diretorio, args.base, args.usuarios, args.operacoes, args.seed, args.guilds))
+    else:
+        with tempfile.TemporaryDirectory(prefix="domost_bench_") as tmp:
+            asyncio.run(executar_carga(Path(tmp), args.base, args.usuarios, args.operacoes, args.seed, args.guilds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Geração de arquivos de dados sintéticos (economia, mercado e histórico)
+no formato atual (centavos inteiros), para benchmarks de 1k a 1M usuários.
+
+Uso:
+    python -m benchmarks.fixtures --usuarios 100000 --saida /tmp/domost_bench
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+ID_BASE = 10**17
+ACOES = {
+    "DMS": "Domost Dynamics", "VLI": "Vale a Pena S.A.", "PTR": "Petrobrásica",
+    "ITU": "Banco Itudo", "MGL": "Magazine Luiza & Cia", "APPL": "Maçã Inc.",
+    "AMZN": "Amazonas Ltda.", "GOGL": "Gugou Buscas",
+}
+
+
+def gerar_usuario(rng: random.Random) -> Dict[str, Any]:
+    acoes = {}
+    for simbolo in rng.sample(list(ACOES), rng.choice((0, 0, 0, 1, 2))):
+        acoes[simbolo] = {"quantidade": rng.randint(1, 50), "preco_medio_compra": rng.randint(1_00, 1500_00)}
+    jogos = rng.choice((0, 0, rng.randint(1, 200)))
+    return {
+        "carteira": rng.randint(0, 50_000_00),
+        "banco": rng.randint(0, 200_000_00),
+        "acoes": acoes,
+        "cc_stats": {
+            "jogos": jogos,
+            "vitorias": rng.randint(0, jogos),
+            "total_apostado": rng.randint(0, 100_000_00) if jogos else 0,
+            "lucro_total": rng.randint(-50_000_00, 50_000_00) if jogos else 0,
+        },
+    }
+
+
+def iterar_usuarios(quantidade: int, seed: int = 42) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    rng = random.Random(seed)
+    for i in range(quantidade):
+        yield str(ID_BASE + i), gerar_usuario(rng)
+
+
+def gerar_economia(quantidade: int, seed: int = 42) -> Dict[str, Any]:
+    dados: Dict[str, Any] = dict(iterar_usuarios(quantidade, seed))
+    dados["cofre_impostos"] = 0
+    dados["impostos_diarios"] = {"jogos": 0, "mercado": 0}
+    dados["_meta"] = {"moeda": "centavos"}
+    return dados
+
+
+def gerar_mercado(seed: int = 42) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    rng = random.Random(seed)
+    mercado, historico = {}, {}
+    for simbolo, nome in ACOES.items():
+        precos = [rng.randint(2_00, 1500_00)]
+        for _ in range(9):
+            precos.append(max(1_00, round(precos[-1] * rng.uniform(0.95, 1.05))))
+        mercado[simbolo] = {"nome": nome, "preco": precos[-1], "preco_anterior": precos[-2], "tendencia": "estavel"}
+        historico[simbolo] = precos
+    return mercado, historico
+
+
+def escrever_fixtures(diretorio: Path, usuarios: int, seed: int = 42) -> None:
+    """Escreve economia.json, mercado.json e historico_mercado.json em 'diretorio'."""
+    diretorio.mkdir(parents=True, exist_ok=True)
+    mercado, historico = gerar_mercado(seed)
+    with open(diretorio / "economia.json", "w", encoding="utf-8") as f:
+        json.dump(gerar_economia(usuarios, seed), f, indent=4)
+    with open(diretorio / "mercado.json", "w", encoding="utf-8") as f:
+        json.dump(mercado, f, indent=4)
+    with open(diretorio / "historico_mercado.json", "w", encoding="utf-8") as f:
+        json.dump(historico, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--saida", type=Path, required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    escrever_fixtures(args.saida, args.usuarios, args.seed)
+    print(f"Fixtures com {args.usuarios} usuários escritas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
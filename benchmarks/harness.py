@@ -0,0 +1,201 @@
+"""
+Ambiente falso do Discord para executar os cogs sem conexão com o gateway.
+
+O 'BotFalso' é um commands.Bot de verdade (os cogs são carregados pelo
+mecanismo normal de extensões), mas nunca faz login: canais, membros e
+mensagens são objetos locais que apenas registram o que foi enviado.
+Os comandos são chamados diretamente (Command.__call__), sem conversores,
+checks nem cooldowns, e as métricas de cogs/_metricas.py são coletadas como
+em produção.
+"""
+
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+
+from cogs._metricas import metricas
+
+EXTENSOES = ("cogs.anuncios", "cogs.economia", "cogs.mercado", "cogs.cassino", "cogs.admin", "cogs.geral")
+_ids_mensagem = itertools.count(10**17)
+
+
+@dataclass(eq=False)
+class MembroFalso:
+    id: int
+    name: str = ""
+    bot: bool = False
+    avatar: Any = None
+    color: discord.Color = field(default_factory=discord.Color.default)
+    guild_permissions: discord.Permissions = field(default_factory=discord.Permissions.all)
+
+    @property
+    def display_name(self) -> str:
+        return self.name or f"usuario{self.id}"
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __eq__(self, outro) -> bool:
+        return isinstance(outro, MembroFalso) and outro.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+@dataclass
+class Envio:
+    """Uma mensagem 'enviada' ou editada pelo bot."""
+    content: Optional[str]
+    embed: Optional[discord.Embed]
+    view: Any
+
+
+class MensagemFalsa:
+    def __init__(self, canal: "CanalFalso", envio: Envio):
+        self.id = next(_ids_mensagem)
+        self.channel = canal
+        self.envios = [envio]
+
+    async def edit(self, *, content=None, embed=None, view=None, **_):
+        self.envios.append(Envio(content, embed, view))
+        self.channel.edicoes += 1
+        return self
+
+    async def delete(self, *, delay: Optional[float] = None):
+        return None
+
+
+class CanalFalso:
+    def __init__(self, canal_id: int = 1):
+        self.id = canal_id
+        self.mensagens: List[MensagemFalsa] = []
+        self.edicoes = 0
+
+    async def send(self, content=None, *, embed=None, view=None, **_):
+        mensagem = MensagemFalsa(self, Envio(content, embed, view))
+        self.mensagens.append(mensagem)
+        return mensagem
+
+    async def purge(self, *, limit: int = 100, **_):
+        apagadas, self.mensagens = self.mensagens[-limit:], self.mensagens[:-limit]
+        return apagadas
+
+
+class GuildFalsa:
+    def __init__(self, guild_id: int = 1):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+
+
+class ContextoFalso:
+    """O mínimo de commands.Context usado pelos cogs."""
+
+    def __init__(self, bot: "BotFalso", autor: MembroFalso, canal: CanalFalso, comando: Optional[commands.Command] = None, guild: Optional[GuildFalsa] = None):
+        self.bot = bot
+        self.author = autor
+        self.channel = canal
+        self.guild = guild or bot.guild
+        self.command = comando
+        self.command_failed = False
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class _RespostaFalsa:
+    def __init__(self, interacao: "InteracaoFalsa"):
+        self._interacao = interacao
+        self._respondida = False
+
+    def is_done(self) -> bool:
+        return self._respondida
+
+    async def edit_message(self, *, content=None, embed=None, view=None, **_):
+        self._respondida = True
+        await self._interacao.message.edit(content=content, embed=embed, view=view)
+
+    async def send_message(self, content=None, **_):
+        self._respondida = True
+
+    async def defer(self, **_):
+        self._respondida = True
+
+
+class InteracaoFalsa:
+    """Clique em um botão de uma View enviada pelo bot."""
+
+    def __init__(self, usuario: MembroFalso, mensagem: MensagemFalsa):
+        self.user = usuario
+        self.message = mensagem
+        self.response = _RespostaFalsa(self)
+
+    async def edit_original_response(self, *, content=None, embed=None, view=None, **_):
+        return await self.message.edit(content=content, embed=embed, view=view)
+
+
+def preparar_particao(diretorio_dados: Path, guild_id: int) -> None:
+    """Move as fixtures de 'diretorio_dados' para a partição da guild (dados/<guild_id>/)."""
+    particao = diretorio_dados / "dados" / str(guild_id)
+    particao.mkdir(parents=True, exist_ok=True)
+    for nome in ("economia.json", "mercado.json", "historico_mercado.json"):
+        if (diretorio_dados / nome).exists():
+            os.replace(diretorio_dados / nome, particao / nome)
+
+
+class BotFalso(commands.Bot):
+    """Bot que carrega os cogs reais sem conectar ao Discord."""
+
+    def __init__(self, diretorio_dados: Path):
+        super().__init__(command_prefix='!', intents=discord.Intents.default(), help_command=None)
+        self.guild = GuildFalsa()
+        self.canal_anuncios = CanalFalso(0)
+        self.membros: Dict[int, MembroFalso] = {}
+        self.diretorio_dados = diretorio_dados
+        # Os cogs leem o diretório das partições do ambiente ao serem carregados
+        # (load_extension executa o módulo de novo, então não adianta alterar
+        # atributos de um módulo já importado). As fixtures viram a partição da
+        # guild padrão; as demais guilds começam vazias, com o mercado modelo.
+        preparar_particao(diretorio_dados, self.guild.id)
+        os.environ["DIRETORIO_DADOS"] = str(diretorio_dados / "dados")
+        # Impede que outra guild do benchmark adote o economia.json real da raiz
+        os.environ["GUILD_LEGADO_ID"] = str(self.guild.id)
+
+    async def carregar_cogs(self) -> None:
+        for extensao in EXTENSOES:
+            await self.load_extension(extensao)
+
+    def membro(self, user_id: int) -> MembroFalso:
+        if user_id not in self.membros:
+            self.membros[user_id] = MembroFalso(user_id)
+        return self.membros[user_id]
+
+    def get_guild(self, guild_id: int):
+        return self.guild if guild_id == self.guild.id else GuildFalsa(guild_id)
+
+    def get_channel(self, canal_id: int):
+        return self.canal_anuncios
+
+    async def fetch_user(self, user_id: int):
+        return self.membro(user_id)
+
+    async def executar(self, nome_comando: str, autor: MembroFalso, *args, canal: Optional[CanalFalso] = None, guild: Optional[GuildFalsa] = None) -> float:
+        """Executa um comando como se tivesse sido digitado. Retorna a latência em segundos."""
+        comando = self.get_command(nome_comando)
+        ctx = ContextoFalso(self, autor, canal or CanalFalso(), comando, guild)
+        inicio = time.perf_counter()
+        metricas.iniciar_comando(comando.qualified_name)
+        try:
+            await comando(ctx, *args)
+        except Exception:
+            metricas.registrar_erro(comando.qualified_name)
+            raise
+        finally:
+            metricas.finalizar_comando()
+        return time.perf_counter() - inicio
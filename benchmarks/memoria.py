@@ -0,0 +1,95 @@
+"""
+Benchmark de memória das contas de usuário em memória (cogs/_contas.py).
+
+Para cada quantidade de usuários, carrega a economia sintética em um processo
+novo em cada representação e mede a memória residente (VmRSS, Linux) que ela
+ocupa depois da coleta de lixo:
+
+- dicts: o formato do arquivo, dicionários aninhados (como era antes);
+- compacta: 'Conta'/'Posicao' com __slots__, como o armazenamento da
+  economia guarda hoje (o 'converter' do DataManager).
+
+Também mede uma varredura que soma carteira + banco de todos os usuários
+(o acesso pela interface de dicionário, como fazem o ciclo diário e o
+!topricos) e confere que as duas representações gravam o mesmo conteúdo.
+
+Uso:
+    python -m benchmarks.memoria --usuarios 100000 1000000
+"""
+
+import argparse
+import gc
+import multiprocessing
+import time
+from typing import Dict, Optional
+
+from benchmarks.fixtures import gerar_economia, iterar_usuarios
+from cogs._contas import compactar
+from cogs._serializacao import para_json
+
+REPRESENTACOES = ("dicts", "compacta")
+
+
+def memoria_residente(campo: str = "VmRSS") -> Optional[int]:
+    """Memória do processo em bytes (Linux: /proc/self/status)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def medir(representacao: str, usuarios: int, seed: int) -> Dict[str, float]:
+    """Executado em um processo novo, para que uma medição não herde a memória da outra."""
+    gc.collect()
+    antes = memoria_residente()
+    if representacao == "compacta":
+        # Usuário a usuário, sem manter a economia inteira em dicts ao mesmo tempo
+        dados = {chave: compactar(chave, registro) for chave, registro in iterar_usuarios(usuarios, seed)}
+    else:
+        dados = dict(iterar_usuarios(usuarios, seed))
+    gc.collect()
+    depois = memoria_residente()
+
+    inicio = time.perf_counter()
+    total = sum(registro.get("carteira", 0) + registro.get("banco", 0) for registro in dados.values())
+    varredura = time.perf_counter() - inicio
+    return {"bytes": depois - antes, "pico": memoria_residente("VmHWM") - antes, "varredura": varredura, "total": total}
+
+
+def conferir(usuarios: int, seed: int) -> None:
+    economia = gerar_economia(usuarios, seed)
+    compacta = {chave: compactar(chave, registro) for chave, registro in economia.items()}
+    if para_json(compacta) != para_json(economia):
+        raise SystemExit("A representação compacta não grava o mesmo conteúdo que os dicts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if memoria_residente() is None:
+        raise SystemExit("Este benchmark precisa de /proc/self/status (Linux).")
+    conferir(min(args.usuarios + [10_000]), args.seed)
+
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'usuários':>10} {'representação':<14} {'RSS':>10} {'por usuário':>12} {'pico':>10} {'varredura':>10}")
+    for usuarios in args.usuarios:
+        resultados = {}
+        for representacao in REPRESENTACOES:
+            with contexto.Pool(1) as pool:
+                resultados[representacao] = r = pool.apply(medir, (representacao, usuarios, args.seed))
+            print(f"{usuarios:>10} {representacao:<14} {r['bytes'] / 2**20:7.1f}MiB {r['bytes'] / usuarios:10.0f} B"
+                  f" {r['pico'] / 2**20:7.1f}MiB {r['varredura'] * 1000:8.1f}ms")
+        if resultados["dicts"]["total"] != resultados["compacta"]["total"]:
+            raise SystemExit("As varreduras das duas representações não conferem")
+        print(f"{'':>10} {'redução':<14} {1 - resultados['compacta']['bytes'] / resultados['dicts']['bytes']:9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Teste de consistência do modo multiprocesso (ARMAZENAMENTO=sqlite).
+
+Vários processos, cada um com o seu BotFalso e os cogs reais, executam
+'!pagar' entre os mesmos usuários de uma guild ao mesmo tempo. Como uma
+transferência não cria nem destrói dinheiro, a soma de todos os saldos no
+banco ao final deve ser igual à soma inicial; qualquer atualização perdida
+entre processos aparece como diferença.
+
+Uma parte das operações é '!depositar tudo' (a carteira inteira), para que
+pagamentos e depósitos simultâneos disputem o mesmo saldo: nenhuma carteira
+pode terminar negativa.
+
+Uso:
+    python -m benchmarks.multiprocesso --processos 4 --usuarios 50 --operacoes 20
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from benchmarks.fixtures import ID_BASE, escrever_fixtures
+from benchmarks.harness import BotFalso, preparar_particao
+
+
+def soma_saldos_json(arquivo: Path) -> int:
+    with open(arquivo, encoding="utf-8") as f:
+        dados = json.load(f)
+    return sum(r["carteira"] + r["banco"] for chave, r in dados.items() if chave.isdigit())
+
+
+def saldos_sqlite(banco: Path, guild_id: int) -> Tuple[int, List[str]]:
+    """Soma de carteira + banco e os usuários com algum saldo negativo."""
+    conexao = sqlite3.connect(banco)
+    try:
+        linhas = conexao.execute("SELECT chave, valor FROM registros WHERE guild_id = ? AND valor IS NOT NULL", (guild_id,)).fetchall()
+    finally:
+        conexao.close()
+    total, negativos = 0, []
+    for chave, valor in linhas:
+        if chave.isdigit():
+            registro = json.loads(valor)
+            total += registro["carteira"] + registro["banco"]
+            if registro["carteira"] < 0 or registro["banco"] < 0:
+                negativos.append(chave)
+    return total, negativos
+
+
+async def _trabalhador(diretorio: Path, indice: int, base: int, usuarios: int, operacoes: int, fracao_tudo: float, seed: int) -> int:
+    async def usuario(bot, rng):
+        for _ in range(operacoes):
+            autor, receptor = rng.sample(range(base), 2)
+            if rng.random() < fracao_tudo:
+                await bot.executar("depositar", bot.membro(ID_BASE + autor), "tudo")
+            else:
+                await bot.executar("pagar", bot.membro(ID_BASE + autor), bot.membro(ID_BASE + receptor), "1")
+
+    async with BotFalso(diretorio) as bot:
+        await bot.carregar_cogs()
+        await asyncio.gather(*(usuario(bot, random.Random(seed * 1000 + indice * usuarios + i)) for i in range(usuarios)))
+    return usuarios * operacoes
+
+
+def trabalhador(*args) -> int:
+    return asyncio.run(_trabalhador(*args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--base", type=int, default=200, help="Usuários na economia sintética.")
+    parser.add_argument("--usuarios", type=int, default=50, help="Usuários simultâneos por processo.")
+    parser.add_argument("--operacoes", type=int, default=20, help="Operações por usuário simultâneo.")
+    parser.add_argument("--tudo", type=float, default=0.1, help="Fração das operações que depositam a carteira inteira.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["ARMAZENAMENTO"] = "sqlite"
+    with tempfile.TemporaryDirectory(prefix="domost_mp_") as tmp:
+        diretorio = Path(tmp)
+        escrever_fixtures(diretorio, args.base, args.seed)
+        soma_inicial = soma_saldos_json(diretorio / "economia.json")
+        # Antes de iniciar os processos, para que nenhum deles mova os arquivos durante a carga dos outros
+        preparar_particao(diretorio, 1)
+
+        inicio = time.perf_counter()
+        contexto = multiprocessing.get_context("spawn")
+        with contexto.Pool(args.processos) as pool:
+            total = sum(pool.starmap(trabalhador, [
+                (diretorio, i, args.base, args.usuarios, args.operacoes, args.tudo, args.seed) for i in range(args.processos)
+            ]))
+        duracao = time.perf_counter() - inicio
+
+        soma_final, negativos = saldos_sqlite(diretorio / "dados" / "economia.sqlite3", 1)
+        print(f"Processos: {args.processos} | Operações: {total} em {duracao:.2f}s ({total / duracao:.0f}/s)")
+        print(f"Soma dos saldos: inicial {soma_inicial} | final {soma_final}")
+        if soma_final != soma_inicial:
+            raise SystemExit(f"INCONSISTENTE: diferença de {soma_final - soma_inicial} centavos")
+        if negativos:
+            raise SystemExit(f"INCONSISTENTE: {len(negativos)} usuários com saldo negativo (ex: {negativos[0]})")
+        print("Consistente: nenhuma atualização perdida entre processos e nenhum saldo negativo.")
+
+
+if __name__ == "__main__":
+    main()
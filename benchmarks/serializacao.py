@@ -0,0 +1,91 @@
+"""
+Benchmark dos formatos de snapshot (cogs/_serializacao.py).
+
+Grava e lê a economia sintética de N usuários em cada formato disponível e
+compara o tempo de gravação (codificar + escrever o arquivo), o tempo de
+leitura (ler + decodificar) e o tamanho do arquivo. O JSON indentado é o
+formato antigo; orjson e msgpack só aparecem se estiverem instalados.
+
+O formato indexado é lido sob demanda: a sua linha mede só a abertura do
+arquivo, e a linha '(tudo)' a abertura seguida da leitura de todos os
+registros, comparável às demais.
+
+Uso:
+    python -m benchmarks.serializacao --usuarios 100000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import gerar_economia
+from cogs import _serializacao
+from cogs._serializacao import MAGICO_MSGPACK, carregar, serializar
+from cogs._snapshot_indexado import SnapshotIndexado
+
+
+def _formatos():
+    formatos = {
+        "json indentado (antigo)": lambda d: json.dumps(d, indent=4).encode("utf-8"),
+        "json compacto (stdlib)": lambda d: json.dumps(d, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    }
+    if _serializacao.orjson is not None:
+        formatos["json compacto (orjson)"] = lambda d: _serializacao.orjson.dumps(d)
+    if _serializacao.msgpack is not None:
+        formatos["msgpack"] = lambda d: serializar(d, "msgpack")
+    formatos["indexado"] = lambda d: serializar(d, "indexado")
+    return formatos
+
+
+def _ler_tudo(conteudo: bytes):
+    dados = carregar(conteudo)
+    if isinstance(dados, SnapshotIndexado):
+        dados.materializar_tudo()
+    return dados
+
+
+def _melhor(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    dados = gerar_economia(args.usuarios, args.seed)
+    print(f"Economia com {args.usuarios} usuários; melhor de {args.repeticoes} repetições.")
+    print(f"orjson: {'sim' if _serializacao.orjson else 'não'} | msgpack: {'sim' if _serializacao.msgpack else 'não'}\n")
+    print(f"{'formato':<26} {'gravar':>9} {'ler':>9} {'tamanho':>11}")
+
+    with tempfile.TemporaryDirectory(prefix="domost_serial_") as tmp:
+        arquivo = Path(tmp) / "economia.json"
+        base = None
+        for nome, codificar in _formatos().items():
+            gravar = _melhor(lambda: arquivo.write_bytes(codificar(dados)), args.repeticoes)
+            # A leitura passa sempre por 'carregar', que detecta o formato como o bot faz
+            ler = _melhor(lambda: carregar(arquivo.read_bytes()), args.repeticoes)
+            if carregar(arquivo.read_bytes()) != dados:
+                raise SystemExit(f"{nome}: os dados lidos não conferem com os gravados")
+            tamanho = arquivo.stat().st_size
+            base = base or (gravar, ler, tamanho)
+            print(f"{nome:<26} {gravar * 1000:7.0f}ms {ler * 1000:7.0f}ms {tamanho / 2**20:8.2f}MiB"
+                  f"  ({base[0] / gravar:.1f}x / {base[1] / ler:.1f}x / {tamanho / base[2]:.0%})")
+            if nome == "indexado":
+                ler = _melhor(lambda: _ler_tudo(arquivo.read_bytes()), args.repeticoes)
+                print(f"{'indexado (tudo)':<26} {'':>9} {ler * 1000:7.0f}ms {'':>11}  ({base[1] / ler:.1f}x)")
+    print(f"\n(razões em relação ao JSON indentado: velocidade de gravação / de leitura / tamanho; "
+          f"arquivos msgpack começam com {MAGICO_MSGPACK!r})")
+
+
+if __name__ == "__main__":
+    main()
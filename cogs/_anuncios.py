@@ -0,0 +1,205 @@
+"""
+Fila de saída para anúncios (resumo diário, atualização do mercado...).
+
+Quem anuncia apenas enfileira e segue em frente: o envio acontece em uma
+tarefa própria, então o tick do mercado e o evento diário nunca esperam pela
+latência ou pelos rate limits do Discord.
+
+- Coalescência: anúncios com a mesma chave para o mesmo canal substituem o
+  que ainda estiver pendente (só o mais recente interessa).
+- Rate limit local: um balde de tokens por canal (o Discord permite cerca de
+  5 mensagens a cada 5s por canal) e um global, para não depender dos 429.
+- Falhas temporárias (5xx, 429, rede) são repetidas com backoff exponencial
+  e jitter; canais inexistentes ou sem permissão são descartados.
+- Qualquer outro erro no envio descarta só aquela mensagem (com o traceback
+  no log): a tarefa de envio não pode morrer por causa de um anúncio.
+"""
+
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import aiohttp
+import discord
+
+log = logging.getLogger(__name__)
+
+TAXA_POR_CANAL, CAPACIDADE_POR_CANAL = 1.0, 5      # tokens por segundo, rajada máxima
+TAXA_GLOBAL, CAPACIDADE_GLOBAL = 40.0, 40
+BACKOFF_INICIAL, BACKOFF_MAXIMO = 1.0, 60.0         # segundos
+TENTATIVAS_MAXIMAS = 5
+
+
+class BaldeTokens:
+    """Token bucket: 'taxa' tokens por segundo, acumulando até 'capacidade'."""
+    __slots__ = ("taxa", "capacidade", "tokens", "atualizado", "_relogio")
+
+    def __init__(self, taxa: float, capacidade: float, relogio: Callable[[], float]):
+        self.taxa, self.capacidade = taxa, capacidade
+        self.tokens = float(capacidade)
+        self._relogio = relogio
+        self.atualizado = relogio()
+
+    def _reabastecer(self) -> None:
+        agora = self._relogio()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    def espera(self) -> float:
+        """Segundos até haver um token disponível (0 se já houver)."""
+        self._reabastecer()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.taxa
+
+    def consumir(self) -> None:
+        self._reabastecer()
+        self.tokens -= 1
+
+
+@dataclass
+class Anuncio:
+    canal_id: int
+    chave: Hashable
+    conteudo: Dict[str, Any]            # argumentos de 'canal.send' (content, embed...)
+    tentativas: int = 0
+    disponivel_em: float = 0.0          # relógio do loop; usado pelo backoff
+
+
+class FilaAnuncios:
+    """Fila coalescente de mensagens com rate limit local e novas tentativas."""
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self._loop = asyncio.get_running_loop()
+        self._pendentes: "OrderedDict[Tuple[int, Hashable], Anuncio]" = OrderedDict()
+        self._baldes: Dict[int, BaldeTokens] = {}
+        self._balde_global = BaldeTokens(TAXA_GLOBAL, CAPACIDADE_GLOBAL, self._loop.time)
+        self._novo = asyncio.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+        self.enviados = self.coalescidos = self.descartados = 0
+
+    def iniciar(self) -> None:
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._processar())
+            self._tarefa.add_done_callback(self._tarefa_encerrada)
+
+    def _tarefa_encerrada(self, tarefa: asyncio.Task) -> None:
+        if tarefa.cancelled():
+            return
+        log.error(f"A tarefa de envio de anúncios parou; {len(self._pendentes)} anúncio(s) pendente(s) não serão enviados.", exc_info=tarefa.exception())
+        if self._tarefa is tarefa:
+            self._tarefa = None
+
+    async def fechar(self, tempo_limite: float = 5.0) -> None:
+        """Tenta enviar o que estiver pendente por até 'tempo_limite' segundos e para."""
+        if self._tarefa is None:
+            return
+        if self._pendentes:
+            try:
+                await asyncio.wait_for(self._esvaziada(), tempo_limite)
+            except asyncio.TimeoutError:
+                log.warning(f"{len(self._pendentes)} anúncio(s) descartado(s) ao fechar a fila.")
+        self._tarefa.cancel()
+        self._tarefa = None
+
+    async def _esvaziada(self) -> None:
+        while self._pendentes:
+            await asyncio.sleep(0.1)
+
+    def enfileirar(self, canal_id: int, chave: Hashable = None, **conteudo) -> None:
+        """
+        Agenda 'canal.send(**conteudo)'. Não bloqueia. Se já houver um anúncio
+        pendente com a mesma chave para o canal, ele é substituído por este.
+        """
+        identificador = (canal_id, chave if chave is not None else object())
+        if identificador in self._pendentes:
+            self.coalescidos += 1
+            # Mantém a posição na fila e troca apenas o conteúdo
+            self._pendentes[identificador].conteudo = conteudo
+            self._pendentes[identificador].tentativas = 0
+        else:
+            self._pendentes[identificador] = Anuncio(canal_id, identificador[1], conteudo)
+        self._novo.set()
+
+    def __len__(self) -> int:
+        return len(self._pendentes)
+
+    # --- Envio ---
+    def _balde(self, canal_id: int) -> BaldeTokens:
+        balde = self._baldes.get(canal_id)
+        if balde is None:
+            balde = self._baldes[canal_id] = BaldeTokens(TAXA_POR_CANAL, CAPACIDADE_POR_CANAL, self._loop.time)
+        return balde
+
+    def _proximo(self) -> Tuple[Optional[Tuple[int, Hashable]], float]:
+        """Primeiro anúncio pronto para envio, ou quanto tempo esperar pelo próximo."""
+        agora = self._loop.time()
+        menor_espera = float("inf")
+        espera_global = self._balde_global.espera()
+        if espera_global:
+            return None, espera_global
+        for identificador, anuncio in self._pendentes.items():
+            espera = max(anuncio.disponivel_em - agora, self._balde(anuncio.canal_id).espera())
+            if espera <= 0:
+                return identificador, 0.0
+            menor_espera = min(menor_espera, espera)
+        return None, menor_espera
+
+    async def _processar(self) -> None:
+        while True:
+            if not self._pendentes:
+                self._novo.clear()
+                await self._novo.wait()
+                continue
+            identificador, espera = self._proximo()
+            if identificador is None:
+                # Acorda antes se chegar algo novo (pode ser de um canal livre)
+                self._novo.clear()
+                try:
+                    await asyncio.wait_for(self._novo.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            anuncio = self._pendentes.pop(identificador)
+            self._balde(anuncio.canal_id).consumir()
+            self._balde_global.consumir()
+            await self._enviar(identificador, anuncio)
+
+    async def _enviar(self, identificador: Tuple[int, Hashable], anuncio: Anuncio) -> None:
+        canal = self.bot.get_channel(anuncio.canal_id)
+        if canal is None:
+            self.descartados += 1
+            log.warning(f"Anúncio descartado: canal {anuncio.canal_id} não encontrado.")
+            return
+        try:
+            await canal.send(**anuncio.conteudo)
+            self.enviados += 1
+        except (discord.Forbidden, discord.NotFound):
+            self.descartados += 1
+            log.warning(f"Anúncio descartado: sem acesso ao canal {anuncio.canal_id}.")
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = getattr(e, "status", None)
+            if status is not None and status < 500 and status != 429:
+                self.descartados += 1
+                log.error(f"Anúncio rejeitado pelo Discord no canal {anuncio.canal_id}: {e}")
+                return
+            self._reagendar(identificador, anuncio, e)
+        except Exception:
+            # Erro que uma nova tentativa não resolve (ex: conteúdo inválido)
+            self.descartados += 1
+            log.exception(f"Anúncio descartado: erro inesperado ao enviar para o canal {anuncio.canal_id}.")
+
+    def _reagendar(self, identificador: Tuple[int, Hashable], anuncio: Anuncio, erro: Exception) -> None:
+        anuncio.tentativas += 1
+        if anuncio.tentativas >= TENTATIVAS_MAXIMAS:
+            self.descartados += 1
+            log.error(f"Anúncio para o canal {anuncio.canal_id} descartado após {anuncio.tentativas} tentativas: {erro}")
+            return
+        if identificador in self._pendentes:
+            return  # chegou uma versão mais nova enquanto esta era enviada
+        atraso = min(BACKOFF_MAXIMO, BACKOFF_INICIAL * 2 ** (anuncio.tentativas - 1))
+        anuncio.disponivel_em = self._loop.time() + atraso * random.uniform(0.5, 1.0)
+        self._pendentes[identificador] = anuncio
+        log.warning(f"Falha ao anunciar no canal {anuncio.canal_id} ({erro}); nova tentativa em {atraso:.1f}s.")
@@ -0,0 +1,402 @@
+"""
+Camada de armazenamento particionada por guild: cada guild tem a sua partição
+('dados/<guild_id>/<arquivo>'), carregada sob demanda, gravada em segundo plano
+só quando modificada e descarregada depois de 'tempo_ocioso' sem acesso.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from cogs._metricas import LockInstrumentado, medir
+from cogs._serializacao import carregar_arquivo, de_json, formato_padrao, para_json_bytes, preparar, serializar
+from cogs._snapshot_indexado import SnapshotIndexado
+
+log = logging.getLogger(__name__)
+
+PARTICAO_SEM_GUILD = 0
+INTERVALO_FLUSH = 5.0      # segundos entre gravações das partições sujas
+TEMPO_OCIOSO = 15 * 60.0   # segundos sem acesso até a partição sair da memória
+
+Dados = Dict[str, Any]
+
+
+_AUSENTE = object()
+
+
+class OperacaoInvalida(Exception):
+    """Interrompe uma transação sem salvar; a mensagem é enviada ao usuário."""
+
+
+class DadosRastreados(dict):
+    """
+    Dicionário que anota quais chaves de primeiro nível foram acessadas ou
+    removidas durante uma transação. Como os registros aninhados só são
+    alcançados passando pela chave de primeiro nível, as chaves acessadas
+    cobrem tudo o que pode ter sido modificado.
+
+    Com 'iniciar_rastreio(copiar=True)', o valor de cada chave é serializado
+    no primeiro acesso, antes de o bloco poder alterá-lo, e 'desfazer' o
+    restaura (o backend JSON não tem outra cópia dos dados além desta).
+    """
+
+    # Fora de transações não há rastreio (leituras pelo 'ler' não são anotadas)
+    tocadas: Optional[Set[str]] = None
+    removidas: Optional[Set[str]] = None
+    copias: Optional[Dict[str, Any]] = None
+
+    def iniciar_rastreio(self, copiar: bool = False) -> None:
+        self.tocadas = set()
+        self.removidas = set()
+        self.copias = {} if copiar else None
+
+    def parar_rastreio(self) -> Tuple[Set[str], Set[str]]:
+        tocadas, removidas = self.tocadas or set(), self.removidas or set()
+        self.tocadas = self.removidas = self.copias = None
+        return tocadas - removidas, removidas
+
+    def desfazer(self, converter: Optional[Callable[[str, Any], Any]] = None) -> None:
+        """Volta cada chave copiada ao valor que tinha no início da transação e para o rastreio."""
+        copias = self.copias or {}
+        self.parar_rastreio()
+        for chave, copia in copias.items():
+            if copia is _AUSENTE:
+                self.pop(chave, None)
+            else:
+                valor = de_json(copia)
+                self[chave] = converter(chave, valor) if converter is not None else valor
+
+    def _tocar(self, chave) -> None:
+        tocadas = self.tocadas
+        if tocadas is None or chave in tocadas:
+            return
+        tocadas.add(chave)  # antes da cópia: a leitura abaixo passa de novo por aqui
+        if self.copias is not None:
+            valor = super().get(chave, _AUSENTE)
+            self.copias[chave] = valor if valor is _AUSENTE else para_json_bytes(valor)
+
+    def __getitem__(self, chave):
+        self._tocar(chave)
+        return super().__getitem__(chave)
+
+    def get(self, chave, padrao=None):
+        self._tocar(chave)
+        return super().get(chave, padrao)
+
+    def __setitem__(self, chave, valor):
+        self._tocar(chave)
+        super().__setitem__(chave, valor)
+
+    def setdefault(self, chave, padrao=None):
+        self._tocar(chave)
+        return super().setdefault(chave, padrao)
+
+    def __delitem__(self, chave):
+        self._tocar(chave)
+        super().__delitem__(chave)
+        if self.removidas is not None:
+            self.removidas.add(chave)
+
+    def pop(self, chave, *padrao):
+        self._tocar(chave)
+        if chave in self and self.removidas is not None:
+            self.removidas.add(chave)
+        return super().pop(chave, *padrao)
+
+    def update(self, *args, **kwargs):
+        novos = dict(*args, **kwargs)
+        for chave in novos:
+            self._tocar(chave)
+        super().update(novos)
+
+    # Numa transação, cada chave é anotada (e copiada) só quando a iteração
+    # chega a ela. Varreduras que só leem devem usar 'varrer', que não anota,
+    # e acessar por 'dados[chave]' apenas os registros que vão alterar.
+    def items(self):
+        if self.tocadas is None:
+            return super().items()
+        return self._itens_rastreados()
+
+    def values(self):
+        if self.tocadas is None:
+            return super().values()
+        return (valor for _, valor in self._itens_rastreados())
+
+    def _itens_rastreados(self):
+        for chave in list(self.keys()):
+            if chave in self:
+                self._tocar(chave)
+                yield chave, super().__getitem__(chave)
+
+
+class SnapshotRastreado(DadosRastreados, SnapshotIndexado):
+    """Snapshot indexado (registros lidos sob demanda) com o rastreio das transações."""
+
+
+def diretorio_dados() -> Path:
+    """Raiz das partições ('dados/' ao lado do main.py, ou $DIRETORIO_DADOS)."""
+    return Path(os.getenv('DIRETORIO_DADOS') or Path(__file__).parent.parent / "dados")
+
+
+def varrer(dados: Dados) -> Iterable[Tuple[str, Any]]:
+    """
+    Todos os (chave, valor) de uma partição, para buscas que só leem: não marca
+    as chaves como modificadas (backend SQLite) e lê do arquivo os registros
+    que ainda não foram lidos (snapshot indexado).
+    """
+    if isinstance(dados, SnapshotIndexado):
+        dados.materializar_tudo()
+    return dict.items(dados)
+
+
+def id_particao(guild) -> int:
+    """Converte uma guild (ou None, em DMs) no id da partição."""
+    return guild.id if guild is not None else PARTICAO_SEM_GUILD
+
+
+@dataclass
+class Particao:
+    guild_id: int
+    dados: Dados
+    lock: LockInstrumentado = field(default_factory=LockInstrumentado)
+    sujo: bool = False
+    ultimo_acesso: float = field(default_factory=time.monotonic)
+    versao: int = 0  # versão da partição no banco (apenas no backend SQLite)
+
+
+class ArmazenamentoParticionado:
+    """
+    Armazena um documento JSON por guild.
+
+    'ao_carregar' é chamado com os dados recém-lidos de uma partição e pode
+    ajustá-los (ex: migrações); se retornar True a partição é marcada como suja.
+    'legado' é um arquivo do formato antigo (um único arquivo global): ele é
+    adotado pela guild 'guild_legado' ou, se ela não for informada, pela
+    primeira guild carregada, e então renomeado para '<arquivo>.migrado'.
+    'modelo' é copiado para toda partição nova (ex: a lista de empresas do
+    mercado); sem ele, partições novas começam vazias.
+    'converter(chave, valor)' retorna a representação em memória de um valor
+    de primeiro nível recém-lido (ou o próprio valor).
+    'desfazer=False' dispensa as cópias que desfazem uma transação com erro,
+    para dados que só recebem acréscimos em blocos que não falham no meio
+    (ex: o extrato); o backend SQLite desfaz sempre.
+    """
+
+    def __init__(
+        self,
+        diretorio: Path,
+        nome_arquivo: str,
+        *,
+        ao_carregar: Optional[Callable[[Dados], bool]] = None,
+        legado: Optional[Path] = None,
+        guild_legado: Optional[int] = None,
+        modelo: Optional[Path] = None,
+        converter: Optional[Callable[[str, Any], Any]] = None,
+        tempo_ocioso: float = TEMPO_OCIOSO,
+        desfazer: bool = True,
+    ):
+        self.diretorio = Path(diretorio)
+        self.nome_arquivo = nome_arquivo
+        self.ao_carregar = ao_carregar
+        self.legado = Path(legado) if legado else None
+        self.guild_legado = guild_legado
+        self.modelo = Path(modelo) if modelo else None
+        self.converter = converter
+        self.tempo_ocioso = tempo_ocioso
+        self.desfazer = desfazer
+        self._particoes: Dict[int, Particao] = {}
+        self._carregando: Dict[int, asyncio.Future] = {}
+        self._tarefa_flush: Optional[asyncio.Task] = None
+
+    # --- Caminhos ---
+    def caminho(self, guild_id: int) -> Path:
+        return self.diretorio / str(guild_id) / self.nome_arquivo
+
+    def guilds_em_disco(self) -> List[int]:
+        """Ids de todas as guilds com partição gravada (carregadas ou não)."""
+        ids = set(self._particoes)
+        if self.diretorio.exists():
+            ids.update(int(p.parent.name) for p in self.diretorio.glob(f"*/{self.nome_arquivo}") if p.parent.name.isdigit())
+        return sorted(ids)
+
+    def guilds_carregadas(self) -> List[int]:
+        return list(self._particoes)
+
+    # --- Leitura e escrita de arquivos (executadas em thread) ---
+    def _origem_inicial(self, guild_id: int) -> Optional[Path]:
+        """Decide de onde vem o conteúdo de uma partição que ainda não existe."""
+        if self.legado and self.legado.exists() and self.guild_legado in (None, guild_id):
+            return self.legado
+        return self.modelo if self.modelo and self.modelo.exists() else None
+
+    def _ler_arquivo(self, guild_id: int) -> Dados:
+        caminho = self.caminho(guild_id)
+        if not caminho.exists():
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            origem = self._origem_inicial(guild_id)
+            if origem is None:
+                return DadosRastreados()
+            shutil.copyfile(origem, caminho)
+            if origem == self.legado:
+                self.legado.rename(self.legado.with_name(self.legado.name + ".migrado"))
+                log.warning(f"Arquivo legado '{origem.name}' adotado pela guild {guild_id}.")
+        try:
+            dados = carregar_arquivo(caminho, classe_indexada=SnapshotRastreado)
+        except ValueError:
+            log.error(f"Partição corrompida em {caminho}. Usando dados vazios.")
+            return DadosRastreados()
+        return dados if isinstance(dados, DadosRastreados) else DadosRastreados(dados)
+
+    def _escrever_arquivo(self, guild_id: int, dados: Dados, formato: Optional[str] = None) -> None:
+        caminho = self.caminho(guild_id)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        temporario.write_bytes(serializar(dados, formato))
+        os.replace(temporario, caminho)
+
+    # --- Partições ---
+    async def particao(self, guild_id: int) -> Particao:
+        """Retorna a partição da guild, carregando-a do disco se necessário."""
+        particao = self._particoes.get(guild_id)
+        if particao is not None:
+            particao.ultimo_acesso = time.monotonic()
+            return particao
+
+        # Várias tarefas podem pedir a mesma partição ao mesmo tempo: só uma lê o arquivo.
+        carregando = self._carregando.get(guild_id)
+        if carregando is not None:
+            return await asyncio.shield(carregando)
+        futuro = self._carregando[guild_id] = asyncio.get_running_loop().create_future()
+        try:
+            with medir("armazenamento"):
+                dados = await asyncio.to_thread(self._ler_arquivo, guild_id)
+            particao = Particao(guild_id, dados)
+            if self.ao_carregar and self.ao_carregar(dados):
+                particao.sujo = True
+            self._converter_todos(dados)
+            self._particoes[guild_id] = particao
+            futuro.set_result(particao)
+            return particao
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita o aviso de exceção não recuperada
+            raise
+        finally:
+            del self._carregando[guild_id]
+
+    def _converter_todos(self, dados: Dados) -> None:
+        if self.converter is None:
+            return
+        # dict.items/__setitem__: no backend SQLite, a troca de representação não é uma escrita
+        for chave, valor in dict.items(dados):
+            novo = self.converter(chave, valor)
+            if novo is not valor:
+                dict.__setitem__(dados, chave, novo)
+        if isinstance(dados, SnapshotIndexado):
+            dados.converter = self.converter  # os registros ainda no arquivo são convertidos ao serem lidos
+
+    async def ler(self, guild_id: int) -> Dados:
+        """Dados da partição para leitura. Não modifique o retorno: use 'transacao'."""
+        return (await self.particao(guild_id)).dados
+
+    @asynccontextmanager
+    async def transacao(self, guild_id: int) -> AsyncIterator[Dados]:
+        """
+        Entrega os dados da partição para modificação sob o lock dela.
+        Se o bloco terminar sem exceção, a partição é marcada para gravação;
+        se levantar, os registros que ele acessou voltam ao que eram antes.
+        """
+        particao = await self.particao(guild_id)
+        async with particao.lock:
+            dados = particao.dados
+            if self.desfazer:
+                dados.iniciar_rastreio(copiar=True)
+            try:
+                yield dados
+            except BaseException:
+                if self.desfazer:
+                    dados.desfazer(self.converter)
+                raise
+            dados.parar_rastreio()
+            particao.sujo = True
+
+    # --- Gravação e descarregamento ---
+    async def flush(self, guild_id: Optional[int] = None) -> int:
+        """Grava as partições sujas (todas ou só a indicada). Retorna quantas foram gravadas."""
+        alvos = [self._particoes[guild_id]] if guild_id in self._particoes else [] if guild_id is not None else list(self._particoes.values())
+        gravadas = 0
+        for particao in alvos:
+            if not particao.sujo:
+                continue
+            async with particao.lock:
+                with medir("armazenamento"):
+                    formato = formato_padrao()
+                    preparar(particao.dados, formato)  # no event loop, não na thread da gravação
+                    await asyncio.to_thread(self._escrever_arquivo, particao.guild_id, particao.dados, formato)
+                particao.sujo = False
+                gravadas += 1
+        return gravadas
+
+    async def descarregar_ociosas(self) -> None:
+        """Grava e remove da memória as partições sem acesso recente."""
+        limite = time.monotonic() - self.tempo_ocioso
+        for guild_id, particao in list(self._particoes.items()):
+            if particao.ultimo_acesso < limite and not particao.lock.locked():
+                await self.flush(guild_id)
+                if particao.ultimo_acesso < limite and not particao.sujo:
+                    del self._particoes[guild_id]
+                    log.info(f"Partição {guild_id} de '{self.nome_arquivo}' descarregada da memória.")
+
+    async def _loop_flush(self, intervalo: float) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await self.flush()
+                await self.descarregar_ociosas()
+            except Exception:
+                log.error(f"Erro ao gravar partições de '{self.nome_arquivo}'.", exc_info=True)
+
+    async def trocar_ao_carregar(self, ao_carregar: Optional[Callable[[Dados], bool]]) -> None:
+        """
+        Troca o 'ao_carregar' (ex: por o de um cog recarregado com '!reload') e o
+        aplica também às partições que já estão em memória.
+        """
+        self.ao_carregar = ao_carregar
+        if ao_carregar is None:
+            return
+        for particao in list(self._particoes.values()):
+            async with particao.lock:
+                if ao_carregar(particao.dados):
+                    particao.sujo = True
+
+    def iniciar(self, intervalo: float = INTERVALO_FLUSH) -> None:
+        """Inicia a gravação periódica. Deve ser chamado com o event loop rodando."""
+        if self._tarefa_flush is None:
+            self._tarefa_flush = asyncio.create_task(self._loop_flush(intervalo))
+
+    async def fechar(self) -> None:
+        """Para a gravação periódica e grava tudo o que estiver pendente."""
+        if self._tarefa_flush is not None:
+            self._tarefa_flush.cancel()
+            self._tarefa_flush = None
+        await self.flush()
+
+
+def criar_armazenamento(diretorio: Path, nome_arquivo: str, **opcoes) -> ArmazenamentoParticionado:
+    """
+    Cria o armazenamento do backend escolhido pela variável de ambiente
+    'ARMAZENAMENTO': 'json' (padrão, um processo) ou 'sqlite' (vários processos).
+    """
+    backend = os.getenv('ARMAZENAMENTO', 'json').lower()
+    if backend == 'sqlite':
+        from cogs._armazenamento_sqlite import ArmazenamentoSQLite
+        return ArmazenamentoSQLite(diretorio, nome_arquivo, **opcoes)
+    if backend != 'json':
+        raise ValueError(f"Backend de armazenamento desconhecido: '{backend}'")
+    return ArmazenamentoParticionado(diretorio, nome_arquivo, **opcoes)
@@ -0,0 +1,246 @@
+"""
+Backend SQLite da camada de armazenamento, para vários processos do bot sobre a
+mesma economia: uma linha por chave de primeiro nível e uma versão por guild,
+com 'BEGIN IMMEDIATE' como lock de escrita entre processos.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, List, Set, Tuple
+
+from cogs._armazenamento import ArmazenamentoParticionado, DadosRastreados, Particao
+from cogs._metricas import LockInstrumentado, medir
+from cogs._serializacao import de_json, para_json
+
+log = logging.getLogger(__name__)
+
+TEMPO_ESPERA_LOCK = 30.0  # segundos esperando o lock de escrita de outro processo
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    guild_id INTEGER NOT NULL,
+    chave TEXT NOT NULL,
+    valor TEXT,
+    versao INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, chave)
+);
+CREATE INDEX IF NOT EXISTS registros_por_versao ON registros (guild_id, versao);
+CREATE TABLE IF NOT EXISTS particoes (
+    guild_id INTEGER PRIMARY KEY,
+    versao INTEGER NOT NULL
+);
+"""
+
+
+class ArmazenamentoSQLite(ArmazenamentoParticionado):
+    """Mesma interface do ArmazenamentoParticionado, com o estado no SQLite."""
+
+    def __init__(self, diretorio: Path, nome_arquivo: str, **opcoes):
+        super().__init__(diretorio, nome_arquivo, **opcoes)
+        self.caminho_banco = self.diretorio / (Path(nome_arquivo).stem + ".sqlite3")
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._conexao = self._conectar()
+        with self._conexao:
+            self._conexao.executescript(_ESQUEMA)
+        # Uma conexão só executa uma transação por vez: este lock serializa as
+        # operações deste processo; o SQLite serializa as dos outros processos.
+        self._lock = LockInstrumentado()
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.caminho_banco, timeout=TEMPO_ESPERA_LOCK, isolation_level=None, check_same_thread=False)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        return conexao
+
+    def guilds_em_disco(self) -> List[int]:
+        """Guilds com partição no banco ou ainda em arquivos JSON a importar."""
+        # Conexão própria: a principal pode estar em uso por uma transação em outra thread.
+        conexao = sqlite3.connect(self.caminho_banco, timeout=TEMPO_ESPERA_LOCK)
+        try:
+            ids = {linha[0] for linha in conexao.execute("SELECT guild_id FROM particoes")}
+        finally:
+            conexao.close()
+        ids.update(super().guilds_em_disco())
+        return sorted(ids)
+
+    # --- Sincronização com o banco (executadas em thread) ---
+    def _importar(self, guild_id: int) -> None:
+        """
+        Cria a partição no banco a partir do JSON, em uma transação própria
+        (um erro no bloco de quem pediu a partição não desfaz a importação).
+        O arquivo só é renomeado depois do COMMIT.
+        """
+        conexao = self._conexao
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            if conexao.execute("SELECT 1 FROM particoes WHERE guild_id = ?", (guild_id,)).fetchone() is not None:
+                conexao.execute("ROLLBACK")  # importada por outro processo enquanto esperávamos o lock
+                return
+            dados = self._ler_arquivo(guild_id)
+            if self.ao_carregar:
+                self.ao_carregar(dados)
+            conexao.executemany(
+                "INSERT INTO registros (guild_id, chave, valor, versao) VALUES (?, ?, ?, 1)",
+                ((guild_id, chave, para_json(valor)) for chave, valor in dados.items()),
+            )
+            conexao.execute("INSERT INTO particoes (guild_id, versao) VALUES (?, 1)", (guild_id,))
+            conexao.execute("COMMIT")
+        except BaseException:
+            if conexao.in_transaction:
+                conexao.execute("ROLLBACK")
+            raise
+        arquivo = self.caminho(guild_id)
+        if arquivo.exists():
+            arquivo.rename(arquivo.with_name(arquivo.name + ".importado"))
+        log.info(f"Partição {guild_id} de '{self.nome_arquivo}' importada para {self.caminho_banco.name}.")
+
+    def _aplicar_linhas(self, particao: Particao, linhas: Iterable[Tuple[str, Any]], converter: bool = True) -> None:
+        dados = particao.dados
+        converter = self.converter if converter else None
+        for chave, valor in linhas:
+            if valor is None:
+                dict.pop(dados, chave, None)
+            elif converter is not None:
+                dict.__setitem__(dados, chave, converter(chave, de_json(valor)))
+            else:
+                dict.__setitem__(dados, chave, de_json(valor))
+
+    def _sincronizar(self, guild_id: int, escrita: bool, migrar: bool = False) -> Particao:
+        """
+        Abre uma transação (de escrita, se pedido) e atualiza a cópia em memória.
+        Transações de leitura são encerradas antes de retornar.
+
+        A primeira carga da partição neste processo pode precisar importar o
+        JSON ou aplicar migrações ('ao_carregar'), então usa o lock de escrita.
+        'migrar' força a aplicação de 'ao_carregar' a uma partição já carregada.
+        """
+        conexao = self._conexao
+        particao = self._particoes.get(guild_id)
+        primeira_carga = particao is None
+        migrar = (migrar or primeira_carga) and self.ao_carregar is not None
+        if primeira_carga and conexao.execute("SELECT 1 FROM particoes WHERE guild_id = ?", (guild_id,)).fetchone() is None:
+            self._importar(guild_id)
+        conexao.execute("BEGIN IMMEDIATE" if escrita or migrar else "BEGIN")
+        try:
+            linha = conexao.execute("SELECT versao FROM particoes WHERE guild_id = ?", (guild_id,)).fetchone()
+            if linha is None:
+                raise RuntimeError(f"Partição {guild_id} de '{self.nome_arquivo}' não existe em {self.caminho_banco.name}.")
+            versao_banco = linha[0]
+
+            if primeira_carga:
+                particao = Particao(guild_id, DadosRastreados())
+            if particao.versao < versao_banco:
+                # Na primeira carga, as migrações recebem os dados do banco como estão
+                self._aplicar_linhas(particao, conexao.execute(
+                    "SELECT chave, valor FROM registros WHERE guild_id = ? AND versao > ?", (guild_id, particao.versao)), not primeira_carga)
+                particao.versao = versao_banco
+            if migrar:
+                self._migrar(particao)
+            if primeira_carga:
+                self._converter_todos(particao.dados)
+            particao.ultimo_acesso = time.monotonic()
+            if not escrita:
+                conexao.execute("COMMIT")
+            self._particoes[guild_id] = particao
+            return particao
+        except BaseException:
+            if conexao.in_transaction:
+                conexao.execute("ROLLBACK")
+            raise
+
+    def _migrar(self, particao: Particao) -> None:
+        """Aplica 'ao_carregar' e grava as chaves alteradas. Requer o lock de escrita."""
+        dados = particao.dados
+        dados.iniciar_rastreio()
+        try:
+            migrou = self.ao_carregar(dados)
+        finally:
+            tocadas, removidas = dados.parar_rastreio()
+        if migrou:
+            self._gravar(particao, tocadas, removidas)
+            log.info(f"Partição {particao.guild_id} de '{self.nome_arquivo}' migrada no banco.")
+
+    def _gravar(self, particao: Particao, tocadas: Set[str], removidas: Set[str]) -> None:
+        """Grava as chaves em uma nova versão da partição, dentro da transação de escrita aberta."""
+        conexao = self._conexao
+        nova_versao = particao.versao + 1
+        dados = particao.dados
+        conexao.executemany(
+            "INSERT OR REPLACE INTO registros (guild_id, chave, valor, versao) VALUES (?, ?, ?, ?)",
+            [(particao.guild_id, chave, para_json(dict.__getitem__(dados, chave)), nova_versao) for chave in tocadas if chave in dados]
+            + [(particao.guild_id, chave, None, nova_versao) for chave in removidas],
+        )
+        conexao.execute("UPDATE particoes SET versao = ? WHERE guild_id = ?", (nova_versao, particao.guild_id))
+        particao.versao = nova_versao
+
+    def _confirmar(self, particao: Particao, tocadas: Set[str], removidas: Set[str]) -> None:
+        conexao = self._conexao
+        versao_anterior = particao.versao
+        try:
+            self._gravar(particao, tocadas, removidas)
+            conexao.execute("COMMIT")
+        except BaseException:
+            particao.versao = versao_anterior
+            self._desfazer(particao, tocadas | removidas)
+            raise
+
+    def _desfazer(self, particao: Particao, chaves: Set[str]) -> None:
+        """ROLLBACK e releitura das chaves que o bloco pode ter alterado em memória."""
+        conexao = self._conexao
+        if conexao.in_transaction:
+            conexao.execute("ROLLBACK")
+        for chave in chaves:
+            linha = conexao.execute("SELECT valor FROM registros WHERE guild_id = ? AND chave = ?", (particao.guild_id, chave)).fetchone()
+            self._aplicar_linhas(particao, [(chave, linha[0] if linha else None)])
+
+    # --- Interface pública ---
+    async def particao(self, guild_id: int) -> Particao:
+        async with self._lock:
+            with medir("armazenamento"):
+                return await asyncio.to_thread(self._sincronizar, guild_id, False)
+
+    @asynccontextmanager
+    async def transacao(self, guild_id: int) -> AsyncIterator[dict]:
+        async with self._lock:
+            with medir("armazenamento"):
+                particao = await asyncio.to_thread(self._sincronizar, guild_id, True)
+            dados = particao.dados
+            dados.iniciar_rastreio()
+            try:
+                yield dados
+            except BaseException:
+                tocadas, removidas = dados.parar_rastreio()
+                await asyncio.to_thread(self._desfazer, particao, tocadas | removidas)
+                raise
+            tocadas, removidas = dados.parar_rastreio()
+            with medir("armazenamento"):
+                await asyncio.to_thread(self._confirmar, particao, tocadas, removidas)
+
+    async def trocar_ao_carregar(self, ao_carregar) -> None:
+        self.ao_carregar = ao_carregar
+        if ao_carregar is None:
+            return
+        async with self._lock:
+            for guild_id in list(self._particoes):
+                await asyncio.to_thread(self._sincronizar, guild_id, False, True)
+
+    async def flush(self, guild_id=None) -> int:
+        """Cada transação já é gravada no COMMIT: não há nada pendente."""
+        return 0
+
+    async def descarregar_ociosas(self) -> None:
+        """Descarta as cópias em memória sem acesso recente (o banco continua com os dados)."""
+        limite = time.monotonic() - self.tempo_ocioso
+        async with self._lock:
+            for guild_id, particao in list(self._particoes.items()):
+                if particao.ultimo_acesso < limite:
+                    del self._particoes[guild_id]
+
+    async def fechar(self) -> None:
+        await super().fechar()
+        async with self._lock:
+            self._conexao.close()
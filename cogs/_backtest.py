@@ -0,0 +1,224 @@
+"""
+Backtest vetorizado (numpy) de estratégias de compra e venda sobre os preços do
+histórico e sobre caminhos simulados: retorno, imposto do '!vender', drawdown e
+número de vendas de cada estratégia.
+
+Uso offline:
+    python -m cogs._backtest historico_mercado.json --mercado mercado.json --ticks 2016 --caminhos 200
+"""
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from cogs import _indicadores
+from cogs._moeda import para_centavos
+from cogs._serializacao import carregar_arquivo
+from cogs._simulacao import simular_ticks
+
+ESTRATEGIAS = ("segurar", "media_movel", "momento", "rsi")
+DESCRICOES = {
+    "segurar": "Compra no início e segura até o fim",
+    "media_movel": f"Posicionado enquanto o preço está acima da MM{_indicadores.JANELA}",
+    "momento": f"Posicionado enquanto o preço está acima do de {_indicadores.JANELA} ticks atrás",
+    "rsi": "Compra com RSI abaixo de 30, vende com RSI acima de 70",
+}
+RSI_COMPRA, RSI_VENDA = 30, 70
+# O primeiro valor de cada indicador (MM e momento: JANELA preços antes; RSI: PERIODO_RSI
+# variações) e pelo menos um tick depois dele para a posição valer
+TICKS_MINIMOS = max(_indicadores.JANELA, _indicadores.PERIODO_RSI) + 2
+
+
+class HistoricoCurto(ValueError):
+    """As séries têm menos de TICKS_MINIMOS preços."""
+
+
+def media_movel(precos: np.ndarray, janela: int = _indicadores.JANELA) -> np.ndarray:
+    """Média dos últimos 'janela' preços de cada série (NaN antes de a janela encher)."""
+    mm = np.full(precos.shape, np.nan)
+    if precos.shape[1] >= janela:
+        soma = np.cumsum(precos, axis=1)
+        soma[:, janela:] = soma[:, janela:] - soma[:, :-janela]
+        mm[:, janela - 1:] = soma[:, janela - 1:] / janela
+    return mm
+
+
+def rsi(precos: np.ndarray, periodo: int = _indicadores.PERIODO_RSI) -> np.ndarray:
+    """RSI de Wilder de cada série (NaN antes de 'periodo' variações)."""
+    resultado = np.full(precos.shape, np.nan)
+    variacoes = np.diff(precos, axis=1)
+    ganhos, perdas = np.maximum(variacoes, 0), np.maximum(-variacoes, 0)
+    ganho = np.zeros(precos.shape[0])
+    perda = np.zeros(precos.shape[0])
+    for k in range(variacoes.shape[1]):
+        n = k + 1
+        if n <= periodo:
+            # Fase inicial: média simples das primeiras variações
+            ganho += (ganhos[:, k] - ganho) / n
+            perda += (perdas[:, k] - perda) / n
+        else:
+            ganho = (ganho * (periodo - 1) + ganhos[:, k]) / periodo
+            perda = (perda * (periodo - 1) + perdas[:, k]) / periodo
+        if n >= periodo:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                valor = 100 - 100 / (1 + ganho / perda)
+            resultado[:, k + 1] = np.where(perda == 0, np.where(ganho > 0, 100.0, 50.0), valor)
+    return resultado
+
+
+def _manter_ultimo_sinal(sinais: np.ndarray) -> np.ndarray:
+    """Posição que segue o último sinal não nulo (+1 compra, -1 venda) de cada série."""
+    indices = np.arange(sinais.shape[-1])
+    ultimo = np.maximum.accumulate(np.where(sinais != 0, indices, -1), axis=-1)
+    return (ultimo >= 0) & (np.take_along_axis(sinais, np.maximum(ultimo, 0), axis=-1) > 0)
+
+
+def posicoes(precos: np.ndarray) -> np.ndarray:
+    """Posição (aberta ou não) de cada estratégia em cada série ao fim de cada tick: (estratégias, séries, ticks)."""
+    mm = media_movel(precos)
+    indice_rsi = rsi(precos)
+    anterior = np.full(precos.shape, np.nan)
+    anterior[:, _indicadores.JANELA:] = precos[:, :-_indicadores.JANELA]
+
+    # Comparações com NaN são falsas: sem indicador, sem posição
+    por_estrategia = {
+        "segurar": np.ones(precos.shape, dtype=bool),
+        "media_movel": precos > mm,
+        "momento": precos > anterior,
+        "rsi": _manter_ultimo_sinal(np.where(indice_rsi < RSI_COMPRA, 1, np.where(indice_rsi > RSI_VENDA, -1, 0))),
+    }
+    resultado = np.stack([por_estrategia[nome] for nome in ESTRATEGIAS])
+    resultado[..., -1] = False  # tudo é vendido no último tick
+    return resultado
+
+
+def avaliar(precos: np.ndarray, posicao: np.ndarray, taxa_imposto_bp: int) -> Dict[str, np.ndarray]:
+    """
+    Métricas de cada (estratégia, série) para as posições dadas, com capital
+    inicial 1. A posição do tick t vale do t para o t+1, com o capital inteiro
+    (frações de ação). Retorna {métrica: array (estratégias, séries)}.
+    """
+    ticks = precos.shape[1]
+    aberta = posicao[..., :-1]
+    # Capital bruto (sem imposto), em escala logarítmica
+    passos = np.where(aberta, np.log(precos[:, 1:] / precos[:, :-1]), 0.0)
+    bruto = np.concatenate((np.zeros(aberta.shape[:-1] + (1,)), np.cumsum(passos, axis=-1)), axis=-1)
+
+    antes = np.concatenate((np.zeros(posicao.shape[:-1] + (1,), dtype=bool), posicao[..., :-1]), axis=-1)
+    entradas, saidas = posicao & ~antes, ~posicao & antes
+
+    # Lucro de cada venda em relação à compra que a abriu
+    indices = np.arange(ticks)
+    ultima_entrada = np.maximum.accumulate(np.where(entradas, indices, -1), axis=-1)
+    na_entrada = np.take_along_axis(bruto, np.maximum(ultima_entrada, 0), axis=-1)
+    lucro = np.where(saidas, np.expm1(bruto - na_entrada), 0.0)
+    # O imposto tira uma fração do capital no momento da venda; como o capital seguinte
+    # cresce a partir do que sobrou, as frações se acumulam como fatores
+    fracao = taxa_imposto_bp / 10_000 * np.maximum(lucro, 0) / (1 + lucro)
+    fatores = np.log1p(-fracao)
+    acumulado = np.cumsum(fatores, axis=-1)
+    liquido = bruto + acumulado
+    imposto = (fracao * np.exp(liquido - fatores)).sum(axis=-1)
+
+    return {
+        "retorno_bruto": np.expm1(bruto[..., -1]),
+        "retorno_liquido": np.expm1(liquido[..., -1]),
+        "imposto": imposto,
+        "drawdown": -np.expm1(liquido - np.maximum.accumulate(liquido, axis=-1)).min(axis=-1),
+        "vendas": saidas.sum(axis=-1),
+        "exposicao": aberta.mean(axis=-1) if ticks > 1 else np.zeros(aberta.shape[:-1]),
+    }
+
+
+def executar(historico: Dict[str, List[int]], mercado: Optional[Dict[str, Dict[str, Any]]] = None, ticks: int = 0,
+             caminhos: int = 1, taxa_imposto_bp: int = 500, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Roda o backtest de todas as ESTRATEGIAS. Preços em centavos.
+
+    Com 'ticks' > 0, cada ação ganha 'caminhos' séries: o histórico seguido de
+    'ticks' preços simulados a partir do preço e da tendência atuais (de
+    'mercado', se informado); as métricas são a média dos caminhos.
+
+    Retorna {"simbolos", "estrategias", "ticks", "caminhos", "metricas": {métrica: [[valor por símbolo] por estratégia]}}.
+    Levanta HistoricoCurto se as séries tiverem menos de TICKS_MINIMOS preços.
+    """
+    rng = np.random.default_rng(seed)
+    mercado = mercado or {}
+    caminhos = caminhos if ticks > 0 else 1
+    simbolos = [simbolo for simbolo, precos in historico.items() if precos]
+    series = []
+    for simbolo in simbolos:
+        precos = list(historico[simbolo])
+        info = mercado.get(simbolo, {})
+        for _ in range(caminhos):
+            simulados, _ = simular_ticks(info.get("preco", precos[-1]), info.get("tendencia", "estavel"), ticks, rng)
+            series.append(precos + simulados)
+    if not series:
+        return {"simbolos": [], "estrategias": list(ESTRATEGIAS), "ticks": 0, "caminhos": caminhos, "metricas": {}}
+
+    # Séries alinhadas pelo fim e cortadas no tamanho da menor
+    tamanho = min(map(len, series))
+    if tamanho < TICKS_MINIMOS:
+        raise HistoricoCurto(f"As séries têm {tamanho} preços; os indicadores precisam de pelo menos {TICKS_MINIMOS}.")
+    precos = np.array([serie[-tamanho:] for serie in series], dtype=np.float64)
+    metricas = avaliar(precos, posicoes(precos), taxa_imposto_bp)
+    # (estratégias, símbolos x caminhos) -> média dos caminhos de cada símbolo
+    medias = {nome: valores.reshape(len(ESTRATEGIAS), len(simbolos), caminhos).mean(axis=-1).tolist() for nome, valores in metricas.items()}
+    return {"simbolos": simbolos, "estrategias": list(ESTRATEGIAS), "ticks": tamanho, "caminhos": caminhos, "metricas": medias}
+
+
+def tabela(resultado: Dict[str, Any], por_simbolo: bool = False) -> str:
+    """Texto de largura fixa com as métricas (média das ações, ou uma linha por ação)."""
+    metricas = resultado["metricas"]
+    linhas = [f"{'estratégia':<12} {'ação':<5} {'líquido':>10} {'bruto':>10} {'imposto':>9} {'queda':>7} {'vendas':>6}"]
+    for i, estrategia in enumerate(resultado["estrategias"]):
+        indices = range(len(resultado["simbolos"])) if por_simbolo else [None]
+        for j in indices:
+            valor = (lambda m: metricas[m][i][j]) if j is not None else (lambda m: float(np.mean(metricas[m][i])))
+            linhas.append(
+                f"{estrategia:<12} {resultado['simbolos'][j] if j is not None else 'todas':<5} "
+                f"{valor('retorno_liquido'):>+10.1%} {valor('retorno_bruto'):>+10.1%} {valor('imposto'):>9.2%} "
+                f"{valor('drawdown'):>7.1%} {valor('vendas'):>6.1f}"
+            )
+    return "\n".join(linhas)
+
+
+def _carregar_centavos(arquivo: str) -> Dict[str, Any]:
+    """Lê um arquivo do mercado (em qualquer formato); os arquivos antigos da raiz ainda guardam reais (float)."""
+    dados = carregar_arquivo(Path(arquivo))
+    for chave, valor in dados.items():
+        if isinstance(valor, list):
+            dados[chave] = [para_centavos(p) if isinstance(p, float) else p for p in valor]
+        elif isinstance(valor, dict) and isinstance(valor.get("preco"), float):
+            valor["preco"] = para_centavos(valor["preco"])
+    return dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("historico", help="historico_mercado.json (da raiz ou de dados/<guild_id>/).")
+    parser.add_argument("--mercado", help="mercado.json correspondente: preço e tendência atuais para a simulação.")
+    parser.add_argument("--ticks", type=int, default=0, help="Ticks simulados depois do histórico (0 = só o histórico).")
+    parser.add_argument("--caminhos", type=int, default=100, help="Caminhos simulados por ação.")
+    parser.add_argument("--imposto-bp", type=int, default=None, help="Imposto sobre o lucro, em pontos-base (padrão: o do mercado).")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--por-acao", action="store_true", help="Uma linha por ação em vez da média.")
+    args = parser.parse_args()
+
+    if args.imposto_bp is None:
+        from cogs.mercado import TAXA_IMPOSTO_LUCRO_BP
+        args.imposto_bp = TAXA_IMPOSTO_LUCRO_BP
+    historico = _carregar_centavos(args.historico)
+    mercado = _carregar_centavos(args.mercado) if args.mercado else None
+    try:
+        resultado = executar(historico, mercado, args.ticks, args.caminhos, args.imposto_bp, args.seed)
+    except HistoricoCurto as e:
+        raise SystemExit(f"{e} Use --ticks para completar o histórico com ticks simulados.") from None
+    print(f"Ações: {len(resultado['simbolos'])} | Ticks: {resultado['ticks']} | Caminhos: {resultado['caminhos']} | Imposto: {args.imposto_bp / 100:.2f}% do lucro")
+    print(tabela(resultado, args.por_acao))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Representação compacta das contas de usuário em memória: objetos com __slots__
+no lugar dos dicionários aninhados, com a mesma interface de dicionário que os
+cogs já usam. No arquivo e no banco, cada conta continua sendo um objeto JSON.
+"""
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+_SALDOS = ("carteira", "banco", "reservado")
+_ESTATISTICAS = ("jogos", "vitorias", "total_apostado", "lucro_total")
+_CAMPOS_POSICAO = ("quantidade", "preco_medio_compra")
+
+
+class Posicao(MutableMapping):
+    """Posição em uma ação: {"quantidade", "preco_medio_compra"}."""
+
+    __slots__ = _CAMPOS_POSICAO
+
+    def __init__(self, quantidade: int = 0, preco_medio_compra: int = 0):
+        self.quantidade = quantidade
+        self.preco_medio_compra = preco_medio_compra
+
+    def __getitem__(self, chave: str) -> int:
+        if chave in _CAMPOS_POSICAO:
+            return getattr(self, chave)
+        raise KeyError(chave)
+
+    def __setitem__(self, chave: str, valor: int) -> None:
+        if chave not in _CAMPOS_POSICAO:
+            raise KeyError(chave)
+        setattr(self, chave, valor)
+
+    def __delitem__(self, chave: str) -> None:
+        raise KeyError(chave)  # os campos são fixos
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_CAMPOS_POSICAO)
+
+    def __len__(self) -> int:
+        return len(_CAMPOS_POSICAO)
+
+    def __repr__(self) -> str:
+        return repr(self.para_dict())
+
+    def para_dict(self) -> Dict[str, int]:
+        return {"quantidade": self.quantidade, "preco_medio_compra": self.preco_medio_compra}
+
+
+def _posicao(valor: Any) -> Any:
+    if type(valor) is dict and valor.keys() == set(_CAMPOS_POSICAO):
+        return Posicao(valor["quantidade"], valor["preco_medio_compra"])
+    return valor
+
+
+class Acoes(dict):
+    """
+    Ações de um usuário: símbolo -> Posicao. Dicionários recebidos por qualquer
+    caminho (construtor, colchetes, setdefault, update, |=) são convertidos.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, simbolo: str, posicao: Any) -> None:
+        super().__setitem__(simbolo, _posicao(posicao))
+
+    def setdefault(self, simbolo: str, padrao: Any = None) -> Any:
+        if simbolo not in self:
+            self[simbolo] = padrao
+        return self[simbolo]
+
+    def update(self, *args, **kwargs) -> None:
+        for simbolo, posicao in dict(*args, **kwargs).items():
+            self[simbolo] = posicao
+
+    def __ior__(self, outro: Any) -> "Acoes":
+        self.update(outro)
+        return self
+
+
+class _Estatisticas(MutableMapping):
+    """Vista do 'cc_stats' de uma conta: lê e escreve nos slots dela."""
+
+    __slots__ = ("_conta",)
+
+    def __init__(self, conta: "Conta"):
+        self._conta = conta
+
+    def __getitem__(self, chave: str) -> int:
+        if chave in _ESTATISTICAS:
+            return getattr(self._conta, chave)
+        raise KeyError(chave)
+
+    def __setitem__(self, chave: str, valor: int) -> None:
+        if chave not in _ESTATISTICAS:
+            raise KeyError(chave)
+        setattr(self._conta, chave, valor)
+
+    def __delitem__(self, chave: str) -> None:
+        raise KeyError(chave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_ESTATISTICAS)
+
+    def __len__(self) -> int:
+        return len(_ESTATISTICAS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class Conta(MutableMapping):
+    """Conta de um usuário na economia, com a interface do dicionário que ela substitui."""
+
+    __slots__ = _SALDOS + ("acoes",) + _ESTATISTICAS + ("extras",)
+
+    def __init__(self, carteira: int = 0, banco: int = 0, reservado: int = 0, acoes: Optional[Acoes] = None,
+                 jogos: int = 0, vitorias: int = 0, total_apostado: int = 0, lucro_total: int = 0,
+                 extras: Optional[Dict[str, Any]] = None):
+        self.carteira, self.banco, self.reservado = carteira, banco, reservado
+        self.acoes = acoes or None
+        self.jogos, self.vitorias, self.total_apostado, self.lucro_total = jogos, vitorias, total_apostado, lucro_total
+        self.extras = extras or None
+
+    @classmethod
+    def de_dict(cls, registro: Dict[str, Any]) -> Any:
+        """Conta equivalente ao registro, ou o próprio registro se ele não tiver o formato esperado."""
+        stats, acoes = registro.get("cc_stats"), registro.get("acoes", {})
+        if type(stats) is not dict or stats.keys() != set(_ESTATISTICAS) or type(acoes) is not dict:
+            return registro
+        if "carteira" not in registro or "banco" not in registro:
+            return registro
+        extras = {chave: valor for chave, valor in registro.items() if chave not in _SALDOS and chave not in ("acoes", "cc_stats")}
+        return cls(
+            registro["carteira"], registro["banco"], registro.get("reservado", 0),
+            Acoes(acoes),
+            stats["jogos"], stats["vitorias"], stats["total_apostado"], stats["lucro_total"],
+            extras,
+        )
+
+    # --- Interface de dicionário ---
+    def __getitem__(self, chave: str) -> Any:
+        if chave in _SALDOS:
+            return getattr(self, chave)
+        if chave == "acoes":
+            if self.acoes is None:
+                self.acoes = Acoes()  # quem pede 'acoes' com colchetes vai escrever nelas
+            return self.acoes
+        if chave == "cc_stats":
+            return _Estatisticas(self)
+        if self.extras is not None and chave in self.extras:
+            return self.extras[chave]
+        raise KeyError(chave)
+
+    def get(self, chave: str, padrao: Any = None) -> Any:
+        # Ler 'acoes' com get não cria o dicionário: a maioria das contas não tem ações
+        if chave == "carteira" or chave == "banco":
+            return getattr(self, chave)
+        if chave == "acoes":
+            return self.acoes if self.acoes is not None else padrao
+        return self[chave] if chave in self else padrao
+
+    def __contains__(self, chave: object) -> bool:
+        if chave in ("carteira", "banco", "acoes", "cc_stats"):
+            return True
+        if chave == "reservado":
+            return self.reservado != 0
+        return self.extras is not None and chave in self.extras
+
+    def __setitem__(self, chave: str, valor: Any) -> None:
+        if chave in _SALDOS:
+            setattr(self, chave, valor)
+        elif chave == "acoes":
+            self.acoes = Acoes(valor) if valor else None
+        elif chave == "cc_stats":
+            for campo in _ESTATISTICAS:
+                setattr(self, campo, valor.get(campo, 0))
+        else:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[chave] = valor
+
+    def __delitem__(self, chave: str) -> None:
+        if chave == "reservado":
+            self.reservado = 0
+        elif self.extras is not None and chave in self.extras:
+            del self.extras[chave]
+            self.extras = self.extras or None
+        else:
+            raise KeyError(chave)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "carteira"
+        yield "banco"
+        if self.reservado:
+            yield "reservado"
+        yield "acoes"
+        yield "cc_stats"
+        if self.extras is not None:
+            yield from self.extras
+
+    def __len__(self) -> int:
+        return 4 + (self.reservado != 0) + (len(self.extras) if self.extras is not None else 0)
+
+    def __repr__(self) -> str:
+        return f"Conta({self.para_dict()!r})"
+
+    def para_dict(self) -> Dict[str, Any]:
+        """O registro no formato do arquivo (ver cogs/_serializacao.py)."""
+        registro = {"carteira": self.carteira, "banco": self.banco}
+        if self.reservado:
+            registro["reservado"] = self.reservado
+        registro["acoes"] = {simbolo: _para_dict(posicao) for simbolo, posicao in self.acoes.items()} if self.acoes else {}
+        registro["cc_stats"] = {"jogos": self.jogos, "vitorias": self.vitorias, "total_apostado": self.total_apostado, "lucro_total": self.lucro_total}
+        if self.extras is not None:
+            registro.update(self.extras)
+        return registro
+
+
+def _para_dict(valor: Any) -> Any:
+    return valor.para_dict() if isinstance(valor, Posicao) else valor
+
+
+def compactar(chave: str, valor: Any) -> Any:
+    """'converter' do armazenamento da economia: as contas de usuário viram 'Conta'."""
+    if chave.isdigit() and type(valor) is dict:
+        return Conta.de_dict(valor)
+    return valor
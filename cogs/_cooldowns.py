@@ -0,0 +1,70 @@
+"""
+Cooldowns persistentes por usuário, guardados na economia da guild (chave
+'cooldowns'), no lugar do 'commands.cooldown', que fica só na memória e zera a
+cada reinício. Os horários são de relógio, para valerem entre reinícios.
+"""
+
+import heapq
+import time
+from typing import Any, Dict
+
+from discord.ext import commands
+
+from cogs._armazenamento import id_particao
+
+
+def agora() -> float:
+    """Relógio dos cooldowns (de parede, não monotônico: precisa valer após reinícios)."""
+    return time.time()
+
+
+def restante(economia: Dict[str, Any], comando: str, user_id: int, agora: float) -> float:
+    """Segundos até o fim do cooldown do usuário (0 se não houver). Só leitura."""
+    tabela = economia.get("cooldowns", {}).get(comando)
+    if not tabela:
+        return 0.0
+    return max(0.0, tabela["expira"].get(str(user_id), 0.0) - agora)
+
+
+def consumir(economia: Dict[str, Any], comando: str, user_id: int, segundos: float, agora: float) -> float:
+    """
+    Inicia o cooldown do usuário, se não houver um ativo. Retorna 0 quando
+    iniciou, ou os segundos restantes do cooldown ativo. Chame dentro de uma transação.
+    """
+    tabela = economia.setdefault("cooldowns", {}).setdefault(comando, {"expira": {}, "heap": []})
+    _varrer(tabela, agora)
+    chave = str(user_id)
+    ativo = tabela["expira"].get(chave, 0.0) - agora
+    if ativo > 0:
+        return ativo
+    expira = agora + segundos
+    tabela["expira"][chave] = expira
+    heapq.heappush(tabela["heap"], [expira, chave])
+    return 0.0
+
+
+def _varrer(tabela: Dict[str, Any], agora: float) -> None:
+    """Remove as entradas vencidas olhando só o topo do heap (ordenado pela expiração)."""
+    heap, expira = tabela["heap"], tabela["expira"]
+    while heap and heap[0][0] <= agora:
+        horario, chave = heapq.heappop(heap)
+        if expira.get(chave) == horario:  # a entrada pode ter sido renovada depois
+            del expira[chave]
+
+
+def cooldown_persistente(segundos: float):
+    """
+    Check equivalente a 'commands.cooldown(1, segundos, BucketType.user)', mas
+    persistido pelo DataManager do cog. Levanta CommandOnCooldown, tratado
+    pelo 'on_command_error' global como antes.
+    """
+    cooldown = commands.Cooldown(1, segundos)
+
+    async def predicado(ctx: commands.Context) -> bool:
+        data_manager = ctx.cog.data_manager
+        restante_s = await data_manager.consumir_cooldown(id_particao(ctx.guild), ctx.command.qualified_name, ctx.author.id, segundos)
+        if restante_s > 0:
+            raise commands.CommandOnCooldown(cooldown, restante_s, commands.BucketType.user)
+        return True
+
+    return commands.check(predicado)
@@ -0,0 +1,63 @@
+"""
+Estatísticas do cassino, mantidas de forma incremental a cada jogo, na mesma
+transação que paga o prêmio: o 'cc_stats' do jogador e os agregados da guild
+(chave 'cassino' da economia), com um ranking ordenado por lucro.
+"""
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Tuple
+
+
+def estatisticas_guild(economia: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Agregados do cassino da guild, criados se necessário. Chame dentro de uma transação.
+    'ranking' tem [lucro, user_id] de todos os jogadores, em ordem crescente de lucro.
+    """
+    return economia.setdefault("cassino", {"maos": 0, "apostado": 0, "lucro_casa": 0, "maior_premio": None, "ranking": []})
+
+
+def registrar_jogo(economia: Dict[str, Any], registro: Dict[str, Any], user_id: int, aposta: int, retorno: int, contra_casa: bool) -> None:
+    """
+    Contabiliza um jogo de 'user_id' ('registro' é a conta dele): apostou
+    'aposta' e recebeu 'retorno' de volta (0 se perdeu). 'contra_casa' indica
+    se o outro lado foi a casa (PvE). Chame dentro de uma transação.
+    """
+    stats, guild = registro["cc_stats"], estatisticas_guild(economia)
+    lucro = retorno - aposta
+    chave = str(user_id)
+
+    if stats["jogos"] > 0:
+        _remover(guild["ranking"], stats["lucro_total"], chave)
+    stats["jogos"] += 1
+    stats["vitorias"] += retorno > aposta
+    stats["total_apostado"] += aposta
+    stats["lucro_total"] += lucro
+    insort(guild["ranking"], [stats["lucro_total"], chave])
+
+    guild["maos"] += 1
+    guild["apostado"] += aposta
+    if contra_casa:
+        guild["lucro_casa"] -= lucro
+    if lucro > 0 and (guild["maior_premio"] is None or lucro > guild["maior_premio"]["valor"]):
+        guild["maior_premio"] = {"usuario": chave, "valor": lucro}
+
+
+def _remover(ranking: List[List[Any]], lucro: int, chave: str) -> None:
+    i = bisect_left(ranking, [lucro, chave])
+    if i < len(ranking) and ranking[i] == [lucro, chave]:
+        del ranking[i]
+
+
+def ranking(economia: Dict[str, Any], n: int) -> List[Tuple[str, int]]:
+    """Os 'n' jogadores de maior lucro, do maior para o menor: [(user_id, lucro)]. Só leitura."""
+    indice = economia.get("cassino", {}).get("ranking", [])
+    return [(chave, lucro) for lucro, chave in reversed(indice[-n:])] if n > 0 else []
+
+
+def reconstruir_ranking(economia: Dict[str, Any]) -> None:
+    """Refaz o índice do ranking a partir do 'cc_stats' de todos os usuários (migração)."""
+    estatisticas_guild(economia)["ranking"] = sorted(
+        [registro["cc_stats"]["lucro_total"], chave]
+        for chave, registro in economia.items()
+        if chave.isdigit() and registro.get("cc_stats", {}).get("jogos", 0) > 0
+    )
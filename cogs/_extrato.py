@@ -0,0 +1,87 @@
+"""
+Extrato: registro de cada movimentação de saldo, em um documento separado da
+economia ('extrato.json' de cada guild) com uma lista de lançamentos por
+usuário, do mais antigo para o mais novo.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+
+MAX_LANCAMENTOS = 200  # por usuário, com folga de 25% antes de aparar a lista
+RETENCAO_DIAS = 30
+CONTAS = {"carteira": "c", "banco": "b"}
+
+# Motivo gravado -> descrição exibida no '!extrato'
+MOTIVOS = {
+    "trabalho": "Trabalho",
+    "deposito": "Depósito",
+    "saque": "Saque",
+    "pix_enviado": "Transferência enviada",
+    "pix_recebido": "Transferência recebida",
+    "roubo": "Roubo",
+    "roubado": "Roubado",
+    "multa_roubo": "Multa por roubo",
+    "aposta": "Aposta no cassino",
+    "premio": "Prêmio do cassino",
+    "aposta_devolvida": "Aposta devolvida",
+    "compra_acoes": "Compra de ações",
+    "venda_acoes": "Venda de ações",
+    "ordem_reserva": "Reserva de ordem",
+    "ordem_devolucao": "Reserva de ordem devolvida",
+    "venda_ordem": "Venda por ordem",
+    "venda_deslistagem": "Venda por deslistagem",
+    "imposto_lucro": "Imposto sobre o lucro",
+    "juros": "Juros do banco",
+    "imposto_riqueza": "Imposto sobre a riqueza",
+    "ajuste": "Ajuste da administração",
+}
+
+# [horário, motivo, conta ('c'/'b'), valor em centavos (negativo = saída), saldo da conta depois]
+Lancamento = List[Any]
+
+
+def lancamento(motivo: str, conta: str, valor: int, saldo: int) -> Lancamento:
+    """Cria um lançamento com o horário atual."""
+    return [int(time.time()), motivo, CONTAS[conta], int(valor), int(saldo)]
+
+
+def anexar(extrato: Dict[str, Any], lancamentos: Iterable[Tuple[str, Lancamento]]) -> None:
+    """Acrescenta (user_id, lançamento) ao extrato. Chame dentro de uma transação."""
+    for user_id, entrada in lancamentos:
+        lista = extrato.setdefault(user_id, [])
+        lista.append(entrada)
+        if len(lista) > MAX_LANCAMENTOS + MAX_LANCAMENTOS // 4:
+            del lista[:-MAX_LANCAMENTOS]
+
+
+def pagina(extrato: Dict[str, Any], user_id: int, numero: int, tamanho: int) -> Tuple[List[Lancamento], int]:
+    """
+    Lançamentos da página 'numero' (1 = os mais recentes), do mais novo para o
+    mais antigo, e o total de páginas. Só leitura.
+    """
+    lista = extrato.get(str(user_id), [])
+    total_paginas = max(1, -(-len(lista) // tamanho))
+    fim = len(lista) - (numero - 1) * tamanho
+    if numero < 1 or fim <= 0:
+        return [], total_paginas
+    return lista[max(0, fim - tamanho):fim][::-1], total_paginas
+
+
+def compactar(extrato: Dict[str, Any], agora: float = None) -> int:
+    """
+    Aplica a retenção a todos os usuários. Retorna quantos lançamentos saíram.
+    Chame dentro de uma transação.
+    """
+    limite = (agora if agora is not None else time.time()) - RETENCAO_DIAS * 86400
+    removidos = 0
+    for user_id in [chave for chave in extrato if chave.isdigit()]:
+        lista = extrato[user_id]
+        # Os lançamentos são anexados em ordem de horário
+        corte = max(bisect_left(lista, limite, key=lambda entrada: entrada[0]), len(lista) - MAX_LANCAMENTOS)
+        if corte > 0:
+            del lista[:corte]
+            removidos += corte
+        if not lista:
+            del extrato[user_id]
+    return removidos
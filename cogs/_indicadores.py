@@ -0,0 +1,98 @@
+"""
+Indicadores técnicos das ações (média móvel, volatilidade e RSI), guardados em
+'mercado[simbolo]["indicadores"]' e atualizados em O(1) a cada tick, sem
+percorrer o histórico.
+"""
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+JANELA = 20
+PERIODO_RSI = 14
+# Preços que enchem todas as janelas: JANELA retornos pedem JANELA + 1 preços
+PRECOS_PARA_INICIAR = max(JANELA, PERIODO_RSI) + 1
+
+
+def novo_estado(precos: Iterable[int] = ()) -> Dict[str, Any]:
+    """Estado vazio, opcionalmente já alimentado com preços antigos (do mais antigo ao mais novo)."""
+    estado = {
+        "ultimo": None, "ticks": 0,
+        "precos": [], "soma": 0,                          # média móvel
+        "retornos": [], "soma_r": 0.0, "soma_r2": 0.0,    # volatilidade
+        "ganho": 0.0, "perda": 0.0, "variacoes": 0,       # RSI
+    }
+    for preco in precos:
+        atualizar(estado, preco)
+    return estado
+
+
+def atualizar(estado: Dict[str, Any], preco: int) -> None:
+    """Incorpora um novo preço (em centavos). O(1)."""
+    anterior = estado["ultimo"]
+    estado["ultimo"] = preco
+    estado["ticks"] += 1
+
+    precos = estado["precos"]
+    precos.append(preco)
+    estado["soma"] += preco
+    if len(precos) > JANELA:
+        estado["soma"] -= precos.pop(0)
+    if anterior is None or anterior <= 0:
+        return
+
+    retorno = (preco - anterior) / anterior * 100
+    retornos = estado["retornos"]
+    retornos.append(retorno)
+    estado["soma_r"] += retorno
+    estado["soma_r2"] += retorno * retorno
+    if len(retornos) > JANELA:
+        saiu = retornos.pop(0)
+        estado["soma_r"] -= saiu
+        estado["soma_r2"] -= saiu * saiu
+    if estado["ticks"] % JANELA == 0:
+        # Refeitas a partir da janela para o erro de arredondamento não se acumular
+        estado["soma_r"] = math.fsum(retornos)
+        estado["soma_r2"] = math.fsum(r * r for r in retornos)
+
+    # RSI de Wilder
+    variacao = preco - anterior
+    ganho, perda = max(variacao, 0), max(-variacao, 0)
+    estado["variacoes"] += 1
+    n = estado["variacoes"]
+    if n <= PERIODO_RSI:
+        # Fase inicial: média simples das primeiras variações
+        estado["ganho"] += (ganho - estado["ganho"]) / n
+        estado["perda"] += (perda - estado["perda"]) / n
+    else:
+        estado["ganho"] = (estado["ganho"] * (PERIODO_RSI - 1) + ganho) / PERIODO_RSI
+        estado["perda"] = (estado["perda"] * (PERIODO_RSI - 1) + perda) / PERIODO_RSI
+
+
+def aquecendo(estado: Dict[str, Any]) -> bool:
+    """Se alguma janela ainda não encheu (os valores disponíveis usam menos preços que o normal)."""
+    return len(estado["retornos"]) < JANELA or estado["variacoes"] < PERIODO_RSI
+
+
+def media(estado: Dict[str, Any]) -> Optional[int]:
+    """Média móvel dos últimos JANELA preços, em centavos (None antes de a janela encher)."""
+    if len(estado["precos"]) < JANELA:
+        return None
+    return round(estado["soma"] / JANELA)
+
+
+def volatilidade(estado: Dict[str, Any]) -> Optional[float]:
+    """Desvio padrão amostral dos retornos da janela, em % por tick (None com menos de 2 retornos)."""
+    n = len(estado["retornos"])
+    if n < 2:
+        return None
+    variancia = (estado["soma_r2"] - estado["soma_r"] ** 2 / n) / (n - 1)
+    return math.sqrt(max(variancia, 0.0))
+
+
+def rsi(estado: Dict[str, Any]) -> Optional[float]:
+    """RSI de Wilder, de 0 a 100 (None antes de PERIODO_RSI variações)."""
+    if estado["variacoes"] < PERIODO_RSI:
+        return None
+    if estado["perda"] == 0:
+        return 100.0 if estado["ganho"] > 0 else 50.0
+    return 100 - 100 / (1 + estado["ganho"] / estado["perda"])
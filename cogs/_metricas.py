@@ -0,0 +1,257 @@
+"""
+Métricas de desempenho do bot: contagem de comandos, histogramas de latência,
+erros e atraso (lag) do event loop.
+
+A latência de cada comando é dividida em fases:
+- 'total': do before_invoke ao after_invoke do comando;
+- 'fila_lock': tempo esperando o lock de uma partição de dados;
+- 'armazenamento': leitura/escrita dos arquivos de dados;
+- 'api_discord': requisições HTTP à API do Discord.
+
+O comando em execução é propagado por uma ContextVar, então qualquer código
+chamado por ele (DataManager, Mercado, ctx.send...) pode atribuir tempo à fase
+certa usando 'medir(fase)', sem receber o contexto como parâmetro.
+
+Os dados podem ser lidos pelo '!stats' (Admin) ou exportados em formato texto
+do Prometheus por um servidor HTTP local (ver 'iniciar_servidor_http').
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+FASES = ("total", "fila_lock", "armazenamento", "api_discord")
+# Limites (em segundos) dos buckets dos histogramas, como no Prometheus
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEM_COMANDO = "-"
+
+
+class Histograma:
+    """Histograma de buckets fixos (O(log b) por observação, memória constante)."""
+    __slots__ = ("limites", "contagens", "soma", "total")
+
+    def __init__(self, limites: Tuple[float, ...] = BUCKETS_PADRAO):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # o último bucket é o '+Inf'
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q: float) -> float:
+        """Estimativa do quantil por interpolação linear dentro do bucket."""
+        if self.total == 0:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            if acumulado + contagem >= alvo and contagem:
+                inicio = self.limites[i - 1] if i > 0 else 0.0
+                fim = self.limites[i] if i < len(self.limites) else self.limites[-1]
+                return inicio + (fim - inicio) * (alvo - acumulado) / contagem
+            acumulado += contagem
+        return self.limites[-1]
+
+    def cumulativo(self) -> Iterator[Tuple[str, int]]:
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            yield f"{limite:g}", acumulado
+        yield "+Inf", self.total
+
+
+@dataclass
+class Medicao:
+    """Tempo acumulado por fase durante a execução de um comando."""
+    comando: str
+    inicio: float = field(default_factory=time.perf_counter)
+    fases: Dict[str, float] = field(default_factory=dict)
+
+
+_medicao_atual: ContextVar[Optional[Medicao]] = ContextVar("medicao_atual", default=None)
+# Mesma informação indexada pela Task, para quem não pode ler a ContextVar
+# (ex: o watchdog do event loop, que roda em outra thread).
+_comandos_por_tarefa: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+
+
+class RegistroMetricas:
+    """Armazena todas as métricas do processo."""
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.invocacoes: Dict[str, int] = {}
+        self.erros: Dict[str, int] = {}
+        self.latencias: Dict[Tuple[str, str], Histograma] = {}
+        self.lag_loop = Histograma()
+        self.lag_maximo = 0.0
+
+    def _histograma(self, comando: str, fase: str) -> Histograma:
+        chave = (comando, fase)
+        histograma = self.latencias.get(chave)
+        if histograma is None:
+            histograma = self.latencias[chave] = Histograma()
+        return histograma
+
+    # --- Ciclo de vida de um comando ---
+    def iniciar_comando(self, comando: str) -> None:
+        self.invocacoes[comando] = self.invocacoes.get(comando, 0) + 1
+        _medicao_atual.set(Medicao(comando))
+        tarefa = asyncio.current_task()
+        if tarefa is not None:
+            _comandos_por_tarefa[tarefa] = comando
+
+    def finalizar_comando(self) -> None:
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return
+        _medicao_atual.set(None)
+        tarefa = asyncio.current_task()
+        if tarefa is not None:
+            _comandos_por_tarefa.pop(tarefa, None)
+        self._histograma(medicao.comando, "total").observar(time.perf_counter() - medicao.inicio)
+        for fase, duracao in medicao.fases.items():
+            self._histograma(medicao.comando, fase).observar(duracao)
+
+    def registrar_erro(self, comando: str) -> None:
+        self.erros[comando] = self.erros.get(comando, 0) + 1
+
+    # --- Fases ---
+    def registrar_fase(self, fase: str, duracao: float) -> None:
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.fases[fase] = medicao.fases.get(fase, 0.0) + duracao
+        else:
+            # Tarefas em segundo plano (ticks do mercado, evento diário...)
+            self._histograma(SEM_COMANDO, fase).observar(duracao)
+
+    def registrar_lag(self, atraso: float) -> None:
+        self.lag_loop.observar(atraso)
+        self.lag_maximo = max(self.lag_maximo, atraso)
+
+    # --- Exportação ---
+    def resumo_comandos(self) -> List[Tuple[str, int, int, float, float]]:
+        """Lista (comando, invocações, erros, p50, p99) ordenada por invocações."""
+        linhas = []
+        for comando, invocacoes in self.invocacoes.items():
+            total = self.latencias.get((comando, "total"))
+            p50 = total.quantil(0.5) if total else 0.0
+            p99 = total.quantil(0.99) if total else 0.0
+            linhas.append((comando, invocacoes, self.erros.get(comando, 0), p50, p99))
+        return sorted(linhas, key=lambda linha: linha[1], reverse=True)
+
+    def exportar_prometheus(self) -> str:
+        linhas = [
+            "# HELP domostbot_comandos_total Invocações de comandos.",
+            "# TYPE domostbot_comandos_total counter",
+        ]
+        linhas += [f'domostbot_comandos_total{{comando="{c}"}} {n}' for c, n in sorted(self.invocacoes.items())]
+        linhas += [
+            "# HELP domostbot_comandos_erros_total Erros de comandos.",
+            "# TYPE domostbot_comandos_erros_total counter",
+        ]
+        linhas += [f'domostbot_comandos_erros_total{{comando="{c}"}} {n}' for c, n in sorted(self.erros.items())]
+        linhas += [
+            "# HELP domostbot_comando_duracao_segundos Latência dos comandos por fase.",
+            "# TYPE domostbot_comando_duracao_segundos histogram",
+        ]
+        for (comando, fase), histograma in sorted(self.latencias.items()):
+            rotulos = f'comando="{comando}",fase="{fase}"'
+            linhas += [f'domostbot_comando_duracao_segundos_bucket{{{rotulos},le="{le}"}} {n}' for le, n in histograma.cumulativo()]
+            linhas.append(f"domostbot_comando_duracao_segundos_sum{{{rotulos}}} {histograma.soma}")
+            linhas.append(f"domostbot_comando_duracao_segundos_count{{{rotulos}}} {histograma.total}")
+        linhas += [
+            "# HELP domostbot_loop_lag_segundos Atraso do event loop.",
+            "# TYPE domostbot_loop_lag_segundos histogram",
+        ]
+        linhas += [f'domostbot_loop_lag_segundos_bucket{{le="{le}"}} {n}' for le, n in self.lag_loop.cumulativo()]
+        linhas.append(f"domostbot_loop_lag_segundos_sum {self.lag_loop.soma}")
+        linhas.append(f"domostbot_loop_lag_segundos_count {self.lag_loop.total}")
+        linhas.append(f"domostbot_uptime_segundos {time.time() - self.inicio:.0f}")
+        return "\n".join(linhas) + "\n"
+
+
+# Instância única do processo, compartilhada por main.py e pelos cogs.
+metricas = RegistroMetricas()
+
+
+def comando_atual() -> Optional[str]:
+    """Nome do comando em execução na tarefa atual, se houver."""
+    medicao = _medicao_atual.get()
+    return medicao.comando if medicao else None
+
+
+def comando_da_tarefa(tarefa: Optional[asyncio.Task]) -> Optional[str]:
+    """Nome do comando executado pela tarefa (seguro para chamar de outra thread)."""
+    if tarefa is None:
+        return None
+    try:
+        return _comandos_por_tarefa.get(tarefa)
+    except RuntimeError:  # dicionário alterado pela thread do loop durante a leitura
+        return None
+
+
+@contextmanager
+def medir(fase: str) -> Iterator[None]:
+    """Soma o tempo do bloco à fase informada do comando em execução."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.registrar_fase(fase, time.perf_counter() - inicio)
+
+
+class LockInstrumentado(asyncio.Lock):
+    """asyncio.Lock que registra o tempo de espera na fase 'fila_lock'."""
+
+    async def acquire(self) -> bool:
+        if not self.locked():
+            return await super().acquire()
+        with medir("fila_lock"):
+            return await super().acquire()
+
+
+def instrumentar_http(http) -> None:
+    """Envolve o HTTPClient do discord.py para medir a fase 'api_discord'."""
+    request_original = http.request
+
+    async def request(*args, **kwargs):
+        with medir("api_discord"):
+            return await request_original(*args, **kwargs)
+
+    http.request = request
+
+
+async def monitorar_lag_loop(intervalo: float = 1.0) -> None:
+    """Mede o quanto o loop demora a acordar além do intervalo pedido."""
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(intervalo)
+        metricas.registrar_lag(max(0.0, loop.time() - inicio - intervalo))
+
+
+async def iniciar_servidor_http(porta: int, host: str = "127.0.0.1"):
+    """Sobe um endpoint '/metrics' no formato texto do Prometheus. Retorna o runner."""
+    from aiohttp import web  # dependência do discord.py
+
+    async def endpoint(request: web.Request) -> web.Response:
+        return web.Response(text=metricas.exportar_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", endpoint)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, porta).start()
+    log.info(f"Endpoint de métricas disponível em http://{host}:{porta}/metrics")
+    return runner
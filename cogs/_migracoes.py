@@ -0,0 +1,53 @@
+"""
+Migrações de esquema versionadas para os documentos de dados: ao carregar uma
+partição, as migrações acima de '_meta.versao_schema' são aplicadas em ordem,
+uma única vez, e a versão é atualizada.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+
+log = logging.getLogger(__name__)
+
+Migracao = Callable[[Dict[str, Any]], None]
+
+
+class Migracoes:
+    """Sequência ordenada de migrações de um tipo de documento."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._passos: List[Tuple[int, Migracao]] = []
+
+    @property
+    def versao_atual(self) -> int:
+        return len(self._passos)
+
+    def registrar(self, versao: int) -> Callable[[Migracao], Migracao]:
+        """
+        Decorador que registra a migração 'versao' (em sequência, sem lacunas).
+        Nunca altere uma migração já publicada. A migração recebe o documento
+        inteiro, inclusive vazio, e deve usar a interface de dicionário dos
+        registros: depois de um '!reload' eles podem estar na forma compacta.
+        """
+        def decorador(funcao: Migracao) -> Migracao:
+            if versao != self.versao_atual + 1:
+                raise ValueError(f"Migração {versao} de '{self.nome}' fora de ordem (esperada {self.versao_atual + 1}).")
+            self._passos.append((versao, funcao))
+            return funcao
+        return decorador
+
+    def aplicar(self, dados: Dict[str, Any]) -> bool:
+        """Aplica as migrações pendentes. Retorna True se alguma foi aplicada."""
+        meta = dados.get("_meta", {})
+        versao = meta.get("versao_schema", 0)
+        if versao >= self.versao_atual:
+            if versao > self.versao_atual:
+                log.warning(f"Documento '{self.nome}' está na versão {versao}, mais nova que a deste código ({self.versao_atual}).")
+            return False
+        meta = dados.setdefault("_meta", meta)
+        for numero, migracao in self._passos[versao:]:
+            log.info(f"Aplicando a migração {numero} ({migracao.__name__}) em '{self.nome}'.")
+            migracao(dados)
+            meta["versao_schema"] = numero
+        return True
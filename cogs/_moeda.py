@@ -0,0 +1,74 @@
+"""
+Formatação de valores monetários no padrão brasileiro (R$ 1.234,56).
+
+Substitui as chamadas a 'locale.setlocale' que cada cog fazia a cada número
+formatado. O 'setlocale' altera um estado global do processo, não é seguro
+entre threads e é lento; aqui a formatação é feita apenas com operações de
+string e uma tabela de tradução pré-computada, sem depender do locale do
+sistema operacional.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from functools import lru_cache
+from typing import Union
+
+Numero = Union[int, float, Decimal]
+
+# Tabela pré-computada que troca os separadores do padrão americano
+# ("1,234.56") pelos do padrão brasileiro ("1.234,56") em uma única passada.
+_TRADUCAO_SEPARADORES = str.maketrans({',': '.', '.': ','})
+_VALOR_INVALIDO = "R$ 0,00"
+
+
+@lru_cache(maxsize=4096)
+def _formatar_centavos_abs(centavos: int) -> str:
+    """Formata um valor absoluto em centavos. Cacheado: valores repetem muito."""
+    reais, resto = divmod(centavos, 100)
+    return f"R$ {reais:,}".translate(_TRADUCAO_SEPARADORES) + f",{resto:02d}"
+
+
+def format_centavos(centavos: int) -> str:
+    """Formata um valor inteiro em centavos (ex: 123456 -> 'R$ 1.234,56')."""
+    try:
+        centavos = int(centavos)
+    except (ValueError, TypeError):
+        return _VALOR_INVALIDO
+    if centavos < 0:
+        return "-" + _formatar_centavos_abs(-centavos)
+    return _formatar_centavos_abs(centavos)
+
+
+def para_centavos(valor: Numero) -> int:
+    """Converte um valor em reais (int, float ou Decimal) para centavos inteiros."""
+    if isinstance(valor, int):
+        return valor * 100
+    if isinstance(valor, Decimal):
+        return int((valor * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return round(float(valor) * 100)
+
+
+def parse_valor(texto: str) -> int:
+    """
+    Converte um valor digitado pelo usuário em reais para centavos.
+    Aceita '100', '12,50', '12.50' e '1.234,56'. Levanta ValueError se inválido.
+    """
+    texto = texto.strip().replace("R$", "").strip()
+    if "," in texto:
+        # Padrão brasileiro: '.' separa milhares e ',' separa os centavos
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        valor = Decimal(texto)
+        exato = valor.is_finite() and valor == valor.quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto!r}") from None
+    if not exato:
+        raise ValueError(f"Valor com mais de duas casas decimais: {texto!r}")
+    return para_centavos(valor)
+
+
+def format_brl(valor: Numero) -> str:
+    """Formata um número em reais para o padrão de moeda brasileiro."""
+    try:
+        return format_centavos(para_centavos(valor))
+    except (ValueError, TypeError, OverflowError, InvalidOperation):
+        return _VALOR_INVALIDO
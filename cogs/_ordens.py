@@ -0,0 +1,98 @@
+"""
+Livro de ordens do mercado: ordens limitadas e stop guardadas em heaps por ação
+(chave 'ordens' da economia da guild) e executadas em lote no tick do mercado,
+retirando só as que disparam. Cancelamentos são descartados do heap depois.
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional
+
+# 'abaixo' dispara quando o preço cai até o gatilho (chave -gatilho); 'acima', quando sobe (chave gatilho).
+# Entradas [chave, id]: empates saem na ordem de criação.
+ABAIXO, ACIMA = "abaixo", "acima"
+# tipo do comando -> (lado da operação, heap)
+TIPOS_ORDEM = {
+    "compra": ("compra", ABAIXO),   # compra limitada: executa a um preço <= gatilho
+    "venda": ("venda", ACIMA),      # venda limitada: executa a um preço >= gatilho
+    "stop": ("venda", ABAIXO),      # stop loss: vende quando o preço cai até o gatilho
+}
+
+
+def livro_ordens(economia: Dict[str, Any]) -> Dict[str, Any]:
+    """Livro de ordens da guild, criado se necessário. Chame dentro de uma transação."""
+    return economia.setdefault("ordens", {"seq": 0, "por_id": {}, "livros": {}})
+
+
+def _livro_acao(ordens: Dict[str, Any], simbolo: str) -> Dict[str, Any]:
+    return ordens["livros"].setdefault(simbolo, {ABAIXO: [], ACIMA: [], "canceladas": {ABAIXO: 0, ACIMA: 0}})
+
+
+def _chave(heap: str, gatilho: int) -> int:
+    return -gatilho if heap == ABAIXO else gatilho
+
+
+def inserir(ordens: Dict[str, Any], ordem: Dict[str, Any]) -> int:
+    """Registra a ordem (que já deve ter 'simbolo', 'heap' e 'gatilho') e retorna o seu id."""
+    ordens["seq"] += 1
+    ordem["id"] = ordem_id = ordens["seq"]
+    ordens["por_id"][str(ordem_id)] = ordem
+    heapq.heappush(_livro_acao(ordens, ordem["simbolo"])[ordem["heap"]], [_chave(ordem["heap"], ordem["gatilho"]), ordem_id])
+    return ordem_id
+
+
+def cancelar(ordens: Dict[str, Any], ordem_id: int) -> Optional[Dict[str, Any]]:
+    """Remove a ordem e a retorna (None se não existe). A entrada no heap é descartada depois."""
+    ordem = ordens["por_id"].pop(str(ordem_id), None)
+    if ordem is None:
+        return None
+    livro, heap = _livro_acao(ordens, ordem["simbolo"]), ordem["heap"]
+    livro["canceladas"][heap] += 1
+    # Reconstrói o heap quando metade dele for de ordens canceladas
+    if livro["canceladas"][heap] * 2 > len(livro[heap]):
+        livro[heap] = [entrada for entrada in livro[heap] if str(entrada[1]) in ordens["por_id"]]
+        heapq.heapify(livro[heap])
+        livro["canceladas"][heap] = 0
+    return ordem
+
+
+def disparadas(ordens: Dict[str, Any], simbolo: str, preco: int) -> List[Dict[str, Any]]:
+    """Retira do livro e retorna, na ordem de prioridade, as ordens da ação que disparam a 'preco'."""
+    livro = ordens["livros"].get(simbolo)
+    if livro is None:
+        return []
+    executar = []
+    for heap, limite in ((ABAIXO, -preco), (ACIMA, preco)):
+        entradas = livro[heap]
+        # 'abaixo' dispara com gatilho >= preço (chave <= -preço); 'acima' com gatilho <= preço
+        while entradas and entradas[0][0] <= limite:
+            _, ordem_id = heapq.heappop(entradas)
+            ordem = ordens["por_id"].pop(str(ordem_id), None)
+            if ordem is None:
+                livro["canceladas"][heap] -= 1
+                continue
+            executar.append(ordem)
+    return executar
+
+
+def alguma_dispara(ordens: Dict[str, Any], series: Dict[str, List[int]]) -> bool:
+    """
+    Se alguma ordem pode disparar com os preços de 'series' ({simbolo: [preços]}),
+    olhando só o topo dos heaps e sem alterar o livro. Uma entrada cancelada no
+    topo dá um falso positivo, que 'disparadas' descarta.
+    """
+    for simbolo, precos in series.items():
+        livro = ordens["livros"].get(simbolo)
+        if livro is None or not precos:
+            continue
+        if livro[ABAIXO] and livro[ABAIXO][0][0] <= -min(precos):
+            return True
+        if livro[ACIMA] and livro[ACIMA][0][0] <= max(precos):
+            return True
+    return False
+
+
+def do_usuario(ordens: Optional[Dict[str, Any]], user_id: int) -> List[Dict[str, Any]]:
+    """Ordens abertas de um usuário, da mais antiga para a mais nova."""
+    if not ordens:
+        return []
+    return [ordem for ordem in ordens["por_id"].values() if ordem["usuario"] == str(user_id)]
@@ -0,0 +1,36 @@
+"""
+Processo separado para cálculos que não podem rodar no event loop (o '!calc'
+de expressões caras, o '!backtest').
+
+O worker é criado com 'spawn': o processo do bot tem threads vivas
+(discord.py, o flush do armazenamento, o watchdog) e um 'fork' copiaria os
+locks delas no estado em que estivessem. Num tempo limite, o
+'shutdown(cancel_futures=True)' do executor só cancela o que ainda está na
+fila; o worker que está calculando continuaria rodando, então é terminado.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+def novo_pool() -> ProcessPoolExecutor:
+    """Executor de um único worker, iniciado com 'spawn'."""
+    return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+
+def encerrar_pool(executor: Optional[ProcessPoolExecutor]) -> None:
+    """Encerra o executor sem esperar, terminando os workers (ocupados ou não) que ainda estiverem vivos."""
+    if executor is None:
+        return
+    # '_processes' é interno, mas é a única forma de chegar aos workers antes do Python 3.14
+    # ('terminate_workers'); é None depois que o executor já foi encerrado
+    processos = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for processo in processos:
+        if processo.is_alive():
+            log.debug(f"Terminando o worker {processo.pid}.")
+            processo.terminate()
@@ -0,0 +1,70 @@
+"""
+Recarga a quente ('!reload') preservando o estado dos cogs: no cog_unload, a
+instância antiga guarda os seus objetos vivos com 'guardar_estado' (se
+'em_recarga'), e o __init__ da nova os pega de volta com 'retomar_estado'.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from discord.ext import commands
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class EstadoGuardado:
+    estado: Dict[str, Any]
+    descartar: Optional[Callable[[], Awaitable[None]]] = None
+
+
+def _guardados(bot: commands.Bot) -> Dict[str, EstadoGuardado]:
+    if not hasattr(bot, "_estado_recarga"):
+        bot._estado_recarga = {}
+    return bot._estado_recarga
+
+
+def em_recarga(bot: commands.Bot) -> bool:
+    """True enquanto 'recarregar_extensao' está trocando uma extensão."""
+    return getattr(bot, "_recargas_em_andamento", 0) > 0
+
+
+def guardar_estado(bot: commands.Bot, nome: str, estado: Dict[str, Any], descartar: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+    """
+    Guarda o estado de um cog para a próxima instância (chamar no cog_unload).
+    'descartar' é chamado se nenhuma instância o retomar (ex: grava as partições pendentes).
+    """
+    _guardados(bot)[nome] = EstadoGuardado(estado, descartar)
+
+
+def retomar_estado(bot: commands.Bot, nome: str) -> Optional[Dict[str, Any]]:
+    """Retira o estado guardado por 'guardar_estado' (None se não houver)."""
+    guardado = _guardados(bot).pop(nome, None)
+    if guardado is not None:
+        log.info(f"Cog '{nome}' retomou o estado da instância anterior.")
+        return guardado.estado
+    return None
+
+
+async def recarregar_extensao(bot: commands.Bot, nome_extensao: str) -> None:
+    """'bot.reload_extension' com entrega de estado. Propaga as exceções da recarga."""
+    bot._recargas_em_andamento = getattr(bot, "_recargas_em_andamento", 0) + 1
+    try:
+        await bot.reload_extension(nome_extensao)
+    finally:
+        bot._recargas_em_andamento -= 1
+        if not em_recarga(bot):
+            await _descartar_sobras(bot)
+
+
+async def _descartar_sobras(bot: commands.Bot) -> None:
+    guardados = _guardados(bot)
+    while guardados:
+        nome, guardado = guardados.popitem()
+        log.warning(f"Estado do cog '{nome}' não foi retomado após a recarga; descartando.")
+        if guardado.descartar is not None:
+            try:
+                await guardado.descartar()
+            except Exception:
+                log.error(f"Erro ao descartar o estado do cog '{nome}':", exc_info=True)
@@ -0,0 +1,100 @@
+"""
+Registro das ações do mercado: validação de novas listagens e busca por
+símbolo ou nome da empresa. O mercado da guild continua sendo a fonte da
+verdade; 'IndiceAcoes' é só um índice de busca construído a partir dele.
+"""
+
+import difflib
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+SIMBOLO_VALIDO = re.compile(r"[A-Z0-9]{2,6}")
+TAMANHO_MAXIMO_NOME = 60
+SEMELHANCA_MINIMA = 0.6  # de 0 a 1, para difflib.get_close_matches
+
+
+def normalizar(texto: str) -> str:
+    """Forma de comparação: maiúsculas, sem acentos e com espaços simples."""
+    sem_acentos = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return " ".join(sem_acentos.upper().split())
+
+
+def validar_listagem(mercado: Dict[str, Any], simbolo: str, nome: str) -> Optional[str]:
+    """Motivo pelo qual a ação não pode ser listada, ou None se pode."""
+    if not SIMBOLO_VALIDO.fullmatch(simbolo):
+        return "O símbolo deve ter de 2 a 6 letras ou números."
+    if simbolo in mercado:
+        return f"A ação `{simbolo}` já está listada."
+    if not nome.strip() or len(nome) > TAMANHO_MAXIMO_NOME:
+        return f"O nome deve ter de 1 a {TAMANHO_MAXIMO_NOME} caracteres."
+    if any(normalizar(info["nome"]) == normalizar(nome) for info in mercado.values()):
+        return f"Já existe uma empresa chamada **{nome}**."
+    return None
+
+
+class IndiceAcoes:
+    """Índice de busca das ações de um mercado. Imutável: é refeito quando o mercado muda."""
+
+    __slots__ = ("simbolos", "_chaves", "_alvos", "_por_nome", "_candidatos")
+
+    def __init__(self, mercado: Dict[str, Any]):
+        self.simbolos = frozenset(mercado)
+        entradas = set()
+        self._por_nome: Dict[str, str] = {}
+        self._candidatos: Dict[str, str] = {}  # texto normalizado -> símbolo, para o difflib
+        for simbolo, info in mercado.items():
+            nome = normalizar(info.get("nome", ""))
+            self._por_nome[nome] = simbolo
+            self._candidatos[simbolo] = simbolo
+            self._candidatos.setdefault(nome, simbolo)
+            entradas.add((simbolo, simbolo))
+            palavras = nome.split()
+            for i in range(len(palavras)):
+                entradas.add((" ".join(palavras[i:]), simbolo))
+        ordenadas = sorted(entradas)
+        self._chaves = [chave for chave, _ in ordenadas]
+        self._alvos = [simbolo for _, simbolo in ordenadas]
+
+    def atualizado(self, mercado: Dict[str, Any]) -> bool:
+        """
+        O índice ainda corresponde ao mercado (mesmos símbolos)? Compara os
+        conjuntos, e não só o tamanho: um '!deslistar' seguido de um '!listar'
+        em outra instância (ou um arquivo trocado) mantém o número de ações.
+        """
+        return self.simbolos == mercado.keys()
+
+    def resolver(self, texto: str) -> Optional[str]:
+        """Símbolo da ação cujo símbolo ou nome é exatamente 'texto' (None se nenhuma)."""
+        chave = normalizar(texto)
+        if chave in self.simbolos:
+            return chave
+        return self._por_nome.get(chave)
+
+    def prefixo(self, texto: str, limite: int = 10) -> List[str]:
+        """Ações cujo símbolo, nome ou alguma palavra do nome começa com 'texto', sem repetir."""
+        chave = normalizar(texto)
+        if not chave:
+            return []
+        resultado: List[str] = []
+        i = bisect_left(self._chaves, chave)
+        while i < len(self._chaves) and self._chaves[i].startswith(chave) and len(resultado) < limite:
+            if self._alvos[i] not in resultado:
+                resultado.append(self._alvos[i])
+            i += 1
+        return resultado
+
+    def aproximados(self, texto: str, limite: int = 3) -> List[str]:
+        """Ações com símbolo ou nome parecido com 'texto' (erros de digitação), da mais parecida para a menos."""
+        parecidos = difflib.get_close_matches(normalizar(texto), self._candidatos, n=limite * 2, cutoff=SEMELHANCA_MINIMA)
+        resultado: List[str] = []
+        for candidato in parecidos:
+            simbolo = self._candidatos[candidato]
+            if simbolo not in resultado:
+                resultado.append(simbolo)
+        return resultado[:limite]
+
+    def buscar(self, texto: str, limite: int = 10) -> List[str]:
+        """Busca por prefixo; se não achar nada, busca aproximada."""
+        return self.prefixo(texto, limite) or self.aproximados(texto, limite)
@@ -0,0 +1,119 @@
+"""
+Serialização dos snapshots de dados (economia, mercado, histórico...) no formato
+de $FORMATO_DADOS: JSON compacto, msgpack ou indexado. A leitura reconhece
+qualquer um deles, inclusive o JSON indentado antigo, pelo cabeçalho do arquivo.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+MAGICO_MSGPACK = b"\x00DMSP1\n"
+MAGICO_INDEXADO = b"\x00DMSI1\n"
+FORMATOS = ("json", "msgpack", "indexado")
+
+
+def formato_padrao() -> str:
+    """Formato usado nas gravações ($FORMATO_DADOS, 'json' por padrão)."""
+    formato = os.getenv('FORMATO_DADOS', 'json').lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de dados desconhecido: '{formato}'")
+    if formato == 'msgpack' and msgpack is None:
+        raise ValueError("FORMATO_DADOS=msgpack requer o pacote 'msgpack' (pip install msgpack).")
+    return formato
+
+
+def _para_tipos_basicos(objeto: Any) -> Any:
+    para_dict = getattr(objeto, "para_dict", None)
+    if para_dict is None:
+        raise TypeError(f"Objeto do tipo '{type(objeto).__name__}' não é serializável")
+    return para_dict()
+
+
+def para_json_bytes(dados: Any) -> bytes:
+    """JSON compacto em UTF-8."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(dados, default=_para_tipos_basicos)
+        except TypeError:
+            pass  # ex: inteiros maiores que 64 bits, que o orjson não aceita
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':'), default=_para_tipos_basicos).encode('utf-8')
+
+
+def para_json(dados: Any) -> str:
+    """JSON compacto em texto (usado também pelas linhas do backend SQLite)."""
+    return para_json_bytes(dados).decode('utf-8')
+
+
+def de_json(texto: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(texto)
+    return json.loads(texto)
+
+
+def preparar(dados: Any, formato: str) -> None:
+    """
+    Lê os registros que ainda estão no arquivo de um snapshot indexado, se o
+    'formato' de gravação precisar do dict inteiro. Chame no event loop antes
+    de passar 'dados' a 'serializar' em uma thread: leituras no loop também
+    materializam registros, e as duas não podem alterar o dict ao mesmo tempo.
+    """
+    materializar_tudo = getattr(dados, 'materializar_tudo', None)
+    if formato != 'indexado' and materializar_tudo is not None:
+        materializar_tudo()
+
+
+def serializar(dados: Any, formato: str = None) -> bytes:
+    """Codifica 'dados' no formato pedido (ou no padrão) para gravação em arquivo."""
+    formato = formato or formato_padrao()
+    if formato == 'indexado':
+        from cogs._snapshot_indexado import codificar
+        return codificar(dados)
+    preparar(dados, formato)  # sem efeito se o chamador já preparou
+    if formato == 'msgpack':
+        return MAGICO_MSGPACK + msgpack.packb(dados, use_bin_type=True, default=_para_tipos_basicos)
+    return para_json_bytes(dados)
+
+
+def carregar(conteudo: bytes, classe_indexada: Optional[type] = None) -> Any:
+    """
+    Decodifica o conteúdo de um arquivo em qualquer formato suportado.
+    Levanta ValueError se o conteúdo estiver corrompido. Snapshots indexados
+    viram 'classe_indexada' (padrão: SnapshotIndexado).
+    """
+    if conteudo.startswith(MAGICO_INDEXADO):
+        from cogs._snapshot_indexado import SnapshotIndexado
+        return (classe_indexada or SnapshotIndexado)(conteudo)
+    if conteudo.startswith(MAGICO_MSGPACK):
+        if msgpack is None:
+            raise ValueError("Arquivo em msgpack, mas o pacote 'msgpack' não está instalado.")
+        try:
+            return msgpack.unpackb(conteudo[len(MAGICO_MSGPACK):], raw=False, strict_map_key=False)
+        except Exception as e:  # o msgpack levanta vários tipos de erro para dados inválidos
+            raise ValueError(f"msgpack inválido: {e}") from e
+    return de_json(conteudo)  # JSONDecodeError (e o erro do orjson) são ValueError
+
+
+def carregar_arquivo(caminho: Path, classe_indexada: Optional[type] = None) -> Any:
+    """
+    Como 'carregar', a partir de um arquivo (vazio: {}). Snapshots indexados
+    são mapeados em memória em vez de lidos.
+    """
+    with open(caminho, 'rb') as arquivo:
+        inicio = arquivo.read(len(MAGICO_INDEXADO))
+        if inicio == MAGICO_INDEXADO:
+            from cogs._snapshot_indexado import SnapshotIndexado, abrir
+            return abrir(arquivo, classe_indexada or SnapshotIndexado)
+        conteudo = inicio + arquivo.read()
+    return carregar(conteudo, classe_indexada) if conteudo.strip() else {}
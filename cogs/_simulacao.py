@@ -0,0 +1,58 @@
+"""
+Modelo de preços do mercado: a cada tick o preço varia por um percentual
+sorteado conforme a tendência da ação (sem ficar abaixo de PRECO_MINIMO), e a
+tendência é sorteada de novo com 1/4 de chance.
+"""
+
+import math
+import random
+from typing import List, Tuple
+
+import numpy as np
+
+PRECO_MINIMO = 1_00
+TENDENCIAS = ("alta", "baixa", "estavel")
+# tendência -> (menor, maior) variação percentual por tick
+VARIACOES = {"alta": (-0.03, 0.10), "baixa": (-0.10, 0.03), "estavel": (-0.05, 0.05)}
+CHANCE_TROCA_TENDENCIA = 0.25
+
+
+def um_tick(preco: int, tendencia: str) -> Tuple[int, str]:
+    """Aplica um tick ao preço (em centavos). Retorna (novo preço, nova tendência)."""
+    menor, maior = VARIACOES.get(tendencia, VARIACOES["estavel"])
+    novo_preco = max(round(preco * (1 + random.uniform(menor, maior))), PRECO_MINIMO)
+    if random.randint(1, 4) == 1:
+        tendencia = random.choice(TENDENCIAS)
+    return novo_preco, tendencia
+
+
+def simular_ticks(preco: int, tendencia: str, n: int, rng: np.random.Generator = None) -> Tuple[List[int], str]:
+    """
+    Aplica 'n' ticks seguidos ao preço, vetorizado com numpy (ex: os ticks
+    perdidos com o bot fora do ar). Mesmo modelo de 'um_tick', mas o preço só
+    é arredondado para centavos na saída. Retorna (os n preços, do mais antigo
+    ao mais novo, e a tendência final).
+    """
+    if n <= 0:
+        return [], tendencia
+    rng = rng if rng is not None else np.random.default_rng()
+
+    # Tendência em vigor em cada tick (índices em TENDENCIAS)
+    inicial = TENDENCIAS.index(tendencia) if tendencia in TENDENCIAS else TENDENCIAS.index("estavel")
+    troca = rng.random(n) < CHANCE_TROCA_TENDENCIA
+    sorteadas = rng.integers(0, len(TENDENCIAS), n)
+    ultima_troca = np.maximum.accumulate(np.where(troca, np.arange(n), -1))
+    depois = np.where(ultima_troca >= 0, sorteadas[np.maximum(ultima_troca, 0)], inicial)  # tendência após cada tick
+    vigente = np.concatenate(([inicial], depois[:-1]))
+
+    menores = np.array([VARIACOES[t][0] for t in TENDENCIAS])[vigente]
+    maiores = np.array([VARIACOES[t][1] for t in TENDENCIAS])[vigente]
+    passos = np.log1p(menores + (maiores - menores) * rng.random(n))
+
+    # Passeio aleatório com piso (recursão de Lindley): com y = x - piso, y[n] = S[n] - min(-y[0], min(S[1..n]))
+    piso = math.log(PRECO_MINIMO)
+    y0 = max(math.log(preco) - piso, 0.0)
+    soma = np.cumsum(passos)
+    y = soma - np.minimum(np.minimum.accumulate(soma), -y0)
+    precos = np.maximum(np.rint(np.exp(y + piso)), PRECO_MINIMO).astype(np.int64)
+    return precos.tolist(), TENDENCIAS[int(depois[-1])]
@@ -0,0 +1,345 @@
+"""
+Snapshot indexado ('FORMATO_DADOS=indexado'): cada conta de usuário é gravada
+separadamente, com um índice ordenado por chave, para que abrir uma partição
+grande não decodifique todos os usuários; cada registro é lido no primeiro acesso.
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from cogs._serializacao import MAGICO_INDEXADO, de_json, para_json_bytes
+
+# Arquivo: MAGICO_INDEXADO, cabeçalho, bloco comum (JSON com o que não é indexado),
+# índice (chave, offset e tamanho de cada registro) e os valores, na ordem do índice
+LARGURA_CHAVE = 24  # ids do Discord têm até 20 dígitos
+_CABECALHO = struct.Struct("<IIQ")
+_ENTRADA = struct.Struct(f"<{LARGURA_CHAVE}sQI")
+_DTYPE_ENTRADA = np.dtype([("chave", f"S{LARGURA_CHAVE}"), ("offset", "<u8"), ("tamanho", "<u4")])  # mesmo layout, sem alinhamento
+_INICIO_COMUM = len(MAGICO_INDEXADO) + _CABECALHO.size
+_AUSENTE = object()
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def _chave_indice(chave: str) -> Optional[bytes]:
+    """A chave como aparece no índice (sem os zeros do final), ou None se ela não cabe nele."""
+    codificada = chave.encode("utf-8")
+    if len(codificada) > LARGURA_CHAVE or not chave.isprintable():  # '\\0' se confundiria com o preenchimento
+        return None
+    return codificada
+
+
+def _chave_indexada(chave: str, valor: Any) -> Optional[bytes]:
+    """Chave do índice do registro, ou None se ele vai para o bloco comum."""
+    if chave[:1] == "_" or not (type(valor) is dict or isinstance(valor, Mapping)):
+        return None
+    return _chave_indice(chave)
+
+
+class SnapshotIndexado(dict):
+    """
+    Partição lida de um snapshot indexado: um dict com os registros já
+    materializados, que busca os demais no arquivo no primeiro acesso.
+
+    'converter(chave, valor)', se definido, é aplicado a cada registro
+    materializado (ver 'converter' em cogs/_armazenamento.py).
+    """
+
+    __slots__ = ("_buffer", "_n", "_inicio_indice", "_removidas", "_sombreadas", "converter")
+
+    def __init__(self, buffer: Buffer):
+        if len(buffer) < _INICIO_COMUM or buffer[:len(MAGICO_INDEXADO)] != MAGICO_INDEXADO:
+            raise ValueError("Snapshot indexado inválido: cabeçalho ausente")
+        largura, n, tamanho_comum = _CABECALHO.unpack_from(buffer, len(MAGICO_INDEXADO))
+        if largura != LARGURA_CHAVE:
+            raise ValueError(f"Snapshot indexado com chaves de {largura} bytes (esperado: {LARGURA_CHAVE})")
+        inicio_indice = _INICIO_COMUM + tamanho_comum
+        if inicio_indice + n * _ENTRADA.size > len(buffer):
+            raise ValueError("Snapshot indexado truncado")
+        comum = de_json(buffer[_INICIO_COMUM:inicio_indice])
+        if not isinstance(comum, dict):
+            raise ValueError("Snapshot indexado inválido: bloco comum não é um objeto")
+        super().__init__(comum)
+        self._buffer = buffer
+        self._n = n
+        self._inicio_indice = inicio_indice
+        self._removidas = set()  # chaves do índice apagadas (e não recriadas)
+        self._sombreadas = 0     # chaves do índice que estão no dict (materializadas ou sobrescritas)
+        self.converter: Optional[Callable[[str, Any], Any]] = None
+
+    # --- Índice ---
+    def _buscar(self, chave: str) -> Optional[Tuple[int, int]]:
+        """(offset, tamanho) do valor da chave no arquivo, por busca binária, ou None."""
+        if not isinstance(chave, str):
+            return None
+        alvo = _chave_indice(chave)
+        if alvo is None:
+            return None
+        alvo = alvo.ljust(LARGURA_CHAVE, b"\0")
+        buffer, inicio, passo = self._buffer, self._inicio_indice, _ENTRADA.size
+        baixo, alto = 0, self._n
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            posicao = inicio + meio * passo
+            if buffer[posicao:posicao + LARGURA_CHAVE] < alvo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        if baixo < self._n:
+            chave_indice, offset, tamanho = _ENTRADA.unpack_from(buffer, inicio + baixo * passo)
+            if chave_indice == alvo:
+                return offset, tamanho
+        return None
+
+    def _entradas(self) -> Iterator[Tuple[bytes, int, int]]:
+        """Todas as entradas do índice (chave completada com zeros, offset, tamanho), em ordem."""
+        fim = self._inicio_indice + self._n * _ENTRADA.size
+        with memoryview(self._buffer)[self._inicio_indice:fim] as indice:
+            yield from _ENTRADA.iter_unpack(indice)
+
+    def _pendente(self, chave: str) -> Optional[Tuple[int, int]]:
+        """Posição de uma chave que está só no arquivo (o chamador já verificou que ela não está no dict)."""
+        if chave in self._removidas:
+            return None
+        return self._buscar(chave)
+
+    def _materializar(self, chave: str, offset: int, tamanho: int) -> Any:
+        valor = de_json(self._buffer[offset:offset + tamanho])
+        if self.converter is not None:
+            valor = self.converter(chave, valor)
+        dict.__setitem__(self, chave, valor)
+        self._sombreadas += 1
+        return valor
+
+    def pendentes(self) -> int:
+        """Quantos registros ainda não foram lidos do arquivo."""
+        return self._n - len(self._removidas) - self._sombreadas
+
+    def materializar_tudo(self) -> None:
+        """Lê do arquivo todos os registros que ainda não foram lidos."""
+        if not self.pendentes():
+            return
+        for chave_indice, offset, tamanho in self._entradas():
+            chave = chave_indice.rstrip(b"\0").decode("utf-8")
+            if not dict.__contains__(self, chave) and chave not in self._removidas:
+                self._materializar(chave, offset, tamanho)
+
+    # --- Interface de dicionário ---
+    def __missing__(self, chave: str) -> Any:
+        posicao = self._pendente(chave)
+        if posicao is None:
+            raise KeyError(chave)
+        return self._materializar(chave, *posicao)
+
+    def get(self, chave: str, padrao: Any = None) -> Any:
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    def __contains__(self, chave: object) -> bool:
+        return dict.__contains__(self, chave) or self._pendente(chave) is not None
+
+    def __setitem__(self, chave: str, valor: Any) -> None:
+        if not dict.__contains__(self, chave) and self._buscar(chave) is not None:
+            self._removidas.discard(chave)
+            self._sombreadas += 1
+        dict.__setitem__(self, chave, valor)
+
+    def __delitem__(self, chave: str) -> None:
+        if dict.__contains__(self, chave):
+            dict.__delitem__(self, chave)
+            if self._buscar(chave) is not None:
+                self._sombreadas -= 1
+                self._removidas.add(chave)
+        elif self._pendente(chave) is not None:
+            self._removidas.add(chave)
+        else:
+            raise KeyError(chave)
+
+    def pop(self, chave: str, *padrao: Any) -> Any:
+        try:
+            valor = self[chave]
+        except KeyError:
+            if padrao:
+                return padrao[0]
+            raise
+        del self[chave]
+        return valor
+
+    def popitem(self) -> Tuple[str, Any]:
+        self.materializar_tudo()
+        chave = next(reversed(dict.keys(self)), _AUSENTE)
+        if chave is _AUSENTE:
+            raise KeyError("popitem(): o dicionário está vazio")
+        return chave, self.pop(chave)
+
+    def setdefault(self, chave: str, padrao: Any = None) -> Any:
+        try:
+            return self[chave]
+        except KeyError:
+            self[chave] = padrao
+            return padrao
+
+    def update(self, *args, **kwargs) -> None:
+        for chave, valor in dict(*args, **kwargs).items():
+            self[chave] = valor
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self._n, self._removidas, self._sombreadas = 0, set(), 0
+
+    def copy(self) -> Dict[str, Any]:
+        self.materializar_tudo()
+        return dict(dict.items(self))
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + self.pendentes()
+
+    def __iter__(self):
+        self.materializar_tudo()
+        return dict.__iter__(self)
+
+    def __reversed__(self):
+        self.materializar_tudo()
+        return dict.__reversed__(self)
+
+    def keys(self):
+        self.materializar_tudo()
+        return dict.keys(self)
+
+    def values(self):
+        self.materializar_tudo()
+        return dict.values(self)
+
+    def items(self):
+        self.materializar_tudo()
+        return dict.items(self)
+
+    def __eq__(self, outro: object) -> bool:
+        self.materializar_tudo()
+        if isinstance(outro, SnapshotIndexado):
+            outro.materializar_tudo()
+        return dict.__eq__(self, outro)
+
+    def __ne__(self, outro: object) -> bool:
+        igual = self.__eq__(outro)
+        return igual if igual is NotImplemented else not igual
+
+    def __repr__(self) -> str:
+        return f"<SnapshotIndexado: {len(self)} registros, {self.pendentes()} ainda no arquivo>"
+
+
+def abrir(arquivo: BinaryIO, classe: Type[SnapshotIndexado] = SnapshotIndexado) -> SnapshotIndexado:
+    """Abre um snapshot indexado a partir de um arquivo aberto em modo binário ('classe': uma subclasse)."""
+    if os.name == "nt":  # um arquivo mapeado não pode ser substituído pelo os.replace da gravação
+        arquivo.seek(0)
+        return classe(arquivo.read())
+    return classe(mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _localizar(chaves_antigas: np.ndarray, chaves: List[bytes]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(chaves como array, posição de cada uma no índice antigo ordenado, se ela está nele)."""
+    alvo = np.array(chaves, dtype=_DTYPE_ENTRADA["chave"])
+    posicoes = np.searchsorted(chaves_antigas, alvo)
+    existe = posicoes < len(chaves_antigas)
+    existe[existe] = chaves_antigas[posicoes[existe]] == alvo[existe]
+    return alvo, posicoes, existe
+
+
+def codificar(dados: Dict[str, Any]) -> bytes:
+    """
+    Codifica 'dados' como snapshot indexado.
+
+    Se 'dados' veio de um snapshot indexado, só os registros materializados
+    são codificados; os trechos do arquivo antigo entre eles são copiados
+    como estão, então o custo em Python é proporcional aos registros lidos,
+    e não ao total (o resto é cópia de bytes e numpy).
+    """
+    if isinstance(dados, SnapshotIndexado):
+        buffer, removidas = dados._buffer, set(dados._removidas)
+        antigo = np.frombuffer(buffer, dtype=_DTYPE_ENTRADA, count=dados._n, offset=dados._inicio_indice)
+    else:
+        buffer, removidas, antigo = b"", set(), np.zeros(0, dtype=_DTYPE_ENTRADA)
+    # Cópia atômica do que já está no dict (sem passar pelo 'keys' sobrescrito):
+    # a gravação roda em uma thread, e leituras no event loop podem materializar
+    # registros enquanto ela acontece.
+    atual = dict(dict.items(dados))
+
+    comum: Dict[str, Any] = {}
+    indexados: List[Tuple[bytes, Any]] = []
+    for chave, valor in atual.items():
+        chave_indice = _chave_indexada(chave, valor)
+        if chave_indice is None:
+            comum[chave] = valor
+            removidas.add(chave)  # se a chave estava no índice, o valor mudou de tipo
+        else:
+            indexados.append((chave_indice, valor))
+    indexados.sort(key=lambda registro: registro[0])
+    blobs = [para_json_bytes(valor) for _, valor in indexados]
+    tamanhos_blobs = np.fromiter(map(len, blobs), dtype=np.uint64, count=len(blobs))
+
+    chaves_antigas = antigo["chave"]
+    alvo, posicoes, existe = _localizar(chaves_antigas, [chave_indice for chave_indice, _ in indexados])
+    _, posicoes_removidas, existe_removidas = _localizar(chaves_antigas, [c for c in map(_chave_indice, removidas) if c is not None])
+    apagadas = np.zeros(len(antigo), dtype=bool)
+    apagadas[posicoes_removidas[existe_removidas]] = True
+
+    # Índice novo: o antigo com os tamanhos substituídos, sem as apagadas e com as novas inseridas em ordem
+    tamanhos = antigo["tamanho"].astype(np.uint64)
+    tamanhos[posicoes[existe]] = tamanhos_blobs[existe]
+    novas = ~existe
+    apagadas_antes = np.concatenate(([0], np.cumsum(apagadas)))
+    insercoes = posicoes[novas] - apagadas_antes[posicoes[novas]]
+    chaves_final = np.insert(chaves_antigas[~apagadas], insercoes, alvo[novas])
+    tamanhos_final = np.insert(tamanhos[~apagadas], insercoes, tamanhos_blobs[novas])
+
+    bloco_comum = para_json_bytes(comum)
+    indice = np.empty(len(chaves_final), dtype=_DTYPE_ENTRADA)
+    indice["chave"] = chaves_final
+    indice["tamanho"] = tamanhos_final
+    inicio_valores = _INICIO_COMUM + len(bloco_comum) + indice.nbytes
+    indice["offset"] = inicio_valores + np.cumsum(tamanhos_final, dtype=np.uint64) - tamanhos_final
+
+    # Valores: trechos contíguos do arquivo antigo entre as posições alteradas.
+    # 'indexados' está em ordem de chave, então as posições já estão em ordem,
+    # e uma inserção vem antes da entrada antiga da mesma posição; as apagadas
+    # são intercaladas.
+    offsets_antigos, tamanhos_antigos = antigo["offset"], antigo["tamanho"]
+    valores: List[bytes] = []
+    cursor = 0
+
+    def copiar_ate(posicao: int) -> None:
+        nonlocal cursor
+        if posicao > cursor:  # entradas antigas intactas [cursor, posicao): um único trecho
+            inicio = int(offsets_antigos[cursor])
+            fim = int(offsets_antigos[posicao - 1]) + int(tamanhos_antigos[posicao - 1])
+            valores.append(buffer[inicio:fim])
+            cursor = posicao
+
+    pendentes_apagar = np.flatnonzero(apagadas).tolist()
+    i = 0
+    for posicao, substitui, blob in zip(posicoes.tolist(), existe.tolist(), blobs):
+        while i < len(pendentes_apagar) and pendentes_apagar[i] < posicao:
+            copiar_ate(pendentes_apagar[i])
+            cursor, i = pendentes_apagar[i] + 1, i + 1
+        copiar_ate(posicao)
+        valores.append(blob)
+        if substitui:
+            cursor = posicao + 1
+    for posicao in pendentes_apagar[i:]:
+        copiar_ate(posicao)
+        cursor = posicao + 1
+    copiar_ate(len(antigo))
+    return b"".join((
+        MAGICO_INDEXADO,
+        _CABECALHO.pack(LARGURA_CHAVE, len(indice), len(bloco_comum)),
+        bloco_comum,
+        indice.tobytes(),
+        *valores,
+    ))
@@ -1,49 +1,136 @@
 import ast
+import asyncio
+import math
 import operator as op
-import locale
-from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from cogs._processos import encerrar_pool, novo_pool
+
+Numero = Union[int, float]
+
+# --- Limites de recursos da calculadora ---
+TAMANHO_MAXIMO_EXPRESSAO = 200   # caracteres
+PROFUNDIDADE_MAXIMA_AST = 30     # níveis de aninhamento
+EXPOENTE_MAXIMO = 1000           # valor absoluto do expoente em '**'
+DIGITOS_MAXIMOS_RESULTADO = 300  # ordem de grandeza de qualquer valor intermediário
+TEMPO_LIMITE_CALCULO = 2.0       # segundos no worker
+INSTRUCOES_CUSTOSAS = 64         # acima disso a avaliação vai para o worker
+
+class LimiteExcedido(ValueError):
+    """A expressão ultrapassa algum dos limites de recursos da calculadora."""
+
+def _verificar_magnitude(valor: Numero) -> Numero:
+    if isinstance(valor, complex):
+        raise TypeError("Resultados complexos não são suportados.")
+    if isinstance(valor, int):
+        # bit_length é O(1) e evita converter inteiros gigantes para string
+        if valor.bit_length() > DIGITOS_MAXIMOS_RESULTADO * 3.33:
+            raise LimiteExcedido(f"Resultado maior que 10^{DIGITOS_MAXIMOS_RESULTADO}.")
+    elif math.isinf(valor) or (valor and abs(valor) >= 10.0 ** DIGITOS_MAXIMOS_RESULTADO):
+        raise LimiteExcedido(f"Resultado maior que 10^{DIGITOS_MAXIMOS_RESULTADO}.")
+    return valor
+
+def _pow_seguro(base: Numero, expoente: Numero) -> Numero:
+    """Potência que recusa expoentes grandes antes de calcular."""
+    if abs(expoente) > EXPOENTE_MAXIMO:
+        raise LimiteExcedido(f"Expoente maior que {EXPOENTE_MAXIMO}.")
+    if base and expoente * math.log10(abs(base)) > DIGITOS_MAXIMOS_RESULTADO:
+        raise LimiteExcedido(f"Resultado maior que 10^{DIGITOS_MAXIMOS_RESULTADO}.")
+    return op.pow(base, expoente)
 
 # Dicionário que mapeia nós da AST para funções de operador seguras
 _OPERATORS = {
     ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul,
-    ast.Div: op.truediv, ast.Pow: op.pow, ast.USub: op.neg
+    ast.Div: op.truediv, ast.Pow: _pow_seguro, ast.USub: op.neg
 }
 
+# Um programa compilado é uma sequência plana em notação pós-fixa:
+# (0, constante) empilha um número; (1, função) aplica um operador unário;
+# (2, função) aplica um operador binário aos dois últimos valores.
+Programa = Tuple[Tuple[int, object], ...]
+
+def _compilar_no(node: ast.AST, saida: list, profundidade: int) -> None:
+    if profundidade > PROFUNDIDADE_MAXIMA_AST:
+        raise LimiteExcedido(f"Expressão aninhada demais (máximo de {PROFUNDIDADE_MAXIMA_AST} níveis).")
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise TypeError(f"Constante não permitida: {node.value!r}")
+        saida.append((0, _verificar_magnitude(node.value)))
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _OPERATORS:
+            raise TypeError(f"Operador binário não permitido: {type(node.op).__name__}")
+        _compilar_no(node.left, saida, profundidade + 1)
+        _compilar_no(node.right, saida, profundidade + 1)
+        saida.append((2, _OPERATORS[type(node.op)]))
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _OPERATORS:
+            raise TypeError(f"Operador unário não permitido: {type(node.op).__name__}")
+        _compilar_no(node.operand, saida, profundidade + 1)
+        saida.append((1, _OPERATORS[type(node.op)]))
+    else:
+        raise TypeError(f"Operação não permitida: {type(node).__name__}")
+
+@lru_cache(maxsize=512)
+def compilar_expressao(expression: str) -> Programa:
+    """Analisa e compila uma expressão. O resultado fica em cache (LRU)."""
+    if len(expression) > TAMANHO_MAXIMO_EXPRESSAO:
+        raise LimiteExcedido(f"Expressão maior que {TAMANHO_MAXIMO_EXPRESSAO} caracteres.")
+    tree = ast.parse(expression.replace('^', '**'), mode='eval').body
+    saida: list = []
+    _compilar_no(tree, saida, 0)
+    return tuple(saida)
+
+def avaliar_programa(programa: Programa) -> Numero:
+    """Executa um programa compilado com uma pilha, sem recursão."""
+    pilha: list = []
+    for tipo, arg in programa:
+        if tipo == 0:
+            pilha.append(arg)
+        elif tipo == 1:
+            pilha.append(_verificar_magnitude(arg(pilha.pop())))
+        else:
+            direita = pilha.pop()
+            pilha.append(_verificar_magnitude(arg(pilha.pop(), direita)))
+    return pilha[0]
+
+def _eh_custoso(programa: Programa) -> bool:
+    return len(programa) > INSTRUCOES_CUSTOSAS or any(arg is _pow_seguro for _, arg in programa)
+
 class SafeCalculator:
     """
     Uma calculadora que avalia expressões matemáticas de forma segura,
     analisando a Árvore de Sintaxe Abstrata (AST) da expressão.
+
+    As expressões são compiladas uma única vez para uma lista plana de
+    instruções (com cache LRU) e avaliadas respeitando limites de tamanho,
+    profundidade, expoente e magnitude. Expressões potencialmente caras são
+    avaliadas em um processo separado, com tempo limite.
     """
-    def _eval_node(self, node: ast.AST):
-        if isinstance(node, ast.Constant):
-            return node.n
-        elif isinstance(node, ast.BinOp):
-            if type(node.op) not in _OPERATORS:
-                raise TypeError(f"Operador binário não permitido: {type(node.op).__name__}")
-            return _OPERATORS[type(node.op)](self._eval_node(node.left), self._eval_node(node.right))
-        elif isinstance(node, ast.UnaryOp):
-            if type(node.op) not in _OPERATORS:
-                raise TypeError(f"Operador unário não permitido: {type(node.op).__name__}")
-            return _OPERATORS[type(node.op)](self._eval_node(node.operand))
-        else:
-            raise TypeError(f"Operação não permitida: {type(node).__name__}")
-
-    def calculate(self, expression: str) -> float:
-        expression = expression.replace('^', '**')
-        tree = ast.parse(expression, mode='eval').body
-        return self._eval_node(tree)
-
-def format_brl(valor: Union[int, float]) -> str:
-    """Formata um número para o padrão de moeda brasileiro. Usa um fallback robusto."""
-    try:
-        # Tenta usar o locale do sistema para a formatação ideal
-        locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-        return locale.currency(float(valor), grouping=True, symbol="R$")
-    except (ValueError, TypeError, ImportError, locale.Error):
-        # Fallback manual caso o locale não esteja disponível no sistema
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def calculate(self, expression: str) -> Numero:
+        return avaliar_programa(compilar_expressao(expression))
+
+    async def calculate_async(self, expression: str, timeout: float = TEMPO_LIMITE_CALCULO) -> Numero:
+        """Versão para o event loop: nunca executa cálculos caros na thread do bot."""
+        programa = compilar_expressao(expression)
+        if not _eh_custoso(programa):
+            return avaliar_programa(programa)
+
+        if self._executor is None:
+            self._executor = novo_pool()
+        loop = asyncio.get_running_loop()
         try:
-            a = f'{float(valor):,.2f}'
-            b = a.replace(',', 'v').replace('.', ',').replace('v', '.')
-            return f"R$ {b}"
-        except (ValueError, TypeError):
-            return "R$ 0,00"
\ No newline at end of file
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, avaliar_programa, programa), timeout)
+        except asyncio.TimeoutError:
+            # O worker continuaria preso no cálculo: termina-o e cria outro na próxima vez.
+            self.close()
+            raise LimiteExcedido(f"O cálculo excedeu o tempo limite de {timeout:.0f}s.") from None
+
+    def close(self) -> None:
+        """Encerra o processo worker, se existir."""
+        encerrar_pool(self._executor)
+        self._executor = None
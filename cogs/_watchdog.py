@@ -0,0 +1,106 @@
+"""
+Detector de travamentos do event loop (opt-in).
+
+Uma thread auxiliar acompanha um "batimento" que o próprio loop atualiza a
+cada 'intervalo'. Se o batimento atrasar mais que 'limiar', o loop está
+bloqueado por código síncrono (dump de JSON, renderização do matplotlib...):
+a thread passa a amostrar a pilha da thread do loop até ele voltar e então
+registra no log a duração, o comando que estava rodando e a pilha mais
+frequente entre as amostras.
+
+Também permite ligar o modo debug do asyncio, que registra no logger
+'asyncio' todo callback mais lento que 'slow_callback_duration'.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+from cogs._metricas import comando_da_tarefa
+
+log = logging.getLogger(__name__)
+
+PROFUNDIDADE_PILHA = 12  # quadros mais internos guardados por amostra
+
+
+class VigiaLoop:
+    """Watchdog do event loop baseado em batimentos e amostragem de pilha."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, limiar: float = 0.5, intervalo: float = 0.05):
+        self.loop = loop
+        self.limiar = limiar
+        self.intervalo = intervalo
+        self.travamentos = 0
+        self._ultimo_batimento = time.monotonic()
+        self._thread_loop_id: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lado do event loop ---
+    def _batimento(self) -> None:
+        self._ultimo_batimento = time.monotonic()
+        self._handle = self.loop.call_later(self.intervalo, self._batimento)
+
+    def iniciar(self) -> None:
+        """Deve ser chamado de dentro do event loop."""
+        self._thread_loop_id = threading.get_ident()
+        self._batimento()
+        self._thread = threading.Thread(target=self._vigiar, name="vigia-loop", daemon=True)
+        self._thread.start()
+        log.info(f"Watchdog do event loop ativo (limiar de {self.limiar * 1000:.0f}ms).")
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._handle:
+            self._handle.cancel()
+
+    # --- Lado da thread auxiliar ---
+    def _amostrar(self) -> Optional[str]:
+        frame = sys._current_frames().get(self._thread_loop_id)
+        if frame is None:
+            return None
+        return "".join(traceback.format_stack(frame)[-PROFUNDIDADE_PILHA:])
+
+    def _vigiar(self) -> None:
+        while not self._parar.wait(self.intervalo / 2):
+            atraso = time.monotonic() - self._ultimo_batimento
+            if atraso > self.limiar:
+                self._registrar_travamento()
+
+    def _registrar_travamento(self) -> None:
+        """Amostra a pilha enquanto o loop estiver bloqueado e registra o resultado."""
+        inicio_batimento = self._ultimo_batimento
+        comando = comando_da_tarefa(asyncio.current_task(self.loop)) or "(nenhum comando)"
+        amostras: Counter = Counter()
+        primeira = self._amostrar()
+        if primeira:
+            amostras[primeira] += 1
+        log.warning(f"Event loop bloqueado há mais de {self.limiar * 1000:.0f}ms durante '{comando}'. Amostrando a pilha...")
+
+        while self._ultimo_batimento == inicio_batimento and not self._parar.wait(self.intervalo):
+            pilha = self._amostrar()
+            if pilha:
+                amostras[pilha] += 1
+
+        self.travamentos += 1
+        duracao = time.monotonic() - inicio_batimento
+        if amostras:
+            pilha, vezes = amostras.most_common(1)[0]
+            log.warning(
+                f"Event loop ficou bloqueado por {duracao * 1000:.0f}ms durante '{comando}' "
+                f"({sum(amostras.values())} amostras). Pilha mais frequente ({vezes}x):\n{pilha}"
+            )
+
+
+def ativar_debug_asyncio(loop: asyncio.AbstractEventLoop, limiar: float) -> None:
+    """Liga o modo debug do asyncio, que avisa sobre callbacks lentos."""
+    loop.set_debug(True)
+    loop.slow_callback_duration = limiar
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+    log.info(f"Modo debug do asyncio ativo (callbacks lentos: > {limiar * 1000:.0f}ms).")
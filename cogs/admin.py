@@ -1,10 +1,15 @@
+import asyncio
 import logging
+from typing import Dict
 
 import discord
 from discord.ext import commands
 
 # Importa as ferramentas do nosso módulo de utilidades
-from cogs._utilidades import format_brl
+from cogs._armazenamento import id_particao
+from cogs._metricas import metricas
+from cogs._moeda import format_centavos, parse_valor
+from cogs._recarga import em_recarga, guardar_estado, recarregar_extensao, retomar_estado
 
 log = logging.getLogger(__name__)
 
@@ -13,49 +18,75 @@ class Admin(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.economia_data_manager = None
+        # Limpezas em andamento, uma por canal (o purge roda em segundo plano).
+        # Sobrevivem a um '!reload admin'.
+        self._limpezas: Dict[int, asyncio.Task] = (retomar_estado(bot, "Admin") or {}).get("limpezas", {})
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Obtém a referência para o DataManager do cog de Economia."""
+    async def cog_unload(self):
+        if em_recarga(self.bot):
+            guardar_estado(self.bot, "Admin", {"limpezas": self._limpezas})
+            return
+        for tarefa in self._limpezas.values():
+            tarefa.cancel()
+
+    @property
+    def economia_data_manager(self):
+        """DataManager do cog de Economia, buscado a cada uso para sobreviver a um '!reload economia'."""
         economia_cog = self.bot.get_cog('Economia')
-        if economia_cog and hasattr(economia_cog, 'data_manager'):
-            self.economia_data_manager = economia_cog.data_manager
-            log.info("Cog 'Admin' conectado ao DataManager da Economia.")
-        else:
-            log.error("Cog 'Admin' não encontrou o DataManager da Economia. Comandos podem falhar.")
+        return economia_cog.data_manager if economia_cog else None
 
     @commands.command(name="addgrana", help="Adiciona dinheiro a um membro. (Admin)")
     @commands.has_permissions(manage_guild=True)
-    async def addgrana(self, ctx: commands.Context, membro: discord.Member, quantia: int):
+    async def addgrana(self, ctx: commands.Context, membro: discord.Member, quantia_str: str):
         if not self.economia_data_manager:
             return await ctx.send("❌ Erro: O sistema de economia não está pronto ou não foi carregado.")
         
+        try:
+            quantia = parse_valor(quantia_str)
+        except ValueError:
+            return await ctx.send("Valor inválido. Use, por exemplo, `100` ou `12,50`.")
         if quantia <= 0:
             return await ctx.send("A quantia deve ser um número positivo.")
 
         # A lógica agora é uma única chamada ao DataManager, que já é segura.
         # Não precisamos mais do lock ou de chamar "abrir_conta" aqui.
-        await self.economia_data_manager.update_balance(membro.id, quantia, 'carteira')
+        await self.economia_data_manager.update_balance(id_particao(ctx.guild), membro.id, quantia, 'carteira', motivo="ajuste")
 
-        await ctx.send(f"✅ Adicionado **{format_brl(quantia)}** à carteira de {membro.mention}.")
+        await ctx.send(f"✅ Adicionado **{format_centavos(quantia)}** à carteira de {membro.mention}.")
 
     @commands.command(name="limpar", aliases=["clear"], help="Limpa mensagens do canal. (Admin)")
     @commands.has_permissions(manage_messages=True)
     async def limpar(self, ctx: commands.Context, limite: int):
         if limite <= 0:
             return await ctx.send("O número de mensagens a apagar deve ser positivo.")
-        
-        # O +1 é para apagar também a mensagem do comando !limpar
-        apagadas = await ctx.channel.purge(limit=limite + 1)
-        await ctx.send(f"🗑️ `{len(apagadas) - 1}` mensagens foram apagadas por {ctx.author.mention}.", delete_after=5)
+        if ctx.channel.id in self._limpezas:
+            return await ctx.send("⏳ Já existe uma limpeza em andamento neste canal.", delete_after=5)
+
+        # Apagar muitas mensagens leva várias requisições (e esperas de rate limit):
+        # o purge roda em uma tarefa própria e o comando termina na hora.
+        tarefa = asyncio.create_task(self._limpar_canal(ctx, limite))
+        self._limpezas[ctx.channel.id] = tarefa
+        tarefa.add_done_callback(lambda _: self._limpezas.pop(ctx.channel.id, None))
+
+    async def _limpar_canal(self, ctx: commands.Context, limite: int):
+        try:
+            # O +1 é para apagar também a mensagem do comando !limpar
+            apagadas = await ctx.channel.purge(limit=limite + 1)
+            await ctx.send(f"🗑️ `{len(apagadas) - 1}` mensagens foram apagadas por {ctx.author.mention}.", delete_after=5)
+        except discord.HTTPException as e:
+            log.error(f"Erro ao limpar o canal {ctx.channel.id}: {e}")
+            await ctx.send("❌ Não foi possível apagar as mensagens (elas podem ter mais de 14 dias).", delete_after=10)
 
     @commands.command(name="reload", help="Recarrega um Cog. (Apenas Dono)")
     @commands.is_owner()
     async def reload(self, ctx: commands.Context, cog_name: str):
         try:
             # O nome do cog a ser recarregado deve estar no formato 'cogs.nome'
-            await self.bot.reload_extension(f"cogs.{cog_name.lower()}")
+            nome_extensao = f"cogs.{cog_name.lower()}"
+            # Entrega o estado em memória (partições, fila, jogos...) para a nova instância
+            await recarregar_extensao(self.bot, nome_extensao)
+            # Avisa os outros cogs (ex: o catálogo do !ajuda no Geral) que os comandos mudaram
+            self.bot.dispatch("extensao_recarregada", nome_extensao)
             await ctx.send(f"✅ O Cog `{cog_name}` foi recarregado com sucesso!")
         except commands.ExtensionNotFound:
             await ctx.send(f"⚠️ O Cog `{cog_name}` não foi encontrado.")
@@ -63,5 +94,30 @@ class Admin(commands.Cog):
             log.error(f"Erro ao recarregar o cog '{cog_name}':", exc_info=True)
             await ctx.send(f"❌ Ocorreu um erro ao recarregar o Cog `{cog_name}`:\n```py\n{e}\n```")
 
+    @commands.command(name="stats", help="Mostra métricas de desempenho do bot. (Apenas Dono)")
+    @commands.is_owner()
+    async def stats(self, ctx: commands.Context):
+        resumo = metricas.resumo_comandos()[:15]
+        linhas = [f"{'comando':<12} {'qtd':>5} {'erros':>5} {'p50':>8} {'p99':>8}"]
+        for comando, invocacoes, erros, p50, p99 in resumo:
+            linhas.append(f"{comando[:12]:<12} {invocacoes:>5} {erros:>5} {p50 * 1000:>6.1f}ms {p99 * 1000:>6.1f}ms")
+
+        embed = discord.Embed(title="📊 Métricas de Desempenho", color=discord.Color.dark_teal())
+        embed.description = "```\n" + "\n".join(linhas) + "\n```" if resumo else "Nenhum comando executado ainda."
+
+        fases = []
+        for fase in ("fila_lock", "armazenamento", "api_discord"):
+            observacoes = [h for (_, f), h in metricas.latencias.items() if f == fase]
+            total = sum(h.soma for h in observacoes)
+            quantidade = sum(h.total for h in observacoes)
+            fases.append(f"**{fase}:** {total:.2f}s em {quantidade} medições")
+        embed.add_field(name="Tempo por fase", value="\n".join(fases), inline=False)
+        embed.add_field(
+            name="Event loop",
+            value=f"Lag p99: `{metricas.lag_loop.quantil(0.99) * 1000:.1f}ms` | Máximo: `{metricas.lag_maximo * 1000:.1f}ms`",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Admin(bot))
\ No newline at end of file
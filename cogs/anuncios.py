@@ -0,0 +1,113 @@
+"""
+Cog de anúncios: canais de anúncio configuráveis por guild e a fila de saída
+(cogs/_anuncios.py) usada pelos outros cogs.
+
+Os outros cogs não conhecem ids de canais: chamam
+
+    self.bot.get_cog('Anuncios').anunciar(guild_id, 'mercado', chave='tick', embed=embed)
+
+e a mensagem vai para o canal configurado com '!canalanuncios' naquela guild
+(se houver). A configuração fica em 'dados/<guild_id>/config.json'.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import discord
+from discord.ext import commands
+
+from cogs._anuncios import FilaAnuncios
+from cogs._armazenamento import criar_armazenamento, diretorio_dados, id_particao
+from cogs._recarga import em_recarga, guardar_estado, retomar_estado
+
+log = logging.getLogger(__name__)
+
+TIPOS_ANUNCIO = {
+    "economia": "Resumo econômico diário (juros e impostos)",
+    "mercado": "Atualizações de preço do mercado de ações",
+}
+# Canais usados antes de a configuração existir; valem apenas para a guild dona do canal.
+CANAIS_LEGADOS = {"economia": 1406712065061687447, "mercado": 1407388860392144968}
+
+
+class Anuncios(commands.Cog):
+    """Configuração dos canais de anúncio."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        # Num '!reload', a fila continua a mesma: nada pendente é perdido ou reenviado
+        estado = retomar_estado(bot, "Anuncios")
+        if estado is not None:
+            self.fila, self.configuracoes = estado["fila"], estado["configuracoes"]
+        else:
+            self.fila = FilaAnuncios(bot)
+            self.configuracoes = criar_armazenamento(diretorio_dados(), "config.json")
+
+    async def cog_load(self):
+        self.fila.iniciar()
+        self.configuracoes.iniciar()
+
+    async def cog_unload(self):
+        if em_recarga(self.bot):
+            guardar_estado(self.bot, "Anuncios", {"fila": self.fila, "configuracoes": self.configuracoes}, descartar=self._fechar)
+        else:
+            await self._fechar()
+
+    async def _fechar(self):
+        await self.fila.fechar()
+        await self.configuracoes.fechar()
+
+    # --- API para os outros cogs ---
+    async def canal_de(self, guild_id: int, tipo: str) -> Optional[int]:
+        """Id do canal de anúncios do tipo na guild, ou None se não houver."""
+        canais: Dict[str, Optional[int]] = (await self.configuracoes.ler(guild_id)).get("canais", {})
+        if tipo in canais:
+            return canais[tipo]  # None = desativado explicitamente
+        legado = self.bot.get_channel(CANAIS_LEGADOS.get(tipo, 0))
+        return legado.id if legado is not None and id_particao(getattr(legado, 'guild', None)) == guild_id else None
+
+    async def anunciar(self, guild_id: int, tipo: str, chave=None, **conteudo) -> bool:
+        """
+        Enfileira 'conteudo' (argumentos de 'send') para o canal do tipo na guild.
+        Não espera o envio. Retorna False se a guild não tem canal para o tipo.
+        """
+        canal_id = await self.canal_de(guild_id, tipo)
+        if canal_id is None:
+            return False
+        self.fila.enfileirar(canal_id, (tipo, chave), **conteudo)
+        return True
+
+    # --- Comandos ---
+    @commands.command(name="canalanuncios", aliases=["anuncios"], help="Define o canal de um tipo de anúncio: `!canalanuncios mercado #canal` (ou `off`). (Admin)")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def canalanuncios(self, ctx: commands.Context, tipo: Optional[str] = None, canal: Optional[str] = None):
+        if tipo is None:
+            linhas = []
+            for nome, descricao in TIPOS_ANUNCIO.items():
+                canal_id = await self.canal_de(ctx.guild.id, nome)
+                linhas.append(f"**{nome}** — {descricao}\n└ {f'<#{canal_id}>' if canal_id else '*desativado*'}")
+            embed = discord.Embed(title="📢 Canais de Anúncio", description="\n\n".join(linhas), color=discord.Color.blurple())
+            return await ctx.send(embed=embed)
+
+        tipo = tipo.lower()
+        if tipo not in TIPOS_ANUNCIO:
+            return await ctx.send(f"Tipo inválido. Use um de: {', '.join(f'`{t}`' for t in TIPOS_ANUNCIO)}.")
+        if canal is None:
+            return await ctx.send("Informe o canal (ex: `#anuncios`) ou `off` para desativar.")
+
+        if canal.lower() in ("off", "desativar", "nenhum"):
+            canal_id = None
+        else:
+            try:
+                canal_id = (await commands.TextChannelConverter().convert(ctx, canal)).id
+            except commands.BadArgument:
+                return await ctx.send("Canal não encontrado nesta guild.")
+
+        async with self.configuracoes.transacao(ctx.guild.id) as config:
+            config.setdefault("canais", {})[tipo] = canal_id
+        await ctx.send(f"✅ Anúncios de **{tipo}** {f'irão para <#{canal_id}>' if canal_id else 'foram desativados'}.")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Anuncios(bot))
@@ -3,11 +3,17 @@
 # --- 1. Imports ---
 import logging
 import random
-from typing import Dict, Any, List
+import weakref
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 import discord
 from discord.ext import commands
 
+from cogs._armazenamento import OperacaoInvalida, id_particao
+from cogs._estatisticas_cassino import ranking, registrar_jogo
+from cogs._moeda import format_centavos, parse_valor
+from cogs._recarga import em_recarga, guardar_estado, retomar_estado
+
 # --- 2. Setup do Logger ---
 log = logging.getLogger(__name__)
 
@@ -58,19 +64,23 @@ class Hand:
 
 class BlackjackPvEGame:
     """Contém o estado e a lógica para uma única partida de Blackjack PvE."""
-    def __init__(self, player: discord.Member, bet: int):
+    def __init__(self, player: discord.Member, bet: int, guild_id: int = 0):
         self.player, self.bet, self.deck = player, bet, Deck()
+        self.guild_id = guild_id  # partição da economia onde a aposta foi debitada
         self.player_hand, self.dealer_hand = Hand(), Hand()
         self.is_finished, self.status, self.payout = False, "", 0
+        self.versao, self.embed_cache = 0, None  # versao muda a cada jogada; o embed é refeito só quando ela muda
         for _ in range(2): self.player_hand.add_card(self.deck.deal()); self.dealer_hand.add_card(self.deck.deal())
 
     def hit(self):
         if self.is_finished: return
+        self.versao += 1
         self.player_hand.add_card(self.deck.deal())
         if self.player_hand.points > 21: self.stand()
 
     def stand(self):
         if self.is_finished: return
+        self.versao += 1
         while self.dealer_hand.points < 17: self.dealer_hand.add_card(self.deck.deal())
         self._determine_winner()
 
@@ -78,7 +88,7 @@ class BlackjackPvEGame:
         p_pts, d_pts = self.player_hand.points, self.dealer_hand.points
         p_bj = p_pts == 21 and len(self.player_hand.cards) == 2
         d_bj = d_pts == 21 and len(self.dealer_hand.cards) == 2
-        if p_bj and not d_bj: self.status, self.payout = "Blackjack! Você ganhou!", int(self.bet * 2.5)
+        if p_bj and not d_bj: self.status, self.payout = "Blackjack! Você ganhou!", self.bet * 5 // 2
         elif p_pts > 21: self.status, self.payout = f"Você estourou com {p_pts} pontos! Você perdeu.", 0
         elif d_bj and not p_bj: self.status, self.payout = "A Casa fez um Blackjack! Você perdeu.", 0
         elif d_pts > 21: self.status, self.payout = f"A Casa estourou com {d_pts} pontos! Você ganhou!", self.bet * 2
@@ -89,12 +99,14 @@ class BlackjackPvEGame:
 
 class BlackjackPvPGame:
     """Contém o estado e a lógica para uma única partida de Blackjack PvP."""
-    def __init__(self, player1: discord.Member, player2: discord.Member, bet: int):
+    def __init__(self, player1: discord.Member, player2: discord.Member, bet: int, guild_id: int = 0):
         self.players = {player1.id: player1, player2.id: player2}
+        self.guild_id = guild_id
         self.bet, self.pot, self.deck = bet, bet * 2, Deck()
         self.hands = {p_id: Hand() for p_id in self.players.keys()}
         self.turn_of, self.players_who_stood = player1.id, []
         self.is_finished, self.status, self.winner_id = False, "", None
+        self.versao, self.embed_cache = 0, None
         for _ in range(2):
             for p_id in self.players: self.hands[p_id].add_card(self.deck.deal())
 
@@ -102,11 +114,13 @@ class BlackjackPvPGame:
 
     def hit(self, p_id: int):
         if self.is_finished or p_id != self.turn_of: return
+        self.versao += 1
         self.hands[p_id].add_card(self.deck.deal())
         if self.hands[p_id].points > 21: self.stand(p_id)
 
     def stand(self, p_id: int):
         if self.is_finished or p_id != self.turn_of: return
+        self.versao += 1
         self.players_who_stood.append(p_id)
         opponent_id = self.get_opponent_id(p_id)
         if opponent_id not in self.players_who_stood: self.turn_of = opponent_id
@@ -127,20 +141,53 @@ class BlackjackPvPGame:
 class GameManager:
     """Gerencia o ciclo de vida de todos os jogos ativos."""
     def __init__(self): self.active_games: Dict[int, Any] = {}
-    def start_pve_game(self, p, b) -> BlackjackPvEGame: self.active_games[p.id] = g = BlackjackPvEGame(p, b); return g
-    def start_pvp_game(self, p1, p2, b, msg_id) -> BlackjackPvPGame: self.active_games[msg_id] = g = BlackjackPvPGame(p1, p2, b); return g
+    def start_pve_game(self, p, b, guild_id=0) -> BlackjackPvEGame: self.active_games[p.id] = g = BlackjackPvEGame(p, b, guild_id); return g
+    def start_pvp_game(self, p1, p2, b, msg_id, guild_id=0) -> BlackjackPvPGame: self.active_games[msg_id] = g = BlackjackPvPGame(p1, p2, b, guild_id); return g
     def get_game(self, g_id: int) -> Any: return self.active_games.get(g_id)
     def end_game(self, g_id: int):
         if g_id in self.active_games: del self.active_games[g_id]
 
         # --- 4. Views (Interface do Usuário) ---
 
+class EdicaoCoalescida:
+    """
+    Junta edições seguidas da mesma mensagem. Enquanto uma edição está em
+    andamento, os cliques seguintes só são confirmados com 'defer' (o Discord
+    exige uma resposta em 3s) e marcam a mensagem como desatualizada; ao fim da
+    edição, uma única edição extra envia o estado mais recente, montado só nesse
+    momento. Cliques espaçados continuam custando uma única chamada cada.
+    """
+    def __init__(self):
+        self._em_andamento, self._desatualizada = False, False
+        self.edicoes = self.coalescidas = 0
+
+    async def editar(self, interaction: Optional[discord.Interaction], message: Optional[discord.Message], montar: Callable[[], Dict[str, Any]]):
+        if self._em_andamento:
+            self._desatualizada = True; self.coalescidas += 1
+            if interaction is not None and not interaction.response.is_done(): await interaction.response.defer()
+            return
+        self._em_andamento = True
+        try:
+            if interaction is None: await message.edit(**montar())
+            else: await interaction.response.edit_message(**montar())
+            self.edicoes += 1
+            while self._desatualizada:
+                self._desatualizada = False
+                # Em interações de componente, a resposta original é a própria mensagem do jogo
+                if interaction is None: await message.edit(**montar())
+                else: await interaction.edit_original_response(**montar())
+                self.edicoes += 1
+        finally:
+            self._em_andamento = False
+
 class BlackjackView_PvE(discord.ui.View):
     def __init__(self, game: BlackjackPvEGame, cog: 'Cassino'):
         super().__init__(timeout=120.0)
         self.game = game
-        self.cog = cog
+        self.cog = cog; cog.views_ativas.add(self)
         self.message: discord.Message = None
+        self.edicao = EdicaoCoalescida()
+        self.finalizado = False  # ver Cassino._finalizar
 
     async def on_timeout(self):
         # Evita chamar o handler se o jogo já terminou normalmente
@@ -157,10 +204,10 @@ class BlackjackView_PvE(discord.ui.View):
         for item in self.children:
             item.disabled = True
 
-    async def update_message(self, interaction: discord.Interaction):
+    async def update_message(self, interaction: Optional[discord.Interaction]):
         """Função centralizada para atualizar a mensagem do jogo."""
-        embed = self.cog.create_embed_pve(self.game)
-        await interaction.response.edit_message(embed=embed, view=self)
+        # interaction=None: jogo finalizado sem clique (ex: Blackjack natural na primeira mão)
+        await self.edicao.editar(interaction, self.message, lambda: {"embed": self.cog.create_embed_pve(self.game), "view": self})
 
     @discord.ui.button(label="Pedir Carta", style=discord.ButtonStyle.primary, emoji="➕")
     async def hit_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -197,7 +244,9 @@ class ChallengeView(discord.ui.View):
 class PVPBlackjackView(discord.ui.View):
     def __init__(self, game: BlackjackPvPGame, cog: 'Cassino'):
         super().__init__(timeout=180.0)
-        self.game = game; self.cog = cog; self.message: discord.Message = None
+        self.game = game; self.cog = cog; self.message: discord.Message = None; cog.views_ativas.add(self)
+        self.edicao, self.content = EdicaoCoalescida(), None
+        self.finalizado = False  # ver Cassino._finalizar
     async def on_timeout(self):
         if not self.game.is_finished:
             await self.cog.handle_timeout_pvp(self)
@@ -208,8 +257,8 @@ class PVPBlackjackView(discord.ui.View):
     def disable_buttons(self):
         for item in self.children: item.disabled = True
     async def update_message(self, i: discord.Interaction, content: str = None):
-        embed = self.cog.create_embed_pvp(self.game)
-        await i.response.edit_message(content=content, embed=embed, view=self)
+        self.content = content  # a edição coalescida usa sempre o texto mais recente
+        await self.edicao.editar(i, self.message, lambda: {"content": self.content, "embed": self.cog.create_embed_pvp(self.game), "view": self})
     @discord.ui.button(label="Pedir Carta", style=discord.ButtonStyle.primary, emoji="➕")
     async def hit(self, i: discord.Interaction, b: discord.ui.Button):
         self.game.hit(i.user.id)
@@ -225,77 +274,91 @@ class PVPBlackjackView(discord.ui.View):
 
 class Cassino(commands.Cog):
     def __init__(self, bot: commands.Bot):
-        self.bot, self.game_manager, self.data_manager = bot, GameManager(), None
-    
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Garante que o DataManager da Economia seja carregado."""
+        self.bot, self.game_manager = bot, GameManager()
+        # Views com jogo em andamento: num '!reload' passam a apontar para a nova instância
+        self.views_ativas: 'weakref.WeakSet[discord.ui.View]' = weakref.WeakSet()
+        estado = retomar_estado(bot, "Cassino")
+        if estado:
+            self.game_manager.active_games.update(estado["jogos"])
+            for view in estado["views"]: view.cog = self; self.views_ativas.add(view)
+
+    async def cog_unload(self):
+        if em_recarga(self.bot):
+            guardar_estado(self.bot, "Cassino", {"jogos": self.game_manager.active_games, "views": list(self.views_ativas)})
+
+    @property
+    def data_manager(self):
+        """DataManager da Economia, buscado a cada uso para sobreviver a um '!reload economia'."""
         economia_cog = self.bot.get_cog('Economia')
-        if economia_cog and hasattr(economia_cog, 'data_manager'):
-            self.data_manager = economia_cog.data_manager
-            log.info("Cog 'Cassino' carregado e conectado ao DataManager da Economia.")
-        else:
-            log.error("O Cog 'Cassino' não conseguiu encontrar o DataManager da Economia. A funcionalidade será limitada.")
+        return economia_cog.data_manager if economia_cog else None
 
-    def format_brl(self, valor):
-        try:
-            import locale
-            locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-            return locale.currency(float(valor), grouping=True, symbol="R$")
-        except:
-            try:
-                a = f'{float(valor):,.2f}'
-                b = a.replace(',', 'v').replace('.', ',').replace('v', '.')
-                return f"R$ {b}"
-            except:
-                return "R$ 0,00"
-        
     # --- Lógica de Finalização e Timeouts ---
-    async def finalize_game_pve(self, interaction: discord.Interaction, view: BlackjackView_PvE):
+    async def _registrar_resultados(self, guild_id: int, resultados: List[Tuple[int, int, int]], contra_casa: bool, cofre: int = 0):
+        """Paga os retornos (user_id, aposta, retorno) e atualiza as estatísticas, tudo na mesma transação."""
+        async with self.data_manager.transacao(guild_id) as economia:
+            for user_id, aposta, retorno in resultados:
+                if retorno: self.data_manager.movimentar(guild_id, economia, user_id, retorno, "aposta_devolvida" if retorno == aposta else "premio")
+                registrar_jogo(economia, self.data_manager.conta(economia, user_id), user_id, aposta, retorno, contra_casa)
+            if cofre: economia["cofre_impostos"] = economia.get("cofre_impostos", 0) + cofre
+
+    async def _finalizar(self, interaction: Optional[discord.Interaction], view: discord.ui.View) -> bool:
+        """
+        Marca a view como finalizada antes do primeiro await: só a primeira
+        chamada (clique ou timeout) paga e registra o jogo. Os cliques que
+        chegam depois só são confirmados com 'defer'. Retorna False nesses casos.
+        """
+        # getattr: views anteriores a esta versão podem vir de um '!reload'
+        if getattr(view, "finalizado", False):
+            if interaction is not None and not interaction.response.is_done(): await interaction.response.defer()
+            return False
+        view.finalizado = True
+        return True
+
+    async def finalize_game_pve(self, interaction: Optional[discord.Interaction], view: BlackjackView_PvE):
+        if not await self._finalizar(interaction, view): return
         game = view.game; view.disable_buttons()
-        if game.payout > 0:
-            await self.data_manager.update_balance(game.player.id, game.payout, 'carteira')
+        await self._registrar_resultados(game.guild_id, [(game.player.id, game.bet, game.payout)], contra_casa=True)
         self.game_manager.end_game(game.player.id)
         await view.update_message(interaction)
         log.info(f"Jogo de Blackjack PvE finalizado para {game.player.name}. Resultado: {game.status}")
 
     async def finalize_game_pvp(self, interaction: discord.Interaction, view: PVPBlackjackView):
+        if not await self._finalizar(interaction, view): return
         game = view.game; view.disable_buttons()
-        # Pagar vencedor ou devolver em caso de empate
-        if game.winner_id is not None and game.winner_id != 0:
-            await self.data_manager.update_balance(game.winner_id, game.pot)
-        elif game.winner_id == 0: # Empate
-            for p_id in game.players: await self.data_manager.update_balance(p_id, game.bet)
-        # Lógica para cofre público se ambos estourarem
-        elif game.winner_id is None:
-            dados = await self.data_manager.get_all_data()
-            dados["cofre_impostos"] = dados.get("cofre_impostos", 0) + game.pot
-            await self.data_manager.save_all_data(dados)
+        # Pagar vencedor, devolver em caso de empate (winner_id 0) ou mandar o pote para o cofre se ambos estourarem (None)
+        if game.winner_id == 0: retornos = {p_id: game.bet for p_id in game.players}
+        else: retornos = {p_id: game.pot if p_id == game.winner_id else 0 for p_id in game.players}
+        await self._registrar_resultados(game.guild_id, [(p_id, game.bet, retorno) for p_id, retorno in retornos.items()], contra_casa=False,
+                                         cofre=game.pot if game.winner_id is None else 0)
 
         await view.update_message(interaction, content="**Fim de Jogo!**")
         self.game_manager.end_game(view.message.id)
         log.info(f"Jogo de Blackjack PvP finalizado. Vencedor ID: {game.winner_id}")
 
     async def handle_timeout_pve(self, view: BlackjackView_PvE):
+        if not await self._finalizar(None, view): return
         game = view.game; view.disable_buttons()
         log.warning(f"Jogo de Blackjack PvE para {game.player.name} expirou (timeout).")
-        # Neste caso, a aposta já foi debitada e é perdida.
-        embed = discord.Embed(title="🎲 Jogo Terminado 🎲", description=f"Jogo cancelado por inatividade. A aposta de {self.format_brl(game.bet)} foi perdida.", color=discord.Color.dark_grey())
+        # Neste caso, a aposta já foi debitada e é perdida (conta como derrota)
+        await self._registrar_resultados(game.guild_id, [(game.player.id, game.bet, 0)], contra_casa=True)
+        embed = discord.Embed(title="🎲 Jogo Terminado 🎲", description=f"Jogo cancelado por inatividade. A aposta de {format_centavos(game.bet)} foi perdida.", color=discord.Color.dark_grey())
         if view.message: await view.message.edit(embed=embed, view=view)
         self.game_manager.end_game(game.player.id)
 
     async def handle_timeout_pvp(self, view: PVPBlackjackView):
+        if not await self._finalizar(None, view): return
         game = view.game; view.disable_buttons()
         log.warning("Jogo de Blackjack PvP expirou (timeout).")
-        # Regra de negócio: em timeout de PvP, o dinheiro é devolvido
-        for p_id in game.players:
-            await self.data_manager.update_balance(p_id, game.bet)
+        # Regra de negócio: em timeout de PvP, o dinheiro é devolvido (a todos na mesma transação, como em '_registrar_resultados')
+        async with self.data_manager.transacao(game.guild_id) as economia:
+            for p_id in game.players: self.data_manager.movimentar(game.guild_id, economia, p_id, game.bet, "aposta_devolvida")
         embed = self.create_embed_pvp(game, status_override="Jogo cancelado por inatividade. As apostas foram devolvidas.")
         if view.message: await view.message.edit(content=None, embed=embed, view=view)
         self.game_manager.end_game(view.message.id)
 
     # --- Métodos para Criar Embeds ---
     def create_embed_pve(self, game: BlackjackPvEGame) -> discord.Embed:
+        if game.embed_cache and game.embed_cache[0] == (game.versao, None): return game.embed_cache[1]
         status = game.status or "É a sua vez de jogar!"
         cor = discord.Color.dark_green()
         if game.is_finished:
@@ -303,14 +366,16 @@ class Cassino(commands.Cog):
             elif game.payout == 0: cor = discord.Color.red()
             elif game.payout == game.bet: cor = discord.Color.light_grey()
             if "Blackjack" in game.status: cor = discord.Color.gold()
-        embed = discord.Embed(title="🎲 Jogo de Blackjack 🎲", description=f"**Aposta:** {self.format_brl(game.bet)}\n**Status:** {status}", color=cor)
+        embed = discord.Embed(title="🎲 Jogo de Blackjack 🎲", description=f"**Aposta:** {format_centavos(game.bet)}\n**Status:** {status}", color=cor)
         embed.add_field(name=f"{game.player.display_name} ({game.player_hand.points} pontos)", value=str(game.player_hand), inline=False)
         if game.is_finished: embed.add_field(name=f"Casa ({game.dealer_hand.points} pontos)", value=str(game.dealer_hand), inline=False)
         else: embed.add_field(name=f"Casa ({game.dealer_hand.cards[0].value}+ pontos)", value=f"{str(game.dealer_hand.cards[0])} [`?`]", inline=False)
+        game.embed_cache = ((game.versao, None), embed)
         return embed
 
     def create_embed_pvp(self, game: BlackjackPvPGame, status_override: str = None) -> discord.Embed:
-        desc = f"**Pote Total:** {self.format_brl(game.pot)}\n\n"
+        if game.embed_cache and game.embed_cache[0] == (game.versao, status_override): return game.embed_cache[1]
+        desc = f"**Pote Total:** {format_centavos(game.pot)}\n\n"
         if status_override: desc += f"**Resultado:** {status_override}"
         elif game.is_finished: desc += f"**Resultado:** {game.status}"
         else: desc += f"É a vez de **{game.players[game.turn_of].mention}** jogar."
@@ -322,8 +387,17 @@ class Cassino(commands.Cog):
             else:
                 val, nome = f"{str(mao.cards[0])} [`?`]", f"{p_obj.display_name} ({mao.cards[0].value}+ pontos)"
             embed.add_field(name=nome, value=val, inline=False)
+        game.embed_cache = ((game.versao, status_override), embed)
         return embed
 
+    def _parse_aposta(self, aposta_str: str, saldo: int) -> int:
+        """Aposta em centavos ('all'/'tudo' = 'saldo'). Levanta OperacaoInvalida com a mensagem de erro."""
+        if aposta_str.lower() in ['all', 'tudo']: return int(saldo)
+        try: aposta = parse_valor(aposta_str)
+        except ValueError: raise OperacaoInvalida("❌ Aposta inválida. Use um valor (ex: `50` ou `12,50`) ou 'all'.") from None
+        if aposta <= 0: raise OperacaoInvalida("A aposta deve ser positiva.")
+        return aposta
+
     # --- Comandos do Cog ---
     @commands.command(name="blackjack", aliases=["bj"], help="Inicia um jogo de Vinte e Um contra a casa.")
     async def blackjack(self, ctx: commands.Context, aposta_str: str):
@@ -331,23 +405,23 @@ class Cassino(commands.Cog):
             return await ctx.send("Você já está em uma partida!", delete_after=10)
         if not self.data_manager:
             return await ctx.send("O sistema de economia não está disponível no momento.")
-        user_data = await self.data_manager.get_user_data(ctx.author.id)
-        saldo_carteira = user_data.get("carteira", 0)
+        guild_id = id_particao(ctx.guild)
+        # A aposta é conferida na mesma transação que a debita
         try:
-            aposta = int(aposta_str) if aposta_str.lower() not in ['all', 'tudo'] else int(saldo_carteira)
-        except ValueError: return await ctx.send("❌ Aposta inválida. Use um número ou 'all'.")
-        if aposta <= 0: return await ctx.send("A aposta deve ser positiva.")
-        if saldo_carteira < aposta: return await ctx.send(f"Você não tem dinheiro suficiente! Saldo: {self.format_brl(saldo_carteira)}")
-        
-        await self.data_manager.update_balance(ctx.author.id, -aposta, 'carteira')
-        game = self.game_manager.start_pve_game(ctx.author, aposta)
+            async with self.data_manager.transacao(guild_id) as dados:
+                saldo_carteira = self.data_manager.conta(dados, ctx.author.id).get("carteira", 0)
+                aposta = self._parse_aposta(aposta_str, saldo_carteira)
+                if saldo_carteira < aposta: raise OperacaoInvalida(f"Você não tem dinheiro suficiente! Saldo: {format_centavos(saldo_carteira)}")
+                self.data_manager.movimentar(guild_id, dados, ctx.author.id, -aposta, "aposta")
+        except OperacaoInvalida as e: return await ctx.send(str(e))
+        game = self.game_manager.start_pve_game(ctx.author, aposta, guild_id)
         view = BlackjackView_PvE(game, self)
         embed = self.create_embed_pve(game)
         msg = await ctx.send(embed=embed, view=view)
         view.message = msg
         if game.player_hand.points == 21:
             game.stand()
-            await self.finalize_game_pve(await self.bot.get_context(msg), view)
+            await self.finalize_game_pve(None, view)
 
     @commands.command(name="bjdesafio", help="Desafia outro membro para um jogo de Blackjack 1v1.")
     async def bjdesafio(self, ctx: commands.Context, oponente: discord.Member, aposta_str: str):
@@ -356,16 +430,16 @@ class Cassino(commands.Cog):
         if self.game_manager.get_game(desafiante.id) or self.game_manager.get_game(oponente.id): return await ctx.send("Um dos jogadores já está numa partida.")
         if not self.data_manager: return await ctx.send("O sistema de economia não está disponível no momento.")
 
-        dados_desafiante = await self.data_manager.get_user_data(desafiante.id)
+        guild_id = id_particao(ctx.guild)
+        # Conferência prévia só para não desafiar sem saldo; o débito confere de novo
+        dados_desafiante = await self.data_manager.get_user_data(guild_id, desafiante.id)
         saldo_desafiante = dados_desafiante.get("carteira", 0)
-        try:
-            aposta = int(aposta_str) if aposta_str.lower() not in ['all', 'tudo'] else int(saldo_desafiante)
-        except ValueError: return await ctx.send("❌ Aposta inválida. Use um número ou 'all'.")
-        if aposta <= 0: return await ctx.send("A aposta deve ser positiva.")
-        if saldo_desafiante < aposta: return await ctx.send(f"Você não tem {self.format_brl(aposta)} para apostar!")
+        try: aposta = self._parse_aposta(aposta_str, saldo_desafiante)
+        except OperacaoInvalida as e: return await ctx.send(str(e))
+        if saldo_desafiante < aposta: return await ctx.send(f"Você não tem {format_centavos(aposta)} para apostar!")
 
         view_desafio = ChallengeView(oponente.id)
-        embed_desafio = discord.Embed(title="⚔️ Desafio de Blackjack! ⚔️", description=f"{desafiante.mention} desafiou {oponente.mention} para uma partida valendo **{self.format_brl(aposta)}**!", color=discord.Color.orange())
+        embed_desafio = discord.Embed(title="⚔️ Desafio de Blackjack! ⚔️", description=f"{desafiante.mention} desafiou {oponente.mention} para uma partida valendo **{format_centavos(aposta)}**!", color=discord.Color.orange())
         embed_desafio.set_footer(text=f"{oponente.display_name}, você tem 3 minutos para responder.")
         msg_desafio = await ctx.send(content=oponente.mention, embed=embed_desafio, view=view_desafio)
         await view_desafio.wait()
@@ -377,20 +451,41 @@ class Cassino(commands.Cog):
             embed_desafio.description = f"✖️ {oponente.mention} **RECUSOU** o desafio."; embed_desafio.color = discord.Color.red()
             return await msg_desafio.edit(content=None, embed=embed_desafio, view=None)
 
-        dados_oponente = await self.data_manager.get_user_data(oponente.id)
-        if dados_oponente.get("carteira", 0) < aposta:
-            embed_desafio.description = f"{oponente.mention} não tem dinheiro suficiente para aceitar a aposta."; embed_desafio.color = discord.Color.red()
+        # Os dois saldos são conferidos e debitados na mesma transação
+        try:
+            async with self.data_manager.transacao(guild_id) as dados:
+                if self.data_manager.conta(dados, desafiante.id).get("carteira", 0) < aposta: raise OperacaoInvalida(f"{desafiante.mention} não tem mais dinheiro suficiente para a aposta.")
+                if self.data_manager.conta(dados, oponente.id).get("carteira", 0) < aposta: raise OperacaoInvalida(f"{oponente.mention} não tem dinheiro suficiente para aceitar a aposta.")
+                self.data_manager.movimentar(guild_id, dados, desafiante.id, -aposta, "aposta")
+                self.data_manager.movimentar(guild_id, dados, oponente.id, -aposta, "aposta")
+        except OperacaoInvalida as e:
+            embed_desafio.description = str(e); embed_desafio.color = discord.Color.red()
             return await msg_desafio.edit(content=None, embed=embed_desafio, view=None)
 
-        await self.data_manager.update_balance(desafiante.id, -aposta)
-        await self.data_manager.update_balance(oponente.id, -aposta)
-
-        game = self.game_manager.start_pvp_game(desafiante, oponente, aposta, msg_desafio.id)
+        game = self.game_manager.start_pvp_game(desafiante, oponente, aposta, msg_desafio.id, guild_id)
         view_pvp = PVPBlackjackView(game, self)
         view_pvp.message = msg_desafio
         
         embed_jogo = self.create_embed_pvp(game)
         await msg_desafio.edit(content=f"Desafio aceito! É a vez de {desafiante.mention}!", embed=embed_jogo, view=view_pvp)
 
+    @commands.command(name="rankcassino", aliases=["topcassino"], help="Mostra as estatísticas do cassino e os maiores lucros.")
+    async def rankcassino(self, ctx: commands.Context):
+        if not self.data_manager: return await ctx.send("O sistema de economia não está disponível no momento.")
+        economia = await self.data_manager.get_all_data(id_particao(ctx.guild))
+        guild = economia.get("cassino")
+        if not guild or not guild["maos"]: return await ctx.send("Ninguém jogou no cassino ainda!")
+
+        embed = discord.Embed(title="🎰 Estatísticas do Cassino 🎰", color=discord.Color.dark_gold())
+        embed.add_field(name="Mãos Jogadas", value=f"`{guild['maos']}`"); embed.add_field(name="Total Apostado", value=f"`{format_centavos(guild['apostado'])}`")
+        embed.add_field(name="Lucro da Casa", value=f"`{format_centavos(guild['lucro_casa'])}`")
+        if guild["maior_premio"]: embed.add_field(name="Maior Prêmio", value=f"<@{guild['maior_premio']['usuario']}>: `{format_centavos(guild['maior_premio']['valor'])}`", inline=False)
+        linhas = [f"**{i}.** <@{user_id}> — `{format_centavos(lucro)}`" for i, (user_id, lucro) in enumerate(ranking(economia, 10), start=1)]
+        embed.add_field(name="Maiores Lucros", value="\n".join(linhas), inline=False)
+        stats = economia.get(str(ctx.author.id), {}).get("cc_stats")
+        if stats and stats["jogos"]:
+            embed.set_footer(text=f"Você: {stats['jogos']} jogos, {stats['vitorias']} vitórias, lucro de {format_centavos(stats['lucro_total'])}")
+        await ctx.send(embed=embed)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Cassino(bot))
\ No newline at end of file
@@ -6,7 +6,7 @@ saldos, transações, empregos e eventos econômicos.
 
 Arquitetura:
 - A classe 'DataManager' lida com toda a lógica de I/O (leitura/escrita)
-  do arquivo JSON, agindo como uma Camada de Acesso a Dados (DAL).
+  dos arquivos JSON (um por guild), agindo como uma Camada de Acesso a Dados (DAL).
 - A classe 'Economia' (o Cog) contém a lógica dos comandos, mas delega
   todas as operações de dados para o 'DataManager'.
 - Isso desacopla a lógica dos comandos do método de armazenamento, facilitando
@@ -15,15 +15,29 @@ Arquitetura:
 
 # --- 1. Imports ---
 import logging
-import json
+import os
 import random
+from collections.abc import MutableMapping
+from contextlib import asynccontextmanager
 from datetime import time, timezone, timedelta
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, Union
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
+
+import numpy as np
 
 import discord
 from discord.ext import commands, tasks
 
+from cogs import _cooldowns, _extrato
+from cogs._armazenamento import PARTICAO_SEM_GUILD, OperacaoInvalida, criar_armazenamento, diretorio_dados, id_particao, varrer
+from cogs._contas import Conta, compactar
+from cogs._cooldowns import cooldown_persistente
+from cogs._estatisticas_cassino import reconstruir_ranking
+from cogs._migracoes import Migracoes
+from cogs._recarga import em_recarga, guardar_estado, retomar_estado
+from cogs._moeda import format_centavos, para_centavos, parse_valor
+
 # --- 2. Configuração e Constantes ---
 # Usando logging, como definido no main.py
 log = logging.getLogger(__name__)
@@ -31,229 +45,419 @@ log = logging.getLogger(__name__)
 # Usando pathlib para uma manipulação de caminhos mais robusta e legível
 # __file__ -> economia.py | .parent -> /cogs | .parent -> diretório raiz
 DIRETORIO_RAIZ = Path(__file__).parent.parent
+# Cada guild tem a sua economia em 'dados/<guild_id>/economia.json' (ver _armazenamento.py).
+# Arquivo único do formato antigo: é adotado por uma guild na primeira carga.
 ARQUIVO_ECONOMIA = DIRETORIO_RAIZ / "economia.json"
+# Guild que herda o arquivo antigo. Vazio = a primeira guild que usar a economia.
+GUILD_LEGADO_ID = os.getenv('GUILD_LEGADO_ID')
+
+# Todos os valores monetários são armazenados em centavos inteiros.
+# As taxas usam pontos-base (1 bp = 0,01%) para que o cálculo seja exato.
+TAXA_JUROS_BP = 200             # 2% ao dia sobre o saldo do banco
+TAXA_IMPOSTO_RIQUEZA_BP = 100   # 1% ao dia sobre a riqueza total
+SALDO_INICIAL = 500_00
+GANHO_TRABALHO_MIN, GANHO_TRABALHO_MAX = 100_00, 500_00
+ROUBO_SALDO_MINIMO_ALVO = 200_00
+ROUBO_SALDO_MINIMO_AUTOR = 100_00
+LANCAMENTOS_POR_PAGINA = 10
+
+# --- 3. Esquema e Migrações ---
+
+def conta_padrao() -> Dict[str, Any]:
+    """Estrutura padrão de um novo usuário (valores em centavos)."""
+    return {
+        "carteira": SALDO_INICIAL,
+        "banco": 0,
+        "acoes": {},
+        "cc_stats": {
+            "jogos": 0,
+            "vitorias": 0,
+            "total_apostado": 0,
+            "lucro_total": 0
+        }
+    }
+
+
+# Aplicadas uma única vez, na carga da partição (ver cogs/_migracoes.py).
+MIGRACOES_ECONOMIA = Migracoes("economia")
+
+
+@MIGRACOES_ECONOMIA.registrar(1)
+def _migrar_para_centavos(dados: Dict[str, Any]) -> None:
+    """Converte dados antigos (reais em float/int) para centavos inteiros."""
+    meta = dados.setdefault("_meta", {})
+    if meta.get("moeda") == "centavos" or dados.keys() == {"_meta"}:  # já migrada, ou partição nova
+        meta["moeda"] = "centavos"
+        return
+
+    log.warning("Migrando uma partição de economia para valores em centavos inteiros...")
+    for chave, registro in dados.items():
+        if not chave.isdigit() or not isinstance(registro, MutableMapping):
+            continue
+        for conta in ("carteira", "banco"):
+            if conta in registro:
+                registro[conta] = para_centavos(registro[conta])
+        stats = registro.get("cc_stats", {})
+        for campo in ("total_apostado", "lucro_total"):
+            if campo in stats:
+                stats[campo] = para_centavos(stats[campo])
+        for info_acao in registro.get("acoes", {}).values():
+            if isinstance(info_acao, MutableMapping) and "preco_medio_compra" in info_acao:
+                info_acao["preco_medio_compra"] = para_centavos(info_acao["preco_medio_compra"])
+
+    dados["cofre_impostos"] = para_centavos(dados.get("cofre_impostos", 0))
+    impostos_diarios = dados.get("impostos_diarios", {})
+    for categoria, valor in impostos_diarios.items():
+        impostos_diarios[categoria] = para_centavos(valor)
+    meta["moeda"] = "centavos"
+
+
+@MIGRACOES_ECONOMIA.registrar(2)
+def _completar_contas(dados: Dict[str, Any]) -> None:
+    """
+    Completa as contas antigas com os campos do esquema atual e converte as
+    ações do formato antigo (só a quantidade) para {quantidade, preco_medio_compra}.
+    Substitui a verificação que era feita em cada leitura.
+    """
+    for chave, registro in dados.items():
+        if not chave.isdigit() or not isinstance(registro, MutableMapping):
+            continue
+        for campo, padrao in conta_padrao().items():
+            if isinstance(padrao, dict) and isinstance(registro.get(campo), MutableMapping):
+                for subcampo, valor in padrao.items():
+                    registro[campo].setdefault(subcampo, valor)
+            else:
+                registro.setdefault(campo, padrao)
+        acoes = registro["acoes"]
+        for simbolo, info_acao in list(acoes.items()):
+            if isinstance(info_acao, MutableMapping):
+                continue
+            if isinstance(info_acao, (int, float)) and info_acao > 0:
+                # O preço de compra não foi registrado no formato antigo: custo desconhecido (zero)
+                acoes[simbolo] = {"quantidade": int(info_acao), "preco_medio_compra": 0}
+            else:
+                del acoes[simbolo]
+    dados.setdefault("cofre_impostos", 0)
+
+
+@MIGRACOES_ECONOMIA.registrar(3)
+def _indexar_cassino(dados: Dict[str, Any]) -> None:
+    """Cria os agregados do cassino e o índice do ranking (ver cogs/_estatisticas_cassino.py)."""
+    reconstruir_ranking(dados)
 
-# IDs de canais e outras configurações deveriam ficar em um arquivo de config,
-# mas por enquanto, constantes são uma boa prática.
-CANAL_ANUNCIOS_ID = 1406712065061687447
-TAXA_JUROS = 0.02
-TAXA_IMPOSTO_RIQUEZA = 0.01
 
-# --- 3. Camada de Acesso a Dados (Data Access Layer) ---
+# --- 4. Camada de Acesso a Dados (Data Access Layer) ---
 
 class DataManager:
     """
-    Gerencia todas as operações de leitura e escrita do banco de dados (JSON).
+    Gerencia todas as operações de leitura e escrita dos dados de economia.
     Isola a lógica de I/O do resto do cog.
+
+    Os dados são particionados por guild (ver cogs/_armazenamento.py): cada
+    servidor tem a sua própria economia, carregada sob demanda e gravada
+    apenas quando modificada. Todos os métodos recebem o 'guild_id' da
+    partição; use 'id_particao(ctx.guild)' para obtê-lo.
+
+    Toda alteração de saldo deve passar por 'movimentar' (ou 'update_balance'),
+    que também registra o lançamento no extrato da guild (ver cogs/_extrato.py).
     """
-    def __init__(self, bot: commands.Bot, file_path: Path):
+    def __init__(self, bot: commands.Bot, diretorio: Path, armazenamento=None, extrato=None):
         self.bot = bot
-        self.path = file_path
-        self._ensure_file_exists()
-
-    def _ensure_file_exists(self):
-        """Garante que o arquivo JSON exista, criando um vazio se necessário."""
-        if not self.path.exists():
-            log.warning(f"Arquivo de economia não encontrado. Criando um novo em: {self.path}")
-            self.path.write_text("{}", encoding='utf-8')
-
-    def _default_user_schema(self) -> Dict[str, Any]:
-        """Retorna a estrutura padrão para um novo usuário."""
-        return {
-            "carteira": 500,
-            "banco": 0,
-            "acoes": {},
-            "cc_stats": {
-                "jogos": 0,
-                "vitorias": 0,
-                "total_apostado": 0,
-                "lucro_total": 0
-            }
-        }
+        # Após um '!reload', o armazenamento da instância anterior é reaproveitado
+        # (partições em memória e gravações pendentes incluídas).
+        self._herdado = armazenamento is not None
+        self.armazenamento = armazenamento if armazenamento is not None else criar_armazenamento(
+            diretorio, ARQUIVO_ECONOMIA.name,
+            ao_carregar=MIGRACOES_ECONOMIA.aplicar,
+            converter=compactar,  # contas de usuário com __slots__ em memória (ver cogs/_contas.py)
+            legado=ARQUIVO_ECONOMIA,
+            guild_legado=int(GUILD_LEGADO_ID) if GUILD_LEGADO_ID else None,
+        )
+        # O extrato só recebe acréscimos, depois que a transação da economia deu certo: sem cópias para desfazer
+        self.extrato = extrato if extrato is not None else criar_armazenamento(diretorio, "extrato.json", desfazer=False)
+        # Lançamentos da transação aberta em cada guild, gravados no extrato quando ela termina
+        self._lancamentos: Dict[int, List[Tuple[str, list]]] = {}
+
+    async def iniciar(self) -> None:
+        """Inicia a gravação periódica das partições modificadas."""
+        if self._herdado:
+            # As migrações podem ter mudado com o código recarregado
+            await self.armazenamento.trocar_ao_carregar(MIGRACOES_ECONOMIA.aplicar)
+        self.armazenamento.iniciar()
+        self.extrato.iniciar()
+
+    async def fechar(self) -> None:
+        """Grava todas as partições pendentes."""
+        await self.armazenamento.fechar()
+        await self.extrato.fechar()
+
+    def guilds(self) -> List[int]:
+        """Ids de todas as guilds que já têm uma economia."""
+        return self.armazenamento.guilds_em_disco()
+
+    def conta(self, dados: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        """Retorna o registro do usuário dentro de 'dados', criando-o se necessário."""
+        user_id_str = str(user_id)
+        if user_id_str not in dados:
+            log.info(f"Criando nova conta para o usuário ID: {user_id_str}")
+            dados[user_id_str] = Conta.de_dict(conta_padrao())
+        return dados[user_id_str]
 
-    async def _load_data(self) -> Dict[str, Any]:
-        """Lê os dados do arquivo JSON de forma assíncrona."""
-        # O lock aqui é menos crucial para leitura, mas garante consistência
-        # se uma escrita estiver acontecendo.
-        async with self.bot.economy_lock:
+    def lancar(self, guild_id: int, user_id: int, motivo: str, conta: str, valor: int, saldo: int) -> None:
+        """Registra um lançamento no extrato. Use dentro de 'transacao'; 'movimentar' já chama este método."""
+        self._lancamentos[guild_id].append((str(user_id), _extrato.lancamento(motivo, conta, valor, saldo)))
+
+    def movimentar(self, guild_id: int, dados: Dict[str, Any], user_id: int, valor: int, motivo: str, conta: str = 'carteira') -> Dict[str, Any]:
+        """
+        Soma 'valor' (em centavos, negativo para saídas) à conta do usuário e
+        registra o lançamento com o 'motivo' (ver _extrato.MOTIVOS). Use dentro
+        de 'transacao'. Retorna o registro do usuário.
+        """
+        registro = self.conta(dados, user_id)
+        registro[conta] += int(valor)
+        self.lancar(guild_id, user_id, motivo, conta, valor, registro[conta])
+        return registro
+
+    def reservar(self, guild_id: int, dados: Dict[str, Any], user_id: int, valor: int) -> bool:
+        """
+        Move 'valor' da carteira para a reserva de ordens do mercado ('reservado').
+        Retorna False, sem alterar nada, se a carteira não tiver saldo.
+        Use dentro de 'transacao'.
+        """
+        conta = self.conta(dados, user_id)
+        if valor <= 0 or conta.get("carteira", 0) < valor:
+            return False
+        self.movimentar(guild_id, dados, user_id, -valor, "ordem_reserva")
+        conta["reservado"] = conta.get("reservado", 0) + valor
+        return True
+
+    def liberar_reserva(self, guild_id: int, dados: Dict[str, Any], user_id: int, valor: int, gasto: int = 0) -> None:
+        """Encerra uma reserva de 'valor': 'gasto' é consumido e o restante volta para a carteira."""
+        conta = self.conta(dados, user_id)
+        conta["reservado"] = conta.get("reservado", 0) - valor
+        if valor - gasto:
+            self.movimentar(guild_id, dados, user_id, valor - gasto, "ordem_devolucao")
+
+    @asynccontextmanager
+    async def transacao(self, guild_id: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Entrega os dados da guild para modificação sob o lock da partição.
+        Nenhuma outra operação da mesma guild acontece entre a leitura e a escrita.
+        Se o bloco levantar uma exceção (ex: OperacaoInvalida), as alterações
+        feitas nele são desfeitas, nos dois backends. Os lançamentos feitos no
+        bloco (ver 'movimentar') vão para o extrato logo depois, só se ele
+        terminar bem.
+
+            async with data_manager.transacao(guild_id) as dados:
+                data_manager.movimentar(guild_id, dados, user_id, -100, "compra_acoes")
+        """
+        lancamentos = []
+        async with self.armazenamento.transacao(guild_id) as dados:
+            self._lancamentos[guild_id] = lancamentos
             try:
-                with open(self.path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                log.error("Arquivo de economia corrompido ou não encontrado. Retornando dados vazios.")
-                return {}
-
-    async def _save_data(self, data: Dict[str, Any]) -> None:
-        """Salva os dados no arquivo JSON de forma assíncrona."""
-        async with self.bot.economy_lock:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4)
-
-    async def get_user_data(self, user_id: int) -> Dict[str, Any]:
+                yield dados
+            finally:
+                del self._lancamentos[guild_id]
+        # Só chega aqui se o bloco terminou sem exceção
+        if lancamentos:
+            async with self.extrato.transacao(guild_id) as extrato:
+                _extrato.anexar(extrato, lancamentos)
+
+    async def get_user_data(self, guild_id: int, user_id: int) -> Dict[str, Any]:
         """
         Obtém os dados de um usuário. Cria a conta se não existir.
         Esta função substitui a necessidade de chamar 'abrir_conta' em cada comando.
+        O registro retornado é o que está em memória: use apenas para leitura.
+        As contas já estão no esquema atual (ver MIGRACOES_ECONOMIA).
         """
-        user_id_str = str(user_id)
-        dados = await self._load_data()
-        
-        if user_id_str not in dados:
-            log.info(f"Criando nova conta para o usuário ID: {user_id_str}")
-            dados[user_id_str] = self._default_user_schema()
-            await self._save_data(dados)
-        
-        # Garante que chaves mais recentes sejam adicionadas a usuários antigos
-        user_needs_update = False
-        for key, value in self._default_user_schema().items():
-            if key not in dados[user_id_str]:
-                dados[user_id_str][key] = value
-                user_needs_update = True
-        
-        if user_needs_update:
-            await self._save_data(dados)
-
-        return dados[user_id_str]
+        registro = (await self.armazenamento.ler(guild_id)).get(str(user_id))
+        if registro is None:
+            async with self.transacao(guild_id) as dados:
+                registro = self.conta(dados, user_id)
+        return registro
 
-    async def update_balance(self, user_id: int, amount: float, account: str = 'carteira') -> bool:
+    async def update_balance(self, guild_id: int, user_id: int, amount: int, account: str = 'carteira', motivo: str = 'ajuste') -> bool:
         """
         Atualiza o saldo de um usuário em uma conta específica ('carteira' ou 'banco').
-        Pode receber valores positivos ou negativos.
+        Pode receber valores positivos ou negativos, sempre em centavos.
+        'motivo' aparece no extrato (ver _extrato.MOTIVOS).
         """
-        user_id_str = str(user_id)
-        dados = await self._load_data()
+        if account not in ('carteira', 'banco'):
+            return False
+        async with self.transacao(guild_id) as dados:
+            self.movimentar(guild_id, dados, user_id, amount, motivo, account)
+        return True
+    
+    async def consumir_cooldown(self, guild_id: int, comando: str, user_id: int, segundos: float) -> float:
+        """
+        Inicia o cooldown de 'comando' para o usuário (ver cogs/_cooldowns.py).
+        Retorna 0 se iniciou, ou os segundos restantes de um cooldown ativo.
+        """
+        # Quem já está em cooldown (o caso de spam) é barrado só com uma leitura
+        ativo = _cooldowns.restante(await self.armazenamento.ler(guild_id), comando, user_id, _cooldowns.agora())
+        if ativo > 0:
+            return ativo
+        async with self.transacao(guild_id) as dados:
+            return _cooldowns.consumir(dados, comando, user_id, segundos, _cooldowns.agora())
 
-        # Garante que a conta existe antes de atualizar
-        if user_id_str not in dados:
-            dados[user_id_str] = self._default_user_schema()
+    async def get_all_data(self, guild_id: int) -> Dict[str, Any]:
+        """Retorna todos os dados da guild para leitura em massa (rank, portfólio)."""
+        return await self.armazenamento.ler(guild_id)
 
-        if account in dados[user_id_str]:
-            dados[user_id_str][account] += amount
-            await self._save_data(dados)
-            return True
-        return False
-    
-    async def get_all_data(self) -> Dict[str, Any]:
-        """Retorna todos os dados para operações em massa (rank, evento diário)."""
-        return await self._load_data()
+    async def pagina_extrato(self, guild_id: int, user_id: int, pagina: int, tamanho: int) -> Tuple[List[list], int]:
+        """Página do extrato do usuário (1 = mais recentes) e o total de páginas."""
+        return _extrato.pagina(await self.extrato.ler(guild_id), user_id, pagina, tamanho)
 
-    async def save_all_data(self, data: Dict[str, Any]) -> None:
-        """Salva a estrutura de dados completa. Usado por operações em massa."""
-        await self._save_data(data)
+    async def compactar_extrato(self, guild_id: int) -> int:
+        """Aplica a retenção do extrato da guild. Retorna quantos lançamentos foram removidos."""
+        async with self.extrato.transacao(guild_id) as extrato:
+            return _extrato.compactar(extrato)
 
 
-# --- 4. O Cog de Economia ---
+def processar_ciclo_diario(dados: Dict[str, Any], lancar: Optional[Callable[[str, str, str, int, int], None]] = None) -> Tuple[int, int]:
+    """
+    Aplica juros e imposto sobre a riqueza a todos os usuários de uma vez.
+
+    Os saldos são copiados para colunas int64 e calculados de forma vetorizada
+    (aritmética inteira exata em centavos). Retorna (juros pagos, impostos).
+    Se 'lancar' for informado, é chamado como 'DataManager.lancar' (sem o
+    guild_id) para cada movimentação diferente de zero.
+    """
+    # Leitura por 'varrer': numa transação, só as contas que mudam passam por 'dados[...]' (e são copiadas)
+    contas = [(chave, registro) for chave, registro in varrer(dados) if chave.isdigit()]
+    ids_usuarios = [chave for chave, _ in contas]
+    if not ids_usuarios:
+        return 0, 0
+
+    carteira_antes = np.fromiter((r.get("carteira", 0) for _, r in contas), dtype=np.int64, count=len(ids_usuarios))
+    banco_antes = np.fromiter((r.get("banco", 0) for _, r in contas), dtype=np.int64, count=len(ids_usuarios))
+    carteira, banco = carteira_antes.copy(), banco_antes.copy()
+
+    # 1. Juros sobre o saldo do banco (arredondados para baixo)
+    juros = banco * TAXA_JUROS_BP // 10_000
+    banco += juros
+
+    # 2. Imposto sobre a riqueza total (nunca sobre saldos negativos)
+    imposto = np.maximum(banco + carteira, 0) * TAXA_IMPOSTO_RIQUEZA_BP // 10_000
+
+    # 3. Deduzir imposto (primeiro da carteira, depois do banco)
+    pago_carteira = np.clip(carteira, 0, imposto)
+    carteira -= pago_carteira
+    banco -= imposto - pago_carteira
+
+    mudaram = np.flatnonzero((carteira != carteira_antes) | (banco != banco_antes))
+    for i, c, b in zip(mudaram.tolist(), carteira[mudaram].tolist(), banco[mudaram].tolist()):
+        registro = dados[ids_usuarios[i]]
+        registro["carteira"] = c
+        registro["banco"] = b
+
+    if lancar is not None:
+        pago_banco = imposto - pago_carteira
+        # Saldo do banco logo após os juros, antes do imposto
+        banco_com_juros = banco + pago_banco
+        colunas = zip(ids_usuarios, juros.tolist(), pago_carteira.tolist(), pago_banco.tolist(),
+                      carteira.tolist(), banco.tolist(), banco_com_juros.tolist())
+        for user_id, j, pc, pb, c, b, bj in colunas:
+            if j:
+                lancar(user_id, "juros", "banco", j, bj)
+            if pc:
+                lancar(user_id, "imposto_riqueza", "carteira", -pc, c)
+            if pb:
+                lancar(user_id, "imposto_riqueza", "banco", -pb, b)
+    return int(juros.sum()), int(imposto.sum())
+
+
+# --- 5. O Cog de Economia ---
 
 class Economia(commands.Cog):
     """Cog para o sistema de economia do bot."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.data_manager = DataManager(bot, ARQUIVO_ECONOMIA)
+        estado = retomar_estado(bot, "Economia") or {}
+        self.data_manager = DataManager(bot, diretorio_dados(), armazenamento=estado.get("armazenamento"), extrato=estado.get("extrato"))
         self.evento_economico_diario.start()
 
-    # --- Funções Auxiliares (Helpers) ---
+    async def cog_load(self):
+        await self.data_manager.iniciar()
 
-    def _format_brl(self, valor: Union[int, float]) -> str:
-        """Formata um número para o padrão de moeda brasileiro. Usa um fallback robusto."""
-        # O locale foi movido para o main.py e sua configuração é global.
-        # Aqui, apenas tentamos usá-lo.
-        try:
-            import locale
-            locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-            return locale.currency(float(valor), grouping=True, symbol="R$")
-        except (ValueError, TypeError, ImportError, locale.Error):
-            # Fallback manual caso o locale não esteja disponível no sistema
-            try:
-                a = f'{float(valor):,.2f}'
-                b = a.replace(',', 'v').replace('.', ',').replace('v', '.')
-                return f"R$ {b}"
-            except (ValueError, TypeError):
-                return "R$ 0,00"
+    async def cog_unload(self):
+        self.evento_economico_diario.cancel()
+        if em_recarga(self.bot):
+            # '!reload': a próxima instância continua com as mesmas partições em memória
+            guardar_estado(self.bot, "Economia", {"armazenamento": self.data_manager.armazenamento, "extrato": self.data_manager.extrato}, descartar=self.data_manager.fechar)
+        else:
+            await self.data_manager.fechar()
+
+    # --- Funções Auxiliares (Helpers) ---
 
-    async def _parse_amount(self, ctx: commands.Context, balance: float, amount_str: str) -> int:
+    def _parse_amount(self, balance: int, amount_str: str) -> int:
         """
-        Converte o argumento de quantia (ex: '100', 'tudo') em um inteiro.
-        Envia mensagens de erro diretamente ao contexto.
+        Converte o argumento de quantia (ex: '100', '12,50', 'tudo') em centavos.
+        Chame dentro da 'transacao' que debita, com o saldo lido nela: 'tudo'
+        vira esse saldo. Levanta OperacaoInvalida com a mensagem de erro.
         """
         if amount_str.lower() in ['tudo', 'all']:
             return int(balance)
         
         try:
-            amount = int(amount_str)
-            if amount <= 0:
-                await ctx.send("A quantia deve ser um número positivo!")
-                return None
-            return amount
+            amount = parse_valor(amount_str)
         except ValueError:
-            await ctx.send("Por favor, insira um número válido ou 'tudo'.")
-            return None
+            raise OperacaoInvalida("Por favor, insira um valor válido (ex: `100` ou `12,50`) ou 'tudo'.") from None
+        if amount <= 0:
+            raise OperacaoInvalida("A quantia deve ser um número positivo!")
+        return amount
 
     # --- Tarefa Diária (Daily Task) ---
 
     @tasks.loop(time=time(hour=18, minute=0, second=0, tzinfo=timezone(timedelta(hours=-3))))
     async def evento_economico_diario(self):
-        """Processa juros e impostos para todos os usuários diariamente."""
+        """Processa juros e impostos para todos os usuários diariamente, guild por guild."""
         log.info("[EVENTO DIÁRIO] Iniciando ciclo de juros e impostos...")
-        
-        dados = await self.data_manager.get_all_data()
-        
-        cofre_antes = dados.get("cofre_impostos", 0)
-        impostos_diarios = dados.get("impostos_diarios", {})
-        impostos_jogos_dia = impostos_diarios.get("jogos", 0)
-        impostos_mercado_dia = impostos_diarios.get("mercado", 0)
-        
-        total_juros_pagos = 0
-        total_impostos_riqueza = 0
+        for guild_id in filter(self._guild_deste_processo, self.data_manager.guilds()):
+            try:
+                await self._ciclo_diario_guild(guild_id)
+            except Exception:
+                log.error(f"[EVENTO DIÁRIO] Erro ao processar a guild {guild_id}.", exc_info=True)
 
-        ids_usuarios = [user_id for user_id in dados if user_id.isdigit()]
-        
-        for user_id in ids_usuarios:
-            user = dados[user_id]
-            banco = user.get("banco", 0)
-            carteira = user.get("carteira", 0)
-
-            # 1. Calcular e adicionar juros
-            juros = banco * TAXA_JUROS
-            user["banco"] += juros
-            total_juros_pagos += juros
-
-            # 2. Calcular imposto sobre a riqueza total
-            riqueza_total = user["banco"] + carteira
-            imposto = riqueza_total * TAXA_IMPOSTO_RIQUEZA
-            total_impostos_riqueza += imposto
-
-            # 3. Deduzir imposto (primeiro da carteira, depois do banco)
-            if carteira >= imposto:
-                user["carteira"] -= imposto
-            else:
-                imposto_restante = imposto - carteira
-                user["carteira"] = 0
-                user["banco"] -= imposto_restante
-            
-            # Truncar para valores inteiros (representando centavos, se preferir)
-            user["carteira"] = int(user["carteira"])
-            user["banco"] = int(user["banco"])
+    def _guild_deste_processo(self, guild_id: int) -> bool:
+        """
+        Com vários processos compartilhando os dados, cada guild é processada
+        apenas pelo processo que a atende (mensagens diretas chegam ao shard 0).
+        """
+        if guild_id == PARTICAO_SEM_GUILD:
+            return 0 in (getattr(self.bot, 'shard_ids', None) or [self.bot.shard_id or 0])
+        return self.bot.get_guild(guild_id) is not None
 
-        # Atualizar cofre e zerar contadores diários
-        dados["cofre_impostos"] = int(cofre_antes + total_impostos_riqueza)
-        dados["impostos_diarios"] = {"jogos": 0, "mercado": 0}
-        
-        await self.data_manager.save_all_data(dados)
-        log.info(f"[EVENTO DIÁRIO] Ciclo concluído. Juros pagos: {total_juros_pagos}, Impostos de Riqueza: {total_impostos_riqueza}")
+    async def _ciclo_diario_guild(self, guild_id: int):
+        async with self.data_manager.transacao(guild_id) as dados:
+            impostos_diarios = dados.get("impostos_diarios", {})
+            impostos_jogos_dia = impostos_diarios.get("jogos", 0)
+            impostos_mercado_dia = impostos_diarios.get("mercado", 0)
+
+            total_juros_pagos, total_impostos_riqueza = processar_ciclo_diario(dados, partial(self.data_manager.lancar, guild_id))
+
+            # Atualizar cofre e zerar contadores diários
+            dados["cofre_impostos"] = dados.get("cofre_impostos", 0) + total_impostos_riqueza
+            dados["impostos_diarios"] = {"jogos": 0, "mercado": 0}
+            cofre_total = dados["cofre_impostos"]
+
+        removidos = await self.data_manager.compactar_extrato(guild_id)
+        log.info(f"[EVENTO DIÁRIO] Guild {guild_id} concluída. Lançamentos antigos removidos do extrato: {removidos}. Juros pagos: {total_juros_pagos}, Impostos de Riqueza: {total_impostos_riqueza} (centavos)")
 
-        # Anunciar no canal
-        canal = self.bot.get_channel(CANAL_ANUNCIOS_ID)
-        if canal:
+        # Anunciar no canal configurado da guild (o envio acontece na fila do cog Anuncios)
+        anuncios = self.bot.get_cog('Anuncios')
+        if anuncios:
             impostos_totais_dia = impostos_jogos_dia + impostos_mercado_dia + total_impostos_riqueza
             embed = discord.Embed(
                 title="💰 Resumo Econômico Diário 💰",
                 description="Juros foram pagos e os impostos do dia foram recolhidos!",
                 color=discord.Color.gold()
             )
-            embed.add_field(name="Total de Juros Pagos aos Cidadãos", value=f"🟢 `{self._format_brl(total_juros_pagos)}`", inline=False)
-            embed.add_field(name="Total de Impostos Arrecadados Hoje", value=f"🔴 `{self._format_brl(impostos_totais_dia)}`", inline=False)
-            embed.add_field(name="Saldo Total do Cofre Público", value=f"🏦 `{self._format_brl(dados['cofre_impostos'])}`", inline=False)
-            await canal.send(embed=embed)
+            embed.add_field(name="Total de Juros Pagos aos Cidadãos", value=f"🟢 `{format_centavos(total_juros_pagos)}`", inline=False)
+            embed.add_field(name="Total de Impostos Arrecadados Hoje", value=f"🔴 `{format_centavos(impostos_totais_dia)}`", inline=False)
+            embed.add_field(name="Saldo Total do Cofre Público", value=f"🏦 `{format_centavos(cofre_total)}`", inline=False)
+            await anuncios.anunciar(guild_id, "economia", chave="diario", embed=embed)
 
     @evento_economico_diario.before_loop
     async def before_evento_economico_diario(self):
@@ -265,106 +469,138 @@ class Economia(commands.Cog):
     async def saldo(self, ctx: commands.Context, membro: discord.Member = None):
         membro = membro or ctx.author
         
-        user_data = await self.data_manager.get_user_data(membro.id)
+        user_data = await self.data_manager.get_user_data(id_particao(ctx.guild), membro.id)
         
         embed = discord.Embed(title=f"💰 Saldo de {membro.display_name}", color=discord.Color.green())
-        embed.add_field(name="Carteira", value=f"`{self._format_brl(user_data['carteira'])}`", inline=True)
-        embed.add_field(name="Banco", value=f"`{self._format_brl(user_data['banco'])}`", inline=True)
+        embed.add_field(name="Carteira", value=f"`{format_centavos(user_data['carteira'])}`", inline=True)
+        embed.add_field(name="Banco", value=f"`{format_centavos(user_data['banco'])}`", inline=True)
+        if user_data.get("reservado"):
+            embed.add_field(name="Reservado em Ordens", value=f"`{format_centavos(user_data['reservado'])}`", inline=True)
         if membro.avatar:
             embed.set_thumbnail(url=membro.avatar.url)
         await ctx.send(embed=embed)
 
-    @commands.cooldown(1, 3600, commands.BucketType.user)
+    @commands.command(name="extrato", aliases=["historico"], help="Mostra as suas últimas movimentações: `!extrato [página]`.")
+    async def extrato(self, ctx: commands.Context, pagina: int = 1):
+        lancamentos, total_paginas = await self.data_manager.pagina_extrato(id_particao(ctx.guild), ctx.author.id, pagina, LANCAMENTOS_POR_PAGINA)
+        if not lancamentos:
+            await ctx.send("Você ainda não tem movimentações no extrato." if pagina == 1 else f"Página inválida. O seu extrato tem {total_paginas} página(s).")
+            return
+
+        linhas = []
+        for horario, motivo, conta, valor, saldo in lancamentos:
+            sinal = "+" if valor > 0 else "-"
+            nome_conta = "Banco" if conta == "b" else "Carteira"
+            linhas.append(
+                f"<t:{horario}:d> <t:{horario}:t> **{_extrato.MOTIVOS.get(motivo, motivo)}**\n"
+                f"└ `{sinal}{format_centavos(abs(valor))}` ({nome_conta}: `{format_centavos(saldo)}`)"
+            )
+        embed = discord.Embed(title=f"🧾 Extrato de {ctx.author.display_name}", description="\n".join(linhas), color=discord.Color.dark_blue())
+        embed.set_footer(text=f"Página {pagina}/{total_paginas} | Mostrando os últimos {_extrato.RETENCAO_DIAS} dias")
+        await ctx.send(embed=embed)
+
+    @cooldown_persistente(3600)
     @commands.command(name="trabalhar", aliases=["work"], help="Trabalhe para ganhar dinheiro.")
     async def trabalhar(self, ctx: commands.Context):
-        ganhos = random.randint(100, 500)
+        ganhos = random.randint(GANHO_TRABALHO_MIN, GANHO_TRABALHO_MAX)
         
-        await self.data_manager.update_balance(ctx.author.id, ganhos, 'carteira')
+        await self.data_manager.update_balance(id_particao(ctx.guild), ctx.author.id, ganhos, 'carteira', motivo="trabalho")
         
         embed = discord.Embed(
             title="👨‍💻 Hora do Trabalho!",
-            description=f"Você trabalhou e ganhou **{self._format_brl(ganhos)}**!",
+            description=f"Você trabalhou e ganhou **{format_centavos(ganhos)}**!",
             color=discord.Color.blue()
         )
         await ctx.send(embed=embed)
 
     @commands.command(name="depositar", aliases=["dep"], help="Deposita dinheiro no banco.")
     async def depositar(self, ctx: commands.Context, quantia_str: str):
-        user_data = await self.data_manager.get_user_data(ctx.author.id)
-        saldo_carteira = user_data.get('carteira', 0)
-        
-        quantia = await self._parse_amount(ctx, saldo_carteira, quantia_str)
-        if quantia is None: return
-
-        if saldo_carteira < quantia:
-            await ctx.send("Você não tem dinheiro suficiente na carteira para depositar essa quantia.")
+        # O saldo é conferido na mesma transação que debita: dois comandos
+        # simultâneos não gastam o mesmo dinheiro
+        guild_id = id_particao(ctx.guild)
+        try:
+            async with self.data_manager.transacao(guild_id) as dados:
+                saldo_carteira = self.data_manager.conta(dados, ctx.author.id).get('carteira', 0)
+                quantia = self._parse_amount(saldo_carteira, quantia_str)
+                if saldo_carteira < quantia:
+                    raise OperacaoInvalida("Você não tem dinheiro suficiente na carteira para depositar essa quantia.")
+
+                self.data_manager.movimentar(guild_id, dados, ctx.author.id, -quantia, "deposito", 'carteira')
+                self.data_manager.movimentar(guild_id, dados, ctx.author.id, quantia, "deposito", 'banco')
+        except OperacaoInvalida as e:
+            await ctx.send(str(e))
             return
 
-        await self.data_manager.update_balance(ctx.author.id, -quantia, 'carteira')
-        await self.data_manager.update_balance(ctx.author.id, quantia, 'banco')
-
         embed = discord.Embed(
             title="🏦 Depósito Realizado",
-            description=f"Você depositou **{self._format_brl(quantia)}** no banco.",
+            description=f"Você depositou **{format_centavos(quantia)}** no banco.",
             color=discord.Color.blurple()
         )
         await ctx.send(embed=embed)
 
     @commands.command(name="sacar", aliases=["saque"], help="Saca dinheiro do banco.")
     async def sacar(self, ctx: commands.Context, quantia_str: str):
-        user_data = await self.data_manager.get_user_data(ctx.author.id)
-        saldo_banco = user_data.get('banco', 0)
-        
-        quantia = await self._parse_amount(ctx, saldo_banco, quantia_str)
-        if quantia is None:
-            return
-
-        if saldo_banco < quantia:
-            await ctx.send("Você não tem dinheiro suficiente no banco para sacar essa quantia.")
+        # As duas contas mudam na mesma transação que confere o saldo
+        guild_id = id_particao(ctx.guild)
+        try:
+            async with self.data_manager.transacao(guild_id) as dados:
+                saldo_banco = self.data_manager.conta(dados, ctx.author.id).get('banco', 0)
+                quantia = self._parse_amount(saldo_banco, quantia_str)
+                if saldo_banco < quantia:
+                    raise OperacaoInvalida("Você não tem dinheiro suficiente no banco para sacar essa quantia.")
+
+                self.data_manager.movimentar(guild_id, dados, ctx.author.id, quantia, "saque", 'carteira')
+                self.data_manager.movimentar(guild_id, dados, ctx.author.id, -quantia, "saque", 'banco')
+        except OperacaoInvalida as e:
+            await ctx.send(str(e))
             return
 
-        # Realiza a transação de forma atômica (embora com JSON seja simulado)
-        await self.data_manager.update_balance(ctx.author.id, quantia, 'carteira')
-        await self.data_manager.update_balance(ctx.author.id, -quantia, 'banco')
-
         embed = discord.Embed(
             title="💵 Saque Realizado",
-            description=f"Você sacou **{self._format_brl(quantia)}** do banco.",
+            description=f"Você sacou **{format_centavos(quantia)}** do banco.",
             color=discord.Color.dark_teal()
         )
         await ctx.send(embed=embed)
 
     @commands.command(name="pagar", aliases=["pay", "pix"], help="Transfere dinheiro para outro membro.")
-    async def pagar(self, ctx: commands.Context, receptor: discord.Member, quantia: int):
+    async def pagar(self, ctx: commands.Context, receptor: discord.Member, quantia_str: str):
         pagador = ctx.author
 
         if receptor.bot or pagador == receptor:
             await ctx.send("Você não pode transferir dinheiro para si mesmo ou para um bot.")
             return
+
+        try:
+            quantia = parse_valor(quantia_str)
+        except ValueError:
+            await ctx.send("Valor inválido. Use, por exemplo, `100` ou `12,50`.")
+            return
         if quantia <= 0:
             await ctx.send("A quantia a ser paga deve ser positiva!")
             return
 
-        dados_pagador = await self.data_manager.get_user_data(pagador.id)
-        if dados_pagador['carteira'] < quantia:
-            await ctx.send(f"Você não tem dinheiro suficiente na carteira para fazer essa transferência!")
+        # Realiza a transação ('movimentar' cria a conta do receptor, se necessário)
+        guild_id = id_particao(ctx.guild)
+        try:
+            async with self.data_manager.transacao(guild_id) as dados:
+                saldo_pagador = self.data_manager.conta(dados, pagador.id).get('carteira', 0)
+                if saldo_pagador < quantia:
+                    raise OperacaoInvalida("Você não tem dinheiro suficiente na carteira para fazer essa transferência!")
+
+                self.data_manager.movimentar(guild_id, dados, pagador.id, -quantia, "pix_enviado")
+                self.data_manager.movimentar(guild_id, dados, receptor.id, quantia, "pix_recebido")
+        except OperacaoInvalida as e:
+            await ctx.send(str(e))
             return
-        
-        # Garante que a conta do receptor exista antes da transferência
-        await self.data_manager.get_user_data(receptor.id)
-
-        # Realiza a transação
-        await self.data_manager.update_balance(pagador.id, -quantia, 'carteira')
-        await self.data_manager.update_balance(receptor.id, quantia, 'carteira')
 
         embed = discord.Embed(
             title="💸 Transferência Realizada!",
-            description=f"**{pagador.display_name}** transferiu **{self._format_brl(quantia)}** para **{receptor.display_name}**.",
+            description=f"**{pagador.display_name}** transferiu **{format_centavos(quantia)}** para **{receptor.display_name}**.",
             color=discord.Color.gold()
         )
         await ctx.send(embed=embed)
 
-    @commands.cooldown(1, 300, commands.BucketType.user)
+    @cooldown_persistente(300)
     @commands.command(name="roubar", help="Tente roubar de outro membro.")
     async def roubar(self, ctx: commands.Context, alvo: discord.Member):
         autor = ctx.author
@@ -373,38 +609,41 @@ class Economia(commands.Cog):
             await ctx.send("Você não pode roubar a si mesmo ou a um bot.")
             return
 
-        dados_autor = await self.data_manager.get_user_data(autor.id)
-        dados_alvo = await self.data_manager.get_user_data(alvo.id)
-
-        saldo_carteira_alvo = dados_alvo.get("carteira", 0)
-        saldo_carteira_autor = dados_autor.get("carteira", 0)
-
-        # Validações
-        if saldo_carteira_alvo < 200:
-            await ctx.send(f"{alvo.display_name} é pobre demais para valer o risco do roubo (precisa ter no mínimo {self._format_brl(200)}).")
-            return
-        if saldo_carteira_autor < 100:
-            await ctx.send(f"Você precisa de pelo menos {self._format_brl(100)} na carteira para tentar um roubo e arcar com a possível multa.")
+        # Validações e valores usam os saldos lidos na mesma transação que os altera
+        guild_id = id_particao(ctx.guild)
+        try:
+            async with self.data_manager.transacao(guild_id) as dados:
+                saldo_carteira_alvo = self.data_manager.conta(dados, alvo.id).get("carteira", 0)
+                saldo_carteira_autor = self.data_manager.conta(dados, autor.id).get("carteira", 0)
+
+                if saldo_carteira_alvo < ROUBO_SALDO_MINIMO_ALVO:
+                    raise OperacaoInvalida(f"{alvo.display_name} é pobre demais para valer o risco do roubo (precisa ter no mínimo {format_centavos(ROUBO_SALDO_MINIMO_ALVO)}).")
+                if saldo_carteira_autor < ROUBO_SALDO_MINIMO_AUTOR:
+                    raise OperacaoInvalida(f"Você precisa de pelo menos {format_centavos(ROUBO_SALDO_MINIMO_AUTOR)} na carteira para tentar um roubo e arcar com a possível multa.")
+
+                # Lógica do Roubo (40% de chance de sucesso)
+                sucesso = random.randint(1, 100) <= 40
+                if sucesso:
+                    quantia_roubada = int(saldo_carteira_alvo * random.uniform(0.10, 0.50))
+                    self.data_manager.movimentar(guild_id, dados, autor.id, quantia_roubada, "roubo")
+                    self.data_manager.movimentar(guild_id, dados, alvo.id, -quantia_roubada, "roubado")
+                else:
+                    multa = int(saldo_carteira_autor * random.uniform(0.05, 0.20))
+                    self.data_manager.movimentar(guild_id, dados, autor.id, -multa, "multa_roubo")
+        except OperacaoInvalida as e:
+            await ctx.send(str(e))
             return
-        
-        # Lógica do Roubo (40% de chance de sucesso)
-        if random.randint(1, 100) <= 40:
-            # Sucesso
-            quantia_roubada = int(saldo_carteira_alvo * random.uniform(0.10, 0.50))
-            await self.data_manager.update_balance(autor.id, quantia_roubada, 'carteira')
-            await self.data_manager.update_balance(alvo.id, -quantia_roubada, 'carteira')
+
+        if sucesso:
             embed = discord.Embed(
                 title="🏴‍☠️ Roubo Bem-Sucedido!",
-                description=f"Você foi sorrateiro e roubou **{self._format_brl(quantia_roubada)}** de {alvo.mention}!",
+                description=f"Você foi sorrateiro e roubou **{format_centavos(quantia_roubada)}** de {alvo.mention}!",
                 color=discord.Color.dark_green()
             )
         else:
-            # Falha
-            multa = int(saldo_carteira_autor * random.uniform(0.05, 0.20))
-            await self.data_manager.update_balance(autor.id, -multa, 'carteira')
             embed = discord.Embed(
                 title="🚨 Falha no Roubo!",
-                description=f"Você foi apanhado! Para escapar, você pagou uma multa de **{self._format_brl(multa)}**.",
+                description=f"Você foi apanhado! Para escapar, você pagou uma multa de **{format_centavos(multa)}**.",
                 color=discord.Color.dark_red()
             )
             
@@ -412,7 +651,7 @@ class Economia(commands.Cog):
 
     @commands.command(name="topricos", aliases=["rank", "top"], help="Mostra o ranking dos mais ricos.")
     async def topricos(self, ctx: commands.Context):
-        todos_os_dados = await self.data_manager.get_all_data()
+        todos_os_dados = await self.data_manager.get_all_data(id_particao(ctx.guild))
 
         dados_usuarios = {
             user_id: data for user_id, data in todos_os_dados.items() 
@@ -452,9 +691,9 @@ class Economia(commands.Cog):
             elif i == 2: prefixo = "🥉"
             else: prefixo = f"{i + 1}"
 
-            valor_total_fmt = self._format_brl(total)
-            valor_carteira_fmt = self._format_brl(carteira)
-            valor_banco_fmt = self._format_brl(banco)
+            valor_total_fmt = format_centavos(total)
+            valor_carteira_fmt = format_centavos(carteira)
+            valor_banco_fmt = format_centavos(banco)
             
             # Monta o bloco de texto para cada usuário
             bloco_usuario = (
@@ -1,27 +1,44 @@
 import logging
-from typing import List
+from typing import NamedTuple, Optional, Tuple
 
 import discord
 from discord.ext import commands
 
 # Importa a calculadora do novo módulo de utilidades com o nome corrigido
-from cogs._utilidades import SafeCalculator
+from cogs._utilidades import SafeCalculator, LimiteExcedido
 
 log = logging.getLogger(__name__)
 
+class PaginaAjuda(NamedTuple):
+    """Conteúdo imutável de uma página do !ajuda. O Embed é criado a cada envio."""
+    titulo: str
+    descricao: str
+    rodape: str
+
+    def para_embed(self) -> discord.Embed:
+        embed = discord.Embed(title=self.titulo, description=self.descricao, color=discord.Color.blurple())
+        embed.set_footer(text=self.rodape)
+        return embed
+
 class Geral(commands.Cog):
     """Cog para comandos gerais e de utilidade."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.calculator = SafeCalculator()
+        # Catálogo do !ajuda, montado sob demanda e invalidado quando os cogs mudam
+        self._paginas_ajuda: Optional[Tuple[PaginaAjuda, ...]] = None
+        self._assinatura_cogs: Tuple = ()
+
+    def cog_unload(self):
+        self.calculator.close()
 
     # --- Classe da View aninhada para encapsulamento ---
     class HelpPaginationView(discord.ui.View):
-        def __init__(self, autor_comando: discord.User, embeds: List[discord.Embed]):
+        def __init__(self, autor_comando: discord.User, paginas: Tuple[PaginaAjuda, ...]):
             super().__init__(timeout=120.0)
             self.autor_comando = autor_comando
-            self.embeds = embeds
+            self.paginas = paginas
             self.current_page = 0
             self._update_buttons()
 
@@ -32,21 +49,20 @@ class Geral(commands.Cog):
             return True
         
         def _update_buttons(self):
-            self.prev_button.disabled = len(self.embeds) <= 1
-            self.next_button.disabled = len(self.embeds) <= 1
+            self.prev_button.disabled = len(self.paginas) <= 1
+            self.next_button.disabled = len(self.paginas) <= 1
 
         async def update_message(self, interaction: discord.Interaction):
-            self.embeds[self.current_page].set_footer(text=f"Página {self.current_page + 1} de {len(self.embeds)}")
-            await interaction.response.edit_message(embed=self.embeds[self.current_page], view=self)
+            await interaction.response.edit_message(embed=self.paginas[self.current_page].para_embed(), view=self)
 
         @discord.ui.button(label="Anterior", style=discord.ButtonStyle.secondary, emoji="⬅️")
         async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.current_page = (self.current_page - 1) % len(self.embeds)
+            self.current_page = (self.current_page - 1) % len(self.paginas)
             await self.update_message(interaction)
 
         @discord.ui.button(label="Próximo", style=discord.ButtonStyle.primary, emoji="➡️")
         async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-            self.current_page = (self.current_page + 1) % len(self.embeds)
+            self.current_page = (self.current_page + 1) % len(self.paginas)
             await self.update_message(interaction)
 
     # --- Comandos do Cog ---
@@ -56,8 +72,8 @@ class Geral(commands.Cog):
         latency_ms = self.bot.latency * 1000
         await ctx.send(f'Pong! 🏓 Minha latência é de {latency_ms:.2f}ms.')
 
-    def _build_help_pages(self) -> List[discord.Embed]:
-        embeds = []
+    def _build_help_pages(self) -> Tuple[PaginaAjuda, ...]:
+        blocos = []
         # Omitir o cog 'Geral' do cálculo para não mostrar a si mesmo
         cogs_a_exibir = [cog_name for cog_name in sorted(self.bot.cogs) if cog_name != "Geral"]
 
@@ -72,31 +88,44 @@ class Geral(commands.Cog):
             for command in public_commands:
                 aliases = f" (aliases: {', '.join(command.aliases)})" if command.aliases else ""
                 command_list_str.append(f"**`!{command.name}`**{aliases}\n* {command.help or 'Sem descrição.'}*")
-            
-            embed = discord.Embed(
-                title=f"📜 Categoria: {cog_name}",
-                description="\n\n".join(command_list_str),
-                color=discord.Color.blurple()
-            )
-            embeds.append(embed)
-        return embeds
+            blocos.append((f"📜 Categoria: {cog_name}", "\n\n".join(command_list_str)))
+
+        total = len(blocos)
+        return tuple(
+            PaginaAjuda(titulo, descricao, f"Página {i} de {total}")
+            for i, (titulo, descricao) in enumerate(blocos, start=1)
+        )
+
+    def _get_help_pages(self) -> Tuple[PaginaAjuda, ...]:
+        """Retorna o catálogo em cache, reconstruindo-o apenas se algum cog mudou."""
+        # A assinatura cobre cogs carregados/removidos sem passar pelo !reload
+        # (ex: extensões carregadas depois do Geral no setup_hook).
+        assinatura = tuple((nome, id(cog)) for nome, cog in self.bot.cogs.items())
+        if self._paginas_ajuda is None or assinatura != self._assinatura_cogs:
+            self._paginas_ajuda = self._build_help_pages()
+            self._assinatura_cogs = assinatura
+        return self._paginas_ajuda
+
+    @commands.Cog.listener()
+    async def on_extensao_recarregada(self, nome_extensao: str):
+        """Disparado pelo Admin após um !reload: descarta o catálogo de ajuda."""
+        self._paginas_ajuda = None
+        log.info(f"Catálogo do !ajuda invalidado após recarregar '{nome_extensao}'.")
 
     @commands.command(name="ajuda", aliases=["comandos", "help"], help="Mostra esta mensagem de ajuda.")
     async def ajuda(self, ctx: commands.Context):
-        embeds = self._build_help_pages()
+        paginas = self._get_help_pages()
 
-        if not embeds:
+        if not paginas:
             return await ctx.send("Não foram encontrados comandos para exibir.")
             
-        view = self.HelpPaginationView(ctx.author, embeds)
-        
-        embeds[0].set_footer(text=f"Página 1 de {len(embeds)}")
-        await ctx.send(embed=embeds[0], view=view)
+        view = self.HelpPaginationView(ctx.author, paginas)
+        await ctx.send(embed=paginas[0].para_embed(), view=view)
         
     @commands.command(name="calcular", aliases=["calc"], help="Calcula uma expressão matemática.")
     async def calcular(self, ctx: commands.Context, *, expressao: str):
         try:
-            resultado = self.calculator.calculate(expressao)
+            resultado = await self.calculator.calculate_async(expressao)
             
             if isinstance(resultado, float) and resultado.is_integer():
                 resultado_fmt = str(int(resultado))
@@ -110,7 +139,9 @@ class Geral(commands.Cog):
             embed.add_field(name="Resultado", value=f"```fix\n{resultado_fmt}```", inline=False)
             await ctx.send(embed=embed)
             
-        except (TypeError, SyntaxError, ZeroDivisionError) as e:
+        except LimiteExcedido as e:
+            await ctx.send(f"⏱️ **Expressão pesada demais:** {e}")
+        except (TypeError, SyntaxError, ZeroDivisionError, OverflowError) as e:
             await ctx.send(f"❌ **Erro na expressão:** Expressão matemática inválida ou não suportada.\n`Detalhe: {e}`")
         except Exception as e:
             log.error(f"Erro inesperado na calculadora: {e}", exc_info=True)
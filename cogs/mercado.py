@@ -1,23 +1,50 @@
 import discord
 from discord.ext import commands, tasks
-import json
+import asyncio
 import os
-import random
-import traceback
-import locale
+import logging
 import matplotlib
 matplotlib.use('Agg') # Otimização de memória para servidores
 import matplotlib.pyplot as plt
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, time, timezone, timedelta
+
+from cogs._armazenamento import OperacaoInvalida, criar_armazenamento, diretorio_dados, id_particao, varrer
+from cogs._moeda import format_centavos, para_centavos, parse_valor
+from cogs._recarga import em_recarga, guardar_estado, retomar_estado
+from cogs import _backtest, _indicadores
+from cogs._processos import encerrar_pool, novo_pool
+from cogs._ordens import TIPOS_ORDEM, alguma_dispara, cancelar, disparadas, do_usuario, inserir, livro_ordens
+from cogs._registro_acoes import IndiceAcoes, validar_listagem
+from cogs._simulacao import PRECO_MINIMO, simular_ticks, um_tick
+
+log = logging.getLogger(__name__)
 
 # --- CAMINHOS DE FICHEIRO CORRIGIDOS E ROBUSTOS ---
 DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cada guild tem o seu mercado em 'dados/<guild_id>/'; os arquivos da raiz são o modelo inicial.
 ARQUIVO_MERCADO = os.path.join(DIRETORIO_RAIZ, "mercado.json")
-ARQUIVO_ECONOMIA = os.path.join(DIRETORIO_RAIZ, "economia.json")
 ARQUIVO_HISTORICO = os.path.join(DIRETORIO_RAIZ, "historico_mercado.json")
 
 # --- CONFIGURAÇÃO ---
-CANAL_ANUNCIOS_MERCADO_ID = 1407388860392144968 # Certifique-se de que este ID de canal está correto
+# O canal de anúncios do mercado é configurado por guild com '!canalanuncios mercado #canal'.
+# Preços e médias de compra ficam em centavos inteiros; o imposto usa pontos-base.
+TAXA_IMPOSTO_LUCRO_BP = 500 # 5% sobre o lucro da venda
+MAX_ORDENS_POR_USUARIO = 20
+TAMANHO_HISTORICO = 10  # preços mostrados por ação no '!grafico'
+HISTORICO_GUARDADO = max(TAMANHO_HISTORICO, _indicadores.PRECOS_PARA_INICIAR)  # o suficiente para iniciar os indicadores
+ACOES_POR_PAGINA = 24  # campos por embed (o Discord aceita até 25)
+# Os ticks caem nas fronteiras de INTERVALO_TICK do relógio (:00, :05, :10...), e não a
+# cada 5 minutos desde a partida do bot. Cada ação guarda a fronteira do seu último tick
+# ('ultimo_tick'), então os ticks perdidos com o bot fora do ar são recuperados de uma vez.
+INTERVALO_TICK = 5 * 60
+MAX_TICKS_RECUPERADOS = 7 * 24 * 60 * 60 // INTERVALO_TICK  # no máximo 7 dias são simulados
+# '!backtest' roda em um processo separado. A avaliação usa ~400 B por preço (ações x caminhos x
+# ticks, todas as estratégias juntas): o limite mantém o worker em torno de 100 MB
+MAX_CAMINHOS_BACKTEST = 50
+MAX_PRECOS_BACKTEST = 250_000
+TICKS_BACKTEST_PADRAO = 24 * 60 * 60 // INTERVALO_TICK  # um dia simulado: o histórico guardado é curto para os indicadores
+TEMPO_LIMITE_BACKTEST = 120  # segundos
+HORARIOS_TICK = [time(hour=m // 60, minute=m % 60, tzinfo=timezone.utc) for m in range(0, 24 * 60, INTERVALO_TICK // 60)]
 
 plt.style.use('dark_background')
 
@@ -26,185 +53,379 @@ class Mercado(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.carregar_dados_iniciais_historico()
+        # Após um '!reload', os dados em memória vêm da instância anterior. O tick não precisa
+        # ser guardado: o do horário atual já está registrado em cada ação ('ultimo_tick').
+        estado = retomar_estado(bot, "Mercado"); self._herdado = estado is not None
+        if self._herdado: self.mercados, self.historicos = estado["mercados"], estado["historicos"]
+        else:
+            self.mercados = criar_armazenamento(diretorio_dados(), os.path.basename(ARQUIVO_MERCADO), ao_carregar=self._migrar_mercado_para_centavos, modelo=ARQUIVO_MERCADO)
+            self.historicos = criar_armazenamento(diretorio_dados(), os.path.basename(ARQUIVO_HISTORICO), ao_carregar=self._migrar_historico_para_centavos, modelo=ARQUIVO_HISTORICO)
+        self._backtests = None  # ProcessPoolExecutor do '!backtest', criado no primeiro uso (ver _processos.py)
+        self._indices = {}  # guild_id -> IndiceAcoes; refeito ao listar/deslistar
         self.update_prices.start()
 
-    def format_brl(self, valor):
-        """Formata um número para o padrão de moeda brasileiro."""
-        try:
-            return locale.currency(float(valor), grouping=True, symbol="R$")
-        except (ValueError, TypeError, locale.Error):
-            try:
-                a = f'{float(valor):,.2f}'
-                b = a.replace(',', 'v').replace('.', ',').replace('v', '.')
-                return f"R$ {b}"
-            except (ValueError, TypeError):
-                return "R$ 0,00"
+    async def cog_load(self):
+        if self._herdado:
+            await self.mercados.trocar_ao_carregar(self._migrar_mercado_para_centavos); await self.historicos.trocar_ao_carregar(self._migrar_historico_para_centavos)
+        self.mercados.iniciar(); self.historicos.iniciar()
+
+    async def cog_unload(self):
+        self.update_prices.cancel(); self._encerrar_backtests()
+        if em_recarga(self.bot): guardar_estado(self.bot, "Mercado", {"mercados": self.mercados, "historicos": self.historicos}, descartar=self._fechar_armazenamentos)
+        else: await self._fechar_armazenamentos()
+
+    async def _fechar_armazenamentos(self):
+        await self.mercados.fechar(); await self.historicos.fechar()
+
+    def _encerrar_backtests(self):
+        encerrar_pool(self._backtests); self._backtests = None
+
+    @property
+    def data_manager(self):
+        """DataManager da Economia: todo acesso aos dados de economia passa por ele."""
+        economia_cog = self.bot.get_cog('Economia')
+        return economia_cog.data_manager if economia_cog else None
 
     # --- Funções Auxiliares ---
-    def carregar_dados_iniciais_historico(self):
-        if not os.path.exists(ARQUIVO_HISTORICO):
-            with open(ARQUIVO_HISTORICO, 'w', encoding='utf-8') as f: json.dump({}, f)
-
-    async def carregar_dados_mercado(self):
-        if not os.path.exists(ARQUIVO_MERCADO) or os.path.getsize(ARQUIVO_MERCADO) == 0: return {}
-        with open(ARQUIVO_MERCADO, 'r', encoding='utf-8') as f: return json.load(f)
-    async def salvar_dados_mercado(self, dados):
-        with open(ARQUIVO_MERCADO, 'w', encoding='utf-8') as f: json.dump(dados, f, indent=4)
-    async def carregar_dados_economia(self):
-        if not os.path.exists(ARQUIVO_ECONOMIA) or os.path.getsize(ARQUIVO_ECONOMIA) == 0: return {}
-        with open(ARQUIVO_ECONOMIA, 'r', encoding='utf-8') as f: return json.load(f)
-    async def salvar_dados_economia(self, dados):
-        with open(ARQUIVO_ECONOMIA, 'w', encoding='utf-8') as f: json.dump(dados, f, indent=4)
-    async def carregar_dados_historico(self):
-        if not os.path.exists(ARQUIVO_HISTORICO) or os.path.getsize(ARQUIVO_HISTORICO) == 0: return {}
-        with open(ARQUIVO_HISTORICO, 'r', encoding='utf-8') as f: return json.load(f)
-    async def salvar_dados_historico(self, dados):
-        with open(ARQUIVO_HISTORICO, 'w', encoding='utf-8') as f: json.dump(dados, f, indent=4)
-
-    @tasks.loop(minutes=5)
+    @staticmethod
+    def _migrar_mercado_para_centavos(mercado) -> bool:
+        """Converte preços antigos em reais (float) para centavos inteiros."""
+        migrou = False
+        for info in mercado.values():
+            for campo in ("preco", "preco_anterior"):
+                if isinstance(info.get(campo), float): info[campo] = para_centavos(info[campo]); migrou = True
+        return migrou
+
+    @staticmethod
+    def _migrar_historico_para_centavos(historico) -> bool:
+        migrou = False
+        for simbolo, precos in historico.items():
+            if any(isinstance(p, float) for p in precos): historico[simbolo] = [para_centavos(p) for p in precos]; migrou = True
+        return migrou
+
+    # Leitura apenas: alterações passam por 'self.mercados.transacao' / 'self.historicos.transacao'.
+    async def carregar_dados_mercado(self, guild_id): return await self.mercados.ler(guild_id)
+    async def carregar_dados_historico(self, guild_id): return await self.historicos.ler(guild_id)
+
+    def _indice(self, guild_id, mercado):
+        """Índice de busca das ações da guild (ver cogs/_registro_acoes.py), refeito quando o mercado muda."""
+        indice = self._indices.get(guild_id)
+        if indice is None or not indice.atualizado(mercado): indice = self._indices[guild_id] = IndiceAcoes(mercado)
+        return indice
+
+    async def _resolver_acao(self, ctx, guild_id, mercado, texto):
+        """Símbolo da ação pelo símbolo ou nome da empresa. Se não existir, avisa com sugestões e retorna None."""
+        if texto.upper() in mercado: return texto.upper()  # caminho comum: uma consulta ao dicionário
+        indice = self._indice(guild_id, mercado); simbolo = indice.resolver(texto)
+        if simbolo in mercado: return simbolo
+        sugestoes = [s for s in indice.buscar(texto, 3) if s in mercado]
+        dica = f" Você quis dizer {', '.join(f'`{s}`' for s in sugestoes)}?" if sugestoes else " Veja `!mercado` ou `!buscaracao`."
+        await ctx.send(f"A ação `{texto.upper()}` não existe.{dica}"); return None
+
+    async def _atualizar_precos_guild(self, guild_id, agora=None):
+        """
+        Aplica os ticks devidos até 'agora' (timestamp; padrão: o relógio). Retorna
+        ({simbolo: [preços dos ticks aplicados]}, {simbolo: preço antes deles}, ordens executadas).
+        Recuperar ticks perdidos custa a mesma escrita de um tick normal em cada documento.
+        """
+        # Transações separadas (e não aninhadas): no backend SQLite cada uma segura o lock de escrita do seu banco.
+        historico = await self.carregar_dados_historico(guild_id)  # só para iniciar indicadores de ações sem estado
+        async with self.mercados.transacao(guild_id) as mercado:
+            iniciais = {simbolo: info["preco"] for simbolo, info in mercado.items()}; series = self._aplicar_tick(mercado, historico, agora)
+        if not series: return series, iniciais, 0  # o tick deste horário já foi aplicado
+        async with self.historicos.transacao(guild_id) as historico: self._registrar_historico(historico, series)
+        return series, iniciais, await self._executar_ordens(guild_id, series)
+
+    async def _executar_ordens(self, guild_id, series):
+        """
+        Executa em lote as ordens paradas que dispararam, tick a tick, ao preço do
+        tick em que dispararam (inclusive nos ticks recuperados). Retorna quantas.
+        """
+        if not self.data_manager: return 0
+        # Sem ordens que disparem, sem transação (e sem a cópia do livro que ela faria para poder desfazer)
+        ordens = (await self.data_manager.get_all_data(guild_id)).get("ordens")
+        if not ordens or not ordens["por_id"] or not alguma_dispara(ordens, series): return 0
+        executadas = 0; ticks = max(map(len, series.values()))
+        async with self.data_manager.transacao(guild_id) as economia:
+            ordens = livro_ordens(economia)
+            for k in range(ticks):
+                for simbolo, precos in series.items():
+                    i = k - (ticks - len(precos))  # as séries terminam todas no tick atual
+                    if i < 0: continue
+                    for ordem in disparadas(ordens, simbolo, precos[i]): self._preencher_ordem(guild_id, economia, ordem, precos[i]); executadas += 1
+        return executadas
+
+    def _preencher_ordem(self, guild_id, economia, ordem, preco):
+        user_id = int(ordem["usuario"]); usuario = self.data_manager.conta(economia, user_id); quantidade = ordem["quantidade"]
+        if ordem["lado"] == "compra":
+            # Compra limitada executa a um preço <= gatilho: a sobra da reserva volta para a carteira
+            self.data_manager.liberar_reserva(guild_id, economia, user_id, ordem["reservado"], gasto=preco * quantidade)
+            self._adicionar_acoes(usuario.setdefault("acoes", {}), ordem["simbolo"], quantidade, preco)
+        else:
+            # As ações já saíram do portfólio quando a ordem foi criada
+            self._creditar_venda(guild_id, economia, user_id, preco * quantidade, (preco - ordem["preco_medio_compra"]) * quantidade, "venda_ordem")
+
+    @staticmethod
+    def _adicionar_acoes(portfolio, simbolo, quantidade, preco):
+        if simbolo in portfolio:
+            qt_antiga = portfolio[simbolo]["quantidade"]; preco_medio_antigo = portfolio[simbolo]["preco_medio_compra"]
+            qt_nova = qt_antiga + quantidade
+            # Média ponderada em centavos, arredondada para o centavo mais próximo
+            novo_preco_medio = ((qt_antiga * preco_medio_antigo) + (quantidade * preco) + qt_nova // 2) // qt_nova
+            portfolio[simbolo]["quantidade"] = qt_nova; portfolio[simbolo]["preco_medio_compra"] = novo_preco_medio
+        else:
+            portfolio[simbolo] = {"quantidade": quantidade, "preco_medio_compra": preco}
+
+    def _creditar_venda(self, guild_id, economia, user_id, ganho_bruto, lucro_total, motivo):
+        """Credita uma venda e cobra o imposto sobre o lucro, que vai para o cofre. Retorna o imposto."""
+        self.data_manager.movimentar(guild_id, economia, user_id, ganho_bruto, motivo)
+        if lucro_total <= 0: return 0
+        imposto = lucro_total * TAXA_IMPOSTO_LUCRO_BP // 10_000
+        if imposto: self.data_manager.movimentar(guild_id, economia, user_id, -imposto, "imposto_lucro")
+        economia["cofre_impostos"] = economia.get("cofre_impostos", 0) + imposto
+        impostos_diarios = economia.setdefault("impostos_diarios", {}); impostos_diarios["mercado"] = impostos_diarios.get("mercado", 0) + imposto
+        return imposto
+
+    @staticmethod
+    def _fronteira_tick(agora=None):
+        """Horário (timestamp) do tick mais recente do relógio até 'agora'."""
+        agora = datetime.now(timezone.utc).timestamp() if agora is None else agora
+        return int(agora // INTERVALO_TICK * INTERVALO_TICK)
+
+    @staticmethod
+    def _aplicar_tick(mercado, historico=None, agora=None):
+        """
+        Aplica a cada ação os ticks que faltam até 'agora': normalmente um; depois de o
+        bot ficar fora do ar, todos os perdidos, simulados de uma vez (ver cogs/_simulacao.py).
+        Retorna {simbolo: [novos preços, do mais antigo ao mais novo]} das ações atualizadas.
+        """
+        fronteira = Mercado._fronteira_tick(agora); series = {}
+        for simbolo, info in mercado.items():
+            if "indicadores" not in info: info["indicadores"] = _indicadores.novo_estado((historico or {}).get(simbolo) or [info["preco"]])
+            ultimo = info.get("ultimo_tick")
+            pendentes = 1 if ultimo is None else min((fronteira - ultimo) // INTERVALO_TICK, MAX_TICKS_RECUPERADOS)
+            if pendentes <= 0: continue  # já atualizada neste horário (ex: logo após um '!reload' ou por outro processo)
+            tendencia = info.get("tendencia", "estavel")
+            if pendentes == 1: novo_preco, tendencia = um_tick(info["preco"], tendencia); precos = [novo_preco]
+            else: precos, tendencia = simular_ticks(info["preco"], tendencia, pendentes)
+            info["preco_anterior"] = precos[-2] if len(precos) > 1 else info["preco"]
+            info["preco"], info["tendencia"], info["ultimo_tick"] = precos[-1], tendencia, fronteira
+            for preco in precos: _indicadores.atualizar(info["indicadores"], preco)
+            series[simbolo] = precos
+        return series
+
+    @staticmethod
+    def _resumo_indicadores(info):
+        """MM, volatilidade e RSI mantidos pelo tick (ver cogs/_indicadores.py); só leitura, O(1)."""
+        estado = info.get("indicadores")
+        if not estado: return "Indicadores disponíveis após a próxima atualização."
+        media, vol, rsi = _indicadores.media(estado), _indicadores.volatilidade(estado), _indicadores.rsi(estado)
+        aquecendo = f" · aquecendo ({len(estado['retornos'])}/{_indicadores.JANELA})" if _indicadores.aquecendo(estado) else ""
+        return (f"MM{_indicadores.JANELA} `{format_centavos(media) if media is not None else '—'}` · "
+                f"Vol `{f'{vol:.1f}%' if vol is not None else '—'}` · RSI `{f'{rsi:.0f}' if rsi is not None else '—'}`{aquecendo}")
+
+    @staticmethod
+    def _registrar_historico(historico, series):
+        for simbolo, precos in series.items():
+            serie = historico.setdefault(simbolo, []); serie.extend(precos)
+            if len(serie) > HISTORICO_GUARDADO: del serie[:-HISTORICO_GUARDADO]
+
+    @staticmethod
+    def _embed_recuperacao(mercado, series, iniciais):
+        """Resumo único dos ticks recuperados, no lugar de um anúncio por tick."""
+        ticks = max(map(len, series.values())); horas = ticks * INTERVALO_TICK / 3600
+        embed = discord.Embed(title="🔔 O Mercado Voltou!", description=f"O mercado ficou parado por cerca de **{horas:.1f}h**. As **{ticks}** atualizações perdidas foram simuladas.", color=discord.Color.blue())
+        variacoes = {simbolo: (precos[-1] - iniciais[simbolo]) / iniciais[simbolo] * 100 if iniciais[simbolo] else 0 for simbolo, precos in series.items()}
+        # Com muitas ações listadas, só as maiores variações cabem no embed
+        for simbolo in sorted(variacoes, key=lambda s: -abs(variacoes[s]))[:ACOES_POR_PAGINA]:
+            embed.add_field(name=f"{mercado[simbolo]['nome']} ({simbolo})", value=f"`{format_centavos(series[simbolo][-1])}` (`{variacoes[simbolo]:+.2f}%`)", inline=True)
+        if len(variacoes) > ACOES_POR_PAGINA: embed.description += f" Maiores variações entre as **{len(variacoes)}** ações:"
+        return embed
+
+    @tasks.loop(time=HORARIOS_TICK)
     async def update_prices(self):
-        mercado = await self.carregar_dados_mercado()
-        historico = await self.carregar_dados_historico()
-        for simbolo in mercado:
-            preco_atual = mercado[simbolo]["preco"]; tendencia_atual = mercado[simbolo].get("tendencia", "estavel")
-            mercado[simbolo]["preco_anterior"] = preco_atual
-            if tendencia_atual == "alta": mudanca_percentual = random.uniform(-0.03, 0.10)
-            elif tendencia_atual == "baixa": mudanca_percentual = random.uniform(-0.10, 0.03)
-            else: mudanca_percentual = random.uniform(-0.05, 0.05)
-            novo_preco = preco_atual * (1 + mudanca_percentual)
-            if novo_preco < 1: novo_preco = 1.0
-            mercado[simbolo]["preco"] = round(novo_preco, 2)
-            if random.randint(1, 4) == 1: mercado[simbolo]["tendencia"] = random.choice(["alta", "baixa", "estavel"])
-            if simbolo not in historico: historico[simbolo] = []
-            historico[simbolo].append(round(novo_preco, 2))
-            if len(historico[simbolo]) > 10: historico[simbolo] = historico[simbolo][-10:]
-        await self.salvar_dados_mercado(mercado)
-        await self.salvar_dados_historico(historico)
-        
+        await self._atualizar_mercados()
+
+    async def _atualizar_mercados(self):
         fuso_horario_brasilia = timezone(timedelta(hours=-3))
         hora_atual_br = datetime.now(fuso_horario_brasilia)
         hora_formatada = hora_atual_br.strftime('%H:%M:%S')
-        print(f"[Mercado Cog] Preços e histórico atualizados às {hora_formatada} (BRT).")
+        embed = discord.Embed(title="🔔 Atualização do Mercado!", description="Os preços das ações foram atualizados!", color=discord.Color.blue())
+        embed.set_footer(text=f"Última atualização às {hora_formatada} (Horário de Brasília)")
+        anuncios = self.bot.get_cog('Anuncios')
 
-        canal = self.bot.get_channel(CANAL_ANUNCIOS_MERCADO_ID)
-        if canal:
-            embed = discord.Embed(title="🔔 Atualização do Mercado!", description="Os preços das ações foram atualizados!", color=discord.Color.blue())
-            embed.set_footer(text=f"Última atualização às {hora_formatada} (Horário de Brasília)")
+        # Cada guild tem um mercado independente; guilds de outros shards/processos não estão em 'bot.guilds'.
+        guild_ids = [guild.id for guild in self.bot.guilds]; ordens_executadas = 0; atualizadas = 0
+        for guild_id in guild_ids:
+            # Um erro em uma guild (inclusive no anúncio) não impede as seguintes nem derruba o loop
             try:
-                await canal.send(embed=embed)
-            except Exception as e:
-                print(f"Erro ao enviar anúncio do mercado: {e}")
+                series, iniciais, executadas = await self._atualizar_precos_guild(guild_id, hora_atual_br.timestamp())
+                if not series: continue
+                ordens_executadas += executadas; atualizadas += 1
+                # Só enfileira: o envio (e o rate limit do Discord) não atrasa o tick. A chave
+                # 'tick' faz um anúncio ainda não enviado ser substituído pelo mais novo.
+                if max(map(len, series.values())) > 1: embed_guild = self._embed_recuperacao(await self.carregar_dados_mercado(guild_id), series, iniciais); embed_guild.set_footer(text=embed.footer.text)
+                else: embed_guild = embed
+                if anuncios: await anuncios.anunciar(guild_id, "mercado", chave="tick", embed=embed_guild)
+            except Exception: log.error(f"Erro ao atualizar o mercado da guild {guild_id}.", exc_info=True)
+        log.info(f"Preços e histórico de {atualizadas}/{len(guild_ids)} guild(s) atualizados às {hora_formatada} (BRT). Ordens executadas: {ordens_executadas}.")
 
     @update_prices.before_loop
     async def before_update_prices(self):
         await self.bot.wait_until_ready()
+        # Recupera os ticks perdidos enquanto o bot estava fora do ar antes de esperar o próximo
+        # horário. Logo após um '!reload' não há nenhum pendente, então nada muda.
+        await self._atualizar_mercados()
 
-    @commands.command(name="mercado", aliases=["acoes", "bolsa"], help="Mostra os preços das ações.")
-    async def mercado(self, ctx):
-        dados = await self.carregar_dados_mercado()
-        embed = discord.Embed(title="📈 Mercado de Ações 📉", description="Cotações em tempo real com tendências.", color=discord.Color.dark_blue())
-        for simbolo, info in dados.items():
+    @commands.command(name="mercado", aliases=["acoes", "bolsa"], help="Mostra os preços das ações: `!mercado [página]`.")
+    async def mercado(self, ctx, pagina: int = 1):
+        dados = await self.carregar_dados_mercado(id_particao(ctx.guild))
+        total_paginas = max(1, -(-len(dados) // ACOES_POR_PAGINA)); pagina = min(max(pagina, 1), total_paginas)
+        embed = discord.Embed(title="📈 Mercado de Ações 📉", description="Cotações em tempo real com tendências." + (f" Página **{pagina}/{total_paginas}** (`!mercado <página>`)." if total_paginas > 1 else ""), color=discord.Color.dark_blue())
+        simbolos = sorted(dados)[(pagina - 1) * ACOES_POR_PAGINA:pagina * ACOES_POR_PAGINA] if total_paginas > 1 else list(dados)
+        for simbolo in simbolos:
+            info = dados[simbolo]
             preco = info["preco"]; preco_ant = info.get("preco_anterior", preco)
             if preco > preco_ant: emoji = "🔺"
             elif preco < preco_ant: emoji = "🔻"
             else: emoji = "🔸"
             mudanca_pct = ((preco - preco_ant) / preco_ant * 100) if preco_ant > 0 else 0
-            embed.add_field(name=f"{emoji} **{info['nome']} ({simbolo})**", value=f"`{self.format_brl(preco)}` (`{mudanca_pct:+.2f}%`)", inline=True)
-        embed.set_footer(text="Os preços são atualizados a cada 5 minutos.")
+            embed.add_field(name=f"{emoji} **{info['nome']} ({simbolo})**", value=f"`{format_centavos(preco)}` (`{mudanca_pct:+.2f}%`)\n{self._resumo_indicadores(info)}", inline=True)
+        embed.set_footer(text=f"Os preços são atualizados a cada 5 minutos. MM{_indicadores.JANELA}: média dos últimos {_indicadores.JANELA} preços; Vol: desvio das variações por atualização; RSI({_indicadores.PERIODO_RSI}) de Wilder.")
         await ctx.send(embed=embed)
 
     @commands.command(name="comprar", help="Compra ações de uma empresa.")
     async def comprar(self, ctx, simbolo: str, quantidade: int):
-        simbolo_upper = simbolo.upper()
         if quantidade <= 0: await ctx.send("A quantidade deve ser positiva."); return
-        async with self.bot.economy_lock:
-            mercado = await self.carregar_dados_mercado()
-            if simbolo_upper not in mercado:
-                await ctx.send(f"A ação `{simbolo_upper}` não existe."); return
-            
-            economia_cog = self.bot.get_cog('Economia')
-            await economia_cog.abrir_conta(ctx.author)
-            economia = await self.carregar_dados_economia()
-            
-            id_usuario = str(ctx.author.id)
-            preco_por_acao = mercado[simbolo_upper]["preco"]
-            custo_total = preco_por_acao * quantidade
-            
-            if economia[id_usuario].get("carteira", 0) < custo_total:
-                await ctx.send(f"Dinheiro insuficiente! Custo: `{self.format_brl(custo_total)}`."); return
-            
-            economia[id_usuario]["carteira"] -= custo_total
-            portfolio = economia[id_usuario].get("acoes", {})
-            if simbolo_upper in portfolio and isinstance(portfolio.get(simbolo_upper), dict):
-                qt_antiga = portfolio[simbolo_upper]["quantidade"]; preco_medio_antigo = portfolio[simbolo_upper]["preco_medio_compra"]
-                novo_preco_medio = ((qt_antiga * preco_medio_antigo) + (quantidade * preco_por_acao)) / (qt_antiga + quantidade)
-                portfolio[simbolo_upper]["quantidade"] += quantidade; portfolio[simbolo_upper]["preco_medio_compra"] = round(novo_preco_medio, 2)
-            else:
-                portfolio[simbolo_upper] = {"quantidade": quantidade, "preco_medio_compra": preco_por_acao}
-            economia[id_usuario]["acoes"] = portfolio
-            await self.salvar_dados_economia(economia)
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id)
+        simbolo_upper = await self._resolver_acao(ctx, guild_id, mercado, simbolo)
+        if simbolo_upper is None: return
+
+        preco_por_acao = mercado[simbolo_upper]["preco"]
+        custo_total = preco_por_acao * quantidade
+        try:
+            async with self.data_manager.transacao(guild_id) as economia:
+                usuario = self.data_manager.conta(economia, ctx.author.id)
+                if usuario.get("carteira", 0) < custo_total:
+                    raise OperacaoInvalida(f"Dinheiro insuficiente! Custo: `{format_centavos(custo_total)}`.")
+
+                self.data_manager.movimentar(guild_id, economia, ctx.author.id, -custo_total, "compra_acoes")
+                self._adicionar_acoes(usuario.setdefault("acoes", {}), simbolo_upper, quantidade, preco_por_acao)
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
         
         embed = discord.Embed(title="✅ Compra Realizada!", description=f"Você comprou **{quantidade}** ações de **{mercado[simbolo_upper]['nome']}**.", color=discord.Color.brand_green())
-        embed.add_field(name="Custo Total", value=f"`{self.format_brl(custo_total)}`"); embed.set_footer(text=f"Preço por ação: {self.format_brl(preco_por_acao)}")
+        embed.add_field(name="Custo Total", value=f"`{format_centavos(custo_total)}`"); embed.set_footer(text=f"Preço por ação: {format_centavos(preco_por_acao)}")
         await ctx.send(embed=embed)
 
     @commands.command(name="vender", help="Vende ações de uma empresa.")
     async def vender(self, ctx, simbolo: str, quantidade_str: str):
-        simbolo_upper = simbolo.upper()
-        async with self.bot.economy_lock:
-            mercado = await self.carregar_dados_mercado()
-            if simbolo_upper not in mercado: await ctx.send(f"A ação `{simbolo_upper}` não existe."); return
-            
-            economia = await self.carregar_dados_economia()
-            id_usuario = str(ctx.author.id)
-            portfolio = economia.get(id_usuario, {}).get("acoes", {})
-            if simbolo_upper not in portfolio: await ctx.send(f"Você não possui ações da `{simbolo_upper}`."); return
-            
-            info_acao = portfolio[simbolo_upper]
-            if not isinstance(info_acao, dict): await ctx.send(f"Seus dados para a ação `{simbolo_upper}` estão desatualizados."); return
-            
-            acoes_possuidas = info_acao["quantidade"]
-            if quantidade_str.lower() in ['tudo', 'all']: quantidade_a_vender = acoes_possuidas
-            else:
-                try: quantidade_a_vender = int(quantidade_str)
-                except ValueError: await ctx.send("Insira um número válido ou 'tudo'."); return
-            
-            if quantidade_a_vender <= 0: await ctx.send("A quantidade deve ser positiva."); return
-            if acoes_possuidas < quantidade_a_vender: await ctx.send(f"Você só possui {acoes_possuidas} ações."); return
-            
-            preco_por_acao_venda = mercado[simbolo_upper]["preco"]; preco_medio_compra = info_acao["preco_medio_compra"]
-            lucro_total = (preco_por_acao_venda - preco_medio_compra) * quantidade_a_vender
-            ganho_bruto = preco_por_acao_venda * quantidade_a_vender; imposto = 0
-            
-            if lucro_total > 0:
-                imposto = lucro_total * 0.05
-                economia["cofre_impostos"] = economia.get("cofre_impostos", 0) + imposto
-                impostos_diarios = economia.get("impostos_diarios", {}); impostos_diarios["mercado"] = impostos_diarios.get("mercado", 0) + imposto; economia["impostos_diarios"] = impostos_diarios
-            
-            ganho_liquido = ganho_bruto - imposto
-            economia[id_usuario]["carteira"] += ganho_liquido
-            portfolio[simbolo_upper]["quantidade"] -= quantidade_a_vender
-            if portfolio[simbolo_upper]["quantidade"] == 0: del portfolio[simbolo_upper]
-            
-            await self.salvar_dados_economia(economia)
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id)
+        simbolo_upper = await self._resolver_acao(ctx, guild_id, mercado, simbolo)
+        if simbolo_upper is None: return
+        preco_por_acao_venda = mercado[simbolo_upper]["preco"]
+
+        try:
+            async with self.data_manager.transacao(guild_id) as economia:
+                usuario = self.data_manager.conta(economia, ctx.author.id)
+                portfolio = usuario.get("acoes", {})
+                if simbolo_upper not in portfolio: raise OperacaoInvalida(f"Você não possui ações da `{simbolo_upper}`.")
+
+                info_acao = portfolio[simbolo_upper]
+                acoes_possuidas = info_acao["quantidade"]
+                if quantidade_str.lower() in ['tudo', 'all']: quantidade_a_vender = acoes_possuidas
+                else:
+                    try: quantidade_a_vender = int(quantidade_str)
+                    except ValueError: raise OperacaoInvalida("Insira um número válido ou 'tudo'.") from None
+
+                if quantidade_a_vender <= 0: raise OperacaoInvalida("A quantidade deve ser positiva.")
+                if acoes_possuidas < quantidade_a_vender: raise OperacaoInvalida(f"Você só possui {acoes_possuidas} ações.")
+
+                preco_medio_compra = info_acao["preco_medio_compra"]
+                lucro_total = (preco_por_acao_venda - preco_medio_compra) * quantidade_a_vender
+                ganho_bruto = preco_por_acao_venda * quantidade_a_vender
+                imposto = self._creditar_venda(guild_id, economia, ctx.author.id, ganho_bruto, lucro_total, "venda_acoes")
+                ganho_liquido = ganho_bruto - imposto
+                info_acao["quantidade"] -= quantidade_a_vender
+                if info_acao["quantidade"] == 0: del portfolio[simbolo_upper]
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
         
         embed = discord.Embed(title="💰 Venda Realizada!", description=f"Você vendeu **{quantidade_a_vender}** ações de **{mercado[simbolo_upper]['nome']}**.", color=discord.Color.from_rgb(20, 150, 40))
-        footer_text = f"Preço por ação: {self.format_brl(preco_por_acao_venda)}"
+        footer_text = f"Preço por ação: {format_centavos(preco_por_acao_venda)}"
         if imposto > 0:
-            embed.add_field(name="Total Recebido (Líquido)", value=f"`{self.format_brl(ganho_liquido)}`")
-            embed.set_footer(text=f"{footer_text} | Imposto sobre o lucro: {self.format_brl(imposto)}")
+            embed.add_field(name="Total Recebido (Líquido)", value=f"`{format_centavos(ganho_liquido)}`")
+            embed.set_footer(text=f"{footer_text} | Imposto sobre o lucro: {format_centavos(imposto)}")
         else:
-            embed.add_field(name="Total Recebido", value=f"`{self.format_brl(ganho_liquido)}`")
+            embed.add_field(name="Total Recebido", value=f"`{format_centavos(ganho_liquido)}`")
             embed.set_footer(text=footer_text)
         await ctx.send(embed=embed)
 
+    @commands.command(name="ordem", help="Cria uma ordem parada: `!ordem compra|venda|stop SIMBOLO QUANTIDADE PRECO`.")
+    async def ordem(self, ctx, tipo: str, simbolo: str, quantidade: int, preco_str: str):
+        tipo = tipo.lower()
+        if tipo not in TIPOS_ORDEM: await ctx.send("Tipo inválido. Use `compra` (limitada), `venda` (limitada) ou `stop` (stop loss)."); return
+        try: gatilho = parse_valor(preco_str)
+        except ValueError: await ctx.send("❌ Preço inválido. Use um valor (ex: `50` ou `12,50`)."); return
+        if quantidade <= 0 or gatilho <= 0: await ctx.send("A quantidade e o preço devem ser positivos."); return
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id)
+        simbolo_upper = await self._resolver_acao(ctx, guild_id, mercado, simbolo)
+        if simbolo_upper is None: return
+
+        lado, heap = TIPOS_ORDEM[tipo]
+        try:
+            async with self.data_manager.transacao(guild_id) as economia:
+                usuario = self.data_manager.conta(economia, ctx.author.id); ordens = livro_ordens(economia)
+                if len(do_usuario(ordens, ctx.author.id)) >= MAX_ORDENS_POR_USUARIO: raise OperacaoInvalida(f"Você já tem {MAX_ORDENS_POR_USUARIO} ordens abertas.")
+                nova = {"usuario": str(ctx.author.id), "simbolo": simbolo_upper, "tipo": tipo, "lado": lado, "heap": heap, "quantidade": quantidade, "gatilho": gatilho}
+                if lado == "compra":
+                    # Reserva o pior caso (o preço limite); a diferença volta na execução
+                    nova["reservado"] = reserva = gatilho * quantidade
+                    if not self.data_manager.reservar(guild_id, economia, ctx.author.id, reserva): raise OperacaoInvalida(f"Dinheiro insuficiente! Reserva necessária: `{format_centavos(reserva)}`.")
+                else:
+                    portfolio = usuario.get("acoes", {}); info_acao = portfolio.get(simbolo_upper)
+                    if info_acao is None or info_acao["quantidade"] < quantidade: raise OperacaoInvalida(f"Você não possui {quantidade} ações da `{simbolo_upper}` livres.")
+                    info_acao["quantidade"] -= quantidade; nova["preco_medio_compra"] = info_acao["preco_medio_compra"]
+                    if info_acao["quantidade"] == 0: del portfolio[simbolo_upper]
+                ordem_id = inserir(ordens, nova)
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
+
+        descricao = {"compra": "comprar quando o preço for **até**", "venda": "vender quando o preço for **pelo menos**", "stop": "vender quando o preço cair **até**"}[tipo]
+        embed = discord.Embed(title=f"📝 Ordem #{ordem_id} Criada", description=f"Ordem para {descricao} `{format_centavos(gatilho)}`: **{quantidade}** ações de **{mercado[simbolo_upper]['nome']}**.", color=discord.Color.blurple())
+        embed.set_footer(text=f"Verificada a cada atualização do mercado. Cancele com !cancelarordem {ordem_id}.")
+        await ctx.send(embed=embed)
+
+    @commands.command(name="ordens", help="Mostra as suas ordens abertas.")
+    async def ordens(self, ctx):
+        economia = await self.data_manager.get_all_data(id_particao(ctx.guild))
+        abertas = do_usuario(economia.get("ordens"), ctx.author.id)
+        if not abertas: await ctx.send("Você não tem ordens abertas."); return
+        nomes = {"compra": "Compra limitada", "venda": "Venda limitada", "stop": "Stop loss"}
+        linhas = [f"**#{o['id']}** {nomes[o['tipo']]} — `{o['quantidade']}x {o['simbolo']}` a `{format_centavos(o['gatilho'])}`" for o in abertas]
+        embed = discord.Embed(title=f"📋 Ordens de {ctx.author.display_name}", description="\n".join(linhas), color=discord.Color.blurple())
+        await ctx.send(embed=embed)
+
+    @commands.command(name="cancelarordem", help="Cancela uma ordem aberta e devolve o dinheiro ou as ações reservadas.")
+    async def cancelarordem(self, ctx, ordem_id: int):
+        try:
+            guild_id = id_particao(ctx.guild)
+            async with self.data_manager.transacao(guild_id) as economia:
+                ordens = livro_ordens(economia); ordem = ordens["por_id"].get(str(ordem_id))
+                if ordem is None or ordem["usuario"] != str(ctx.author.id): raise OperacaoInvalida(f"Você não tem uma ordem aberta #{ordem_id}.")
+                cancelar(ordens, ordem_id); usuario = self.data_manager.conta(economia, ctx.author.id)
+                if ordem["lado"] == "compra": self.data_manager.liberar_reserva(guild_id, economia, ctx.author.id, ordem["reservado"])
+                else: self._adicionar_acoes(usuario.setdefault("acoes", {}), ordem["simbolo"], ordem["quantidade"], ordem["preco_medio_compra"])
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
+        await ctx.send(f"🗑️ Ordem #{ordem_id} cancelada.")
+
     @commands.command(name="portfolio", aliases=["ptf"], help="Mostra as suas ações.")
     async def portfolio(self, ctx, membro: discord.Member = None):
         if membro is None: membro = ctx.author
-        async with self.bot.economy_lock:
-            economia = await self.carregar_dados_economia()
-        mercado = await self.carregar_dados_mercado()
+        guild_id = id_particao(ctx.guild)
+        economia = await self.data_manager.get_all_data(guild_id)
+        mercado = await self.carregar_dados_mercado(guild_id)
         
         id_usuario = str(membro.id)
         portfolio_usuario = economia.get(id_usuario, {}).get("acoes", {})
@@ -215,30 +436,33 @@ class Mercado(commands.Cog):
         valor_total_portfolio = 0; investimento_total = 0; acoes_invalidas = 0
         
         for simbolo, info_acao in portfolio_usuario.items():
-            if simbolo in mercado and isinstance(info_acao, dict):
+            if simbolo in mercado:
                 quantidade = info_acao["quantidade"]; preco_compra_medio = info_acao["preco_medio_compra"]; preco_atual = mercado[simbolo]["preco"]
                 valor_investido = quantidade * preco_compra_medio; valor_atual_holding = quantidade * preco_atual; lucro_prejuizo = valor_atual_holding - valor_investido
                 investimento_total += valor_investido; valor_total_portfolio += valor_atual_holding
                 emoji_lucro = "🟢" if lucro_prejuizo >= 0 else "🔴"
-                embed.add_field(name=f"{mercado[simbolo]['nome']} ({simbolo})", value=f"**Qt:** `{quantidade}` | **Valor:** `{self.format_brl(valor_atual_holding)}`\n{emoji_lucro} **L/P:** `{self.format_brl(lucro_prejuizo)}`", inline=True)
+                embed.add_field(name=f"{mercado[simbolo]['nome']} ({simbolo})", value=f"**Qt:** `{quantidade}` | **Valor:** `{format_centavos(valor_atual_holding)}`\n{emoji_lucro} **L/P:** `{format_centavos(lucro_prejuizo)}`", inline=True)
             else: acoes_invalidas += 1
             
         lucro_total_portfolio = valor_total_portfolio - investimento_total
         emoji_total = "🟢" if lucro_total_portfolio >= 0 else "🔴"
-        embed.description = f"**Valor Total Estimado:** `{self.format_brl(valor_total_portfolio)}`\n{emoji_total} **Lucro/Prejuízo Total:** `{self.format_brl(lucro_total_portfolio)}`"
-        if acoes_invalidas > 0: embed.set_footer(text=f"Aviso: {acoes_invalidas} tipo(s) de ação no seu portfólio estão com dados desatualizados.")
+        embed.description = f"**Valor Total Estimado:** `{format_centavos(valor_total_portfolio)}`\n{emoji_total} **Lucro/Prejuízo Total:** `{format_centavos(lucro_total_portfolio)}`"
+        if acoes_invalidas > 0: embed.set_footer(text=f"Aviso: {acoes_invalidas} tipo(s) de ação no seu portfólio não estão mais no mercado.")
         await ctx.send(embed=embed)
     
     @commands.command(name="grafico", help="Mostra o gráfico histórico de uma ação.")
     async def grafico(self, ctx, simbolo: str):
-        simbolo_upper = simbolo.upper(); mercado = await self.carregar_dados_mercado(); historico = await self.carregar_dados_historico()
-        if simbolo_upper not in mercado: await ctx.send(f"A ação `{simbolo_upper}` não existe."); return
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id); historico = await self.carregar_dados_historico(guild_id)
+        simbolo_upper = await self._resolver_acao(ctx, guild_id, mercado, simbolo)
+        if simbolo_upper is None: return
         if simbolo_upper not in historico or len(historico[simbolo_upper]) < 2: await ctx.send(f"Ainda não há dados históricos suficientes."); return
         
-        precos = historico[simbolo_upper]
+        precos = historico[simbolo_upper][-TAMANHO_HISTORICO:]
         fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
         cor_linha = 'g' if precos[-1] >= precos[0] else 'r'
-        ax.plot(precos, color=cor_linha, linewidth=2)
+        ax.plot([p / 100 for p in precos], color=cor_linha, linewidth=2)
+        media = _indicadores.media(mercado[simbolo_upper].get("indicadores") or _indicadores.novo_estado())
+        if media is not None: ax.axhline(media / 100, color='orange', linestyle='--', linewidth=1, label=f"MM{_indicadores.JANELA}"); ax.legend(loc='upper left')
         ax.set_title(f"Histórico de Preços de {mercado[simbolo_upper]['nome']} ({simbolo_upper})", color='white', fontsize=16)
         ax.set_xlabel("Tempo (Atualizações a cada 5 min)", color='gray'); ax.set_ylabel("Preço (R$)", color='gray')
         ax.grid(True, color='gray', linestyle='--', linewidth=0.5, alpha=0.5)
@@ -246,10 +470,111 @@ class Mercado(commands.Cog):
         
         file = discord.File(nome_ficheiro, filename="grafico.png")
         embed = discord.Embed(title=f"Análise Gráfica de {simbolo_upper}", description=f"A exibir o histórico das últimas **{len(precos)}** atualizações.", color=discord.Color.green() if cor_linha == 'g' else discord.Color.red())
+        embed.add_field(name="Indicadores", value=self._resumo_indicadores(mercado[simbolo_upper]), inline=False)
         embed.set_image(url=f"attachment://{nome_ficheiro}")
         
         await ctx.send(embed=embed, file=file)
         os.remove(nome_ficheiro)
 
+    @commands.command(name="buscaracao", aliases=["buscar"], help="Procura ações pelo símbolo ou pelo nome da empresa.")
+    async def buscaracao(self, ctx, *, texto: str):
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id)
+        encontradas = [simbolo for simbolo in self._indice(guild_id, mercado).buscar(texto, 10) if simbolo in mercado]
+        if not encontradas: await ctx.send(f"Nenhuma ação encontrada para `{texto}`."); return
+        linhas = [f"**{simbolo}** — {mercado[simbolo]['nome']} · `{format_centavos(mercado[simbolo]['preco'])}`" for simbolo in encontradas]
+        await ctx.send(embed=discord.Embed(title=f"🔎 Busca: {texto}", description="\n".join(linhas), color=discord.Color.dark_blue()))
+
+    @commands.command(name="listaracao", help="Lista uma nova empresa: `!listaracao SIMBOLO PRECO Nome da Empresa`. (Admin)")
+    @commands.has_permissions(manage_guild=True)
+    async def listaracao(self, ctx, simbolo: str, preco_str: str, *, nome: str):
+        simbolo_upper = simbolo.upper(); nome = " ".join(nome.split()); guild_id = id_particao(ctx.guild)
+        try: preco = parse_valor(preco_str)
+        except ValueError: await ctx.send("❌ Preço inválido. Use um valor (ex: `50` ou `12,50`)."); return
+        if preco < PRECO_MINIMO: await ctx.send(f"O preço inicial deve ser de pelo menos `{format_centavos(PRECO_MINIMO)}`."); return
+        try:
+            async with self.mercados.transacao(guild_id) as mercado:
+                erro = validar_listagem(mercado, simbolo_upper, nome)
+                if erro: raise OperacaoInvalida(erro)
+                # O tick deste horário conta como aplicado: a nova ação entra no próximo, junto com as outras
+                mercado[simbolo_upper] = {"nome": nome, "preco": preco, "preco_anterior": preco, "tendencia": "estavel", "ultimo_tick": self._fronteira_tick(), "indicadores": _indicadores.novo_estado([preco])}
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
+        # Histórico próprio, alinhado pelo fim com o das outras ações (como em '_executar_ordens' e no backtest)
+        async with self.historicos.transacao(guild_id) as historico: historico[simbolo_upper] = [preco]
+        self._indices.pop(guild_id, None)
+        await ctx.send(f"🏛️ **{nome}** (`{simbolo_upper}`) foi listada a `{format_centavos(preco)}` por ação.")
+
+    @commands.command(name="deslistaracao", help="Remove uma empresa do mercado, vendendo as ações dos acionistas pelo último preço. (Admin)")
+    @commands.has_permissions(manage_guild=True)
+    async def deslistaracao(self, ctx, simbolo: str):
+        simbolo_upper = simbolo.upper(); guild_id = id_particao(ctx.guild)
+        try:
+            async with self.mercados.transacao(guild_id) as mercado:
+                if simbolo_upper not in mercado: raise OperacaoInvalida(f"A ação `{simbolo_upper}` não existe.")
+                # 'del' (e não 'pop'): é o que o backend SQLite registra como remoção
+                info = mercado[simbolo_upper]; del mercado[simbolo_upper]
+        except OperacaoInvalida as e:
+            await ctx.send(str(e)); return
+        self._indices.pop(guild_id, None)
+        async with self.historicos.transacao(guild_id) as historico:
+            if simbolo_upper in historico: del historico[simbolo_upper]
+        # Já fora do mercado, a ação não pode mais ser comprada nem disparar ordens no tick
+        vendidas, acionistas = await self._liquidar_acao(guild_id, simbolo_upper, info["preco"])
+        await ctx.send(f"🏚️ **{info['nome']}** (`{simbolo_upper}`) foi deslistada. {vendidas} ações de {acionistas} acionista(s) foram vendidas a `{format_centavos(info['preco'])}`.")
+
+    async def _liquidar_acao(self, guild_id, simbolo, preco):
+        """
+        Encerra as posições de uma ação deslistada: as ordens abertas são canceladas (a reserva das
+        compras volta para a carteira) e todas as ações, inclusive as reservadas em ordens de venda,
+        são vendidas a 'preco' com o imposto normal sobre o lucro. Retorna (ações vendidas, acionistas).
+        """
+        if not self.data_manager: return 0, 0
+        vendidas = 0; acionistas = set()
+        async with self.data_manager.transacao(guild_id) as economia:
+            ordens = livro_ordens(economia)
+            for ordem in [ordem for ordem in ordens["por_id"].values() if ordem["simbolo"] == simbolo]:
+                del ordens["por_id"][str(ordem["id"])]; user_id = int(ordem["usuario"])
+                if ordem["lado"] == "compra": self.data_manager.liberar_reserva(guild_id, economia, user_id, ordem["reservado"]); continue
+                self._creditar_venda(guild_id, economia, user_id, preco * ordem["quantidade"], (preco - ordem["preco_medio_compra"]) * ordem["quantidade"], "venda_deslistagem")
+                vendidas += ordem["quantidade"]; acionistas.add(user_id)
+            ordens["livros"].pop(simbolo, None)
+            # Varredura só de leitura com 'varrer': o 'items()' do backend SQLite marcaria todas as contas
+            # como tocadas (e as regravaria); 'conta' marca só as dos acionistas
+            for chave in [chave for chave, registro in varrer(economia) if chave.isdigit() and simbolo in registro.get("acoes", {})]:
+                user_id = int(chave); posicao = self.data_manager.conta(economia, user_id)["acoes"].pop(simbolo)
+                self._creditar_venda(guild_id, economia, user_id, preco * posicao["quantidade"], (preco - posicao["preco_medio_compra"]) * posicao["quantidade"], "venda_deslistagem")
+                vendidas += posicao["quantidade"]; acionistas.add(user_id)
+        return vendidas, len(acionistas)
+
+    @commands.command(name="backtest", help="Testa estratégias no histórico e em caminhos simulados: `!backtest [ticks] [caminhos]`. (Apenas Dono)")
+    @commands.is_owner()
+    async def backtest(self, ctx, ticks: int = TICKS_BACKTEST_PADRAO, caminhos: int = 20):
+        if not 0 <= ticks <= MAX_TICKS_RECUPERADOS or not 1 <= caminhos <= MAX_CAMINHOS_BACKTEST: await ctx.send(f"Use até `{MAX_TICKS_RECUPERADOS}` ticks e de 1 a `{MAX_CAMINHOS_BACKTEST}` caminhos."); return
+        guild_id = id_particao(ctx.guild); mercado = await self.carregar_dados_mercado(guild_id); historico = await self.carregar_dados_historico(guild_id)
+        # Cópias simples (picklable) para o worker; a partição continua só no processo do bot
+        historico = {simbolo: list(precos) for simbolo, precos in historico.items() if simbolo in mercado}
+        mercado = {simbolo: {"preco": info["preco"], "tendencia": info.get("tendencia", "estavel")} for simbolo, info in mercado.items()}
+        precos = sum(len(p) + ticks for p in historico.values() if p) * (caminhos if ticks else 1)
+        if precos > MAX_PRECOS_BACKTEST: await ctx.send(f"❌ {precos} preços simulados (ações × caminhos × ticks) passam do limite de `{MAX_PRECOS_BACKTEST}`. Use menos ticks ou caminhos."); return
+
+        # A simulação e a avaliação são numpy puro e podem levar segundos: rodam em outro processo, nunca no event loop
+        if self._backtests is None: self._backtests = novo_pool()
+        try: resultado = await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self._backtests, _backtest.executar, historico, mercado, ticks, caminhos, TAXA_IMPOSTO_LUCRO_BP), TEMPO_LIMITE_BACKTEST)
+        except asyncio.TimeoutError: self._encerrar_backtests(); await ctx.send(f"❌ O backtest excedeu o tempo limite de {TEMPO_LIMITE_BACKTEST}s."); return
+        except _backtest.HistoricoCurto:
+            # Histórico curto demais para os indicadores (são guardados só HISTORICO_GUARDADO preços)
+            await ctx.send(f"❌ O histórico guardado é curto demais: as estratégias precisam de {_backtest.TICKS_MINIMOS} preços por ação. Use `!backtest <ticks>` para completar com ticks simulados (ex: `!backtest {TICKS_BACKTEST_PADRAO}`)."); return
+        if not resultado["simbolos"]: await ctx.send("Ainda não há histórico de preços para testar."); return
+
+        origem = f"histórico + {ticks} ticks simulados (média de {resultado['caminhos']} caminhos)" if ticks else "histórico guardado"
+        embed = discord.Embed(title="🧪 Backtest de Estratégias", description=f"**{resultado['ticks']}** preços por ação ({origem}), imposto de {TAXA_IMPOSTO_LUCRO_BP / 100:.0f}% sobre o lucro de cada venda.\n```\n{_backtest.tabela(resultado)}\n```", color=discord.Color.dark_teal())
+        for i, estrategia in enumerate(resultado["estrategias"]):
+            liquidos = resultado["metricas"]["retorno_liquido"][i]; melhor = max(range(len(liquidos)), key=liquidos.__getitem__)
+            # Sem nenhuma venda em nenhuma ação, todas empatam em 0%: não há melhor
+            destaque = f"Melhor: `{resultado['simbolos'][melhor]}` (`{liquidos[melhor]:+.1%}`)" if any(resultado["metricas"]["vendas"][i]) else "Nenhuma operação no período"
+            embed.add_field(name=estrategia, value=f"{_backtest.DESCRICOES[estrategia]}\n{destaque}", inline=True)
+        embed.set_footer(text="Retornos sobre o capital inicial; queda = maior perda a partir de um pico. Não é recomendação de investimento.")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(Mercado(bot))
\ No newline at end of file
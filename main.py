@@ -14,8 +14,13 @@ Este script é responsável por:
 
 # --- 1. Imports ---
 import asyncio
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import traceback
 from typing import NoReturn
 
@@ -23,33 +28,99 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+from cogs._metricas import instrumentar_http, iniciar_servidor_http, metricas, monitorar_lag_loop
+from cogs._watchdog import VigiaLoop, ativar_debug_asyncio
+
 # --- 2. Configuração do Logging ---
-# Configura o logger para exibir logs no console e em um arquivo.
-# Isso é mais robusto que usar 'print()'.
-log_formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
-log_handler = logging.FileHandler(filename='domostbot.log', encoding='utf-8', mode='w')
+# Carrega as variáveis de ambiente do arquivo .env (inclusive as de logging)
+load_dotenv()
+
+class FormatadorJSON(logging.Formatter):
+    """Formata cada registro como um objeto JSON por linha (para agregadores de log)."""
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "momento": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        if record.exc_text:
+            dados["excecao"] = record.exc_text
+        if record.stack_info:
+            dados["pilha"] = record.stack_info
+        return json.dumps(dados, ensure_ascii=False)
+
+class QueueHandlerEstruturado(logging.handlers.QueueHandler):
+    """
+    QueueHandler que preserva o traceback separado da mensagem, para que o
+    formatador no outro lado da fila (texto ou JSON) decida como exibi-lo.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+# Os handlers que fazem I/O (arquivo e console) rodam na thread do QueueListener;
+# o event loop apenas coloca o registro em uma fila em memória.
+# O arquivo agora é rotacionado por tamanho e não é mais apagado a cada reinício.
+if os.getenv('LOG_FORMATO', 'texto').lower() == 'json':
+    log_formatter = FormatadorJSON()
+else:
+    log_formatter = logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+log_handler = logging.handlers.RotatingFileHandler(
+    filename='domostbot.log', encoding='utf-8', mode='a',
+    maxBytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+    backupCount=int(os.getenv('LOG_BACKUPS', 5)),
+)
 log_handler.setFormatter(log_formatter)
 
 stream_handler = logging.StreamHandler()
 stream_handler.setFormatter(log_formatter)
 
+fila_logs: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(fila_logs, log_handler, stream_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# A fila fica no logger raiz para capturar também os logs dos cogs ('cogs.*'),
+# que antes não chegavam ao arquivo por não serem filhos do logger 'discord'.
+logging.getLogger().addHandler(QueueHandlerEstruturado(fila_logs))
+logging.getLogger().setLevel(logging.INFO)
+
 logger = logging.getLogger('discord')
 logger.setLevel(logging.INFO)
-logger.addHandler(log_handler)
-logger.addHandler(stream_handler)
 
 
 # --- 3. Configuração Inicial do Bot ---
 
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
+# Porta do endpoint local de métricas (Prometheus). Vazio = desativado.
+METRICS_PORT = os.getenv('METRICS_PORT')
+# Watchdog do event loop: limiar em ms para considerar o loop travado. Vazio = desativado.
+WATCHDOG_LOOP_MS = os.getenv('WATCHDOG_LOOP_MS')
+# '1' liga o modo debug do asyncio (loga callbacks mais lentos que o limiar do watchdog ou 100ms).
+ASYNCIO_DEBUG = os.getenv('ASYNCIO_DEBUG') == '1'
+# '1' usa o AutoShardedBot: o Discord exige shards a partir de 2500 guilds.
+BOT_SHARDED = os.getenv('BOT_SHARDED') == '1'
+# Modo multiprocesso: cada processo atende alguns shards (ex: SHARD_IDS=0,1 e SHARD_COUNT=4).
+# Os processos só compartilham a economia com ARMAZENAMENTO=sqlite.
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS', '').split(',') if i.strip()]
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0)) or None
 
 if not DISCORD_TOKEN:
     logger.critical("ERRO CRÍTICO: O 'DISCORD_TOKEN' não foi encontrado no ambiente.")
     # Usar exit() aqui é aceitável, pois o bot não pode funcionar sem o token.
     exit("Token não configurado. O bot não pode iniciar.")
 
+if SHARD_IDS and not SHARD_COUNT:
+    exit("SHARD_IDS exige SHARD_COUNT (o total de shards de todos os processos).")
+if SHARD_IDS and os.getenv('ARMAZENAMENTO', 'json').lower() != 'sqlite':
+    logger.warning("Modo multiprocesso sem ARMAZENAMENTO=sqlite: cada processo terá a sua própria cópia dos dados em memória.")
+
 # Define as permissões (Intents) necessárias para o bot.
 # É uma boa prática solicitar apenas as intents que você realmente precisa.
 intents = discord.Intents.default()
@@ -59,22 +130,50 @@ intents.members = True          # Necessário para eventos de membros (entrada/s
 
 # --- 4. Inicialização do Bot ---
 
-class DomostBot(commands.Bot):
-    """Subclasse de commands.Bot para adicionar atributos personalizados."""
+# Os dados de economia e mercado são particionados por guild (cogs/_armazenamento.py),
+# então o mesmo código funciona com um shard ou com vários.
+BotBase = commands.AutoShardedBot if BOT_SHARDED or SHARD_IDS else commands.Bot
+opcoes_shards = {'shard_ids': SHARD_IDS, 'shard_count': SHARD_COUNT} if SHARD_IDS else {}
+
+class DomostBot(BotBase):
+    """Subclasse de commands.Bot (ou AutoShardedBot) para adicionar atributos personalizados."""
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents, help_command=None)
-        # O Lock previne condições de corrida ao acessar/modificar
-        # recursos compartilhados, como arquivos de economia.
-        self.economy_lock = asyncio.Lock()
+        super().__init__(command_prefix='!', intents=intents, help_command=None, **opcoes_shards)
+        self._metricas_runner = None
+        self._tarefa_lag = None
+        self._vigia_loop = None
+        self.before_invoke(self._antes_do_comando)
+        self.after_invoke(self._depois_do_comando)
+
+    async def _antes_do_comando(self, ctx: commands.Context) -> None:
+        metricas.iniciar_comando(ctx.command.qualified_name)
+
+    async def _depois_do_comando(self, ctx: commands.Context) -> None:
+        metricas.finalizar_comando()
 
     async def setup_hook(self) -> None:
         """
         Hook que é chamado após o login, mas antes de se conectar ao WebSocket.
         Ideal para carregar extensões.
         """
+        instrumentar_http(self.http)
+        limiar_watchdog = int(WATCHDOG_LOOP_MS) / 1000 if WATCHDOG_LOOP_MS else None
+        if limiar_watchdog:
+            self._vigia_loop = VigiaLoop(asyncio.get_running_loop(), limiar=limiar_watchdog)
+            self._vigia_loop.iniciar()
+        if ASYNCIO_DEBUG:
+            ativar_debug_asyncio(asyncio.get_running_loop(), limiar_watchdog or 0.1)
+        self._tarefa_lag = asyncio.create_task(monitorar_lag_loop())
+        if METRICS_PORT:
+            try:
+                self._metricas_runner = await iniciar_servidor_http(int(METRICS_PORT))
+            except (OSError, ValueError):
+                logger.error(f"Não foi possível iniciar o endpoint de métricas na porta '{METRICS_PORT}'.", exc_info=True)
+
         logger.info("Carregando extensões (cogs)...")
         for filename in os.listdir('./cogs'):
-            if filename.endswith('.py'):
+            # Módulos com prefixo '_' são utilitários compartilhados, não extensões.
+            if filename.endswith('.py') and not filename.startswith('_'):
                 cog_name = f'cogs.{filename[:-3]}'
                 try:
                     await self.load_extension(cog_name)
@@ -83,9 +182,19 @@ class DomostBot(commands.Bot):
                     # Usar exc_info=True anexa o traceback completo ao log.
                     logger.error(f'Erro ao carregar o Cog "{cog_name}".', exc_info=True)
     
+    async def close(self) -> None:
+        if self._vigia_loop:
+            self._vigia_loop.parar()
+        if self._tarefa_lag:
+            self._tarefa_lag.cancel()
+        if self._metricas_runner:
+            await self._metricas_runner.cleanup()
+        await super().close()
+
     async def on_ready(self) -> None:
         """Evento disparado quando o bot está online e pronto."""
         logger.info(f'Login efetuado com sucesso como {self.user} (ID: {self.user.id})')
+        logger.info(f'Conectado a {len(self.guilds)} guild(s) em {self.shard_count or 1} shard(s).')
         logger.info('Bot está online e pronto.')
         logger.info('-----------------------------------------')
 
@@ -103,6 +212,8 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError)
     """
     # Desembrulha o erro original de exceções como commands.CommandInvokeError
     causa_original = getattr(error, 'original', error)
+    if ctx.command:
+        metricas.registrar_erro(ctx.command.qualified_name)
 
     if isinstance(causa_original, commands.CommandOnCooldown):
         minutos, segundos = divmod(causa_original.retry_after, 60)
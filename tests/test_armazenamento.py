@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from cogs._armazenamento import ArmazenamentoParticionado, DadosRastreados, OperacaoInvalida
+from cogs._contas import Conta, compactar
+
+
+def _particao_json(diretorio, guild_id, dados):
+    (diretorio / str(guild_id)).mkdir(parents=True)
+    (diretorio / str(guild_id) / "economia.json").write_text(json.dumps(dados), encoding="utf-8")
+
+
+def _conta(carteira):
+    return {"carteira": carteira, "banco": 0, "acoes": {},
+            "cc_stats": {"jogos": 0, "vitorias": 0, "total_apostado": 0, "lucro_total": 0}}
+
+
+def test_transacao_com_erro_e_desfeita(tmp_path):
+    original = {"10": _conta(500), "20": _conta(700), "cofre_impostos": 3}
+    _particao_json(tmp_path, 1, original)
+
+    async def cenario():
+        armazenamento = ArmazenamentoParticionado(tmp_path, "economia.json", converter=compactar)
+        with pytest.raises(OperacaoInvalida):
+            async with armazenamento.transacao(1) as dados:
+                dados["10"]["carteira"] -= 100
+                dados["10"]["acoes"]["DMS"] = {"quantidade": 1, "preco_medio_compra": 100}
+                dados["30"] = Conta.de_dict(_conta(1))
+                del dados["20"]
+                dados["cofre_impostos"] = 99
+                raise OperacaoInvalida("saldo insuficiente")
+        particao = await armazenamento.particao(1)
+        return particao.sujo, {chave: (valor.para_dict() if isinstance(valor, Conta) else valor) for chave, valor in particao.dados.items()}, particao.dados
+
+    sujo, depois, dados = asyncio.run(cenario())
+    assert not sujo
+    assert depois == original
+    assert isinstance(dados["10"], Conta)  # restaurado na representação em memória
+
+
+def test_transacao_confirmada_e_gravada(tmp_path):
+    _particao_json(tmp_path, 1, {"10": _conta(500)})
+
+    async def cenario():
+        armazenamento = ArmazenamentoParticionado(tmp_path, "economia.json", converter=compactar)
+        async with armazenamento.transacao(1) as dados:
+            dados["10"]["carteira"] += 1
+        await armazenamento.fechar()
+        return await ArmazenamentoParticionado(tmp_path, "economia.json").ler(1)
+
+    assert asyncio.run(cenario())["10"]["carteira"] == 501
+
+
+def test_copias_apenas_das_chaves_acessadas():
+    dados = DadosRastreados({str(i): {"v": i} for i in range(100)})
+    dados.iniciar_rastreio(copiar=True)
+    iterador = iter(dados.items())
+    next(iterador)
+    dados["50"]["v"] = -1
+    assert set(dados.copias) == {"0", "50"}  # a iteração copia só o que já percorreu
+    dados.desfazer()
+    assert dados["50"] == {"v": 50}
+    assert dados.tocadas is None and dados.copias is None
+
+
+def test_ciclo_diario_desfeito_copia_so_contas_alteradas():
+    from cogs.economia import processar_ciclo_diario
+
+    dados = DadosRastreados({"1": Conta.de_dict(_conta(0)), "2": Conta.de_dict(_conta(1_000_000_00)), "_meta": {}})
+    dados.iniciar_rastreio(copiar=True)
+    processar_ciclo_diario(dados)
+    assert set(dados.copias) == {"2"}  # a conta zerada não muda e não é copiada
+    dados.desfazer(compactar)
+    assert dados["2"]["carteira"] == 1_000_000_00
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from cogs._armazenamento_sqlite import ArmazenamentoSQLite
+
+
+def _particao_json(diretorio, guild_id, dados):
+    (diretorio / str(guild_id)).mkdir(parents=True)
+    (diretorio / str(guild_id) / "economia.json").write_text(json.dumps(dados), encoding="utf-8")
+
+
+def test_transacao_com_erro_e_desfeita(tmp_path):
+    _particao_json(tmp_path, 1, {"10": {"carteira": 5}, "20": {"carteira": 7}})
+
+    async def cenario():
+        armazenamento = ArmazenamentoSQLite(tmp_path, "economia.json")
+        async with armazenamento.transacao(1) as dados:  # importa a partição
+            pass
+        with pytest.raises(RuntimeError):
+            async with armazenamento.transacao(1) as dados:
+                dados["10"]["carteira"] = 0
+                dados["30"] = {"carteira": 1}
+                del dados["20"]
+                raise RuntimeError("falhou no meio")
+        em_memoria = dict((await armazenamento.particao(1)).dados)
+        await armazenamento.fechar()
+        outro_processo = ArmazenamentoSQLite(tmp_path, "economia.json")
+        no_banco = dict((await outro_processo.particao(1)).dados)
+        await outro_processo.fechar()
+        return em_memoria, no_banco
+
+    em_memoria, no_banco = asyncio.run(cenario())
+    assert em_memoria == no_banco == {"10": {"carteira": 5}, "20": {"carteira": 7}}
+
+
+def test_erro_na_primeira_transacao_nao_perde_a_importacao(tmp_path):
+    _particao_json(tmp_path, 123, {"10": {"carteira": 5}})
+
+    async def cenario():
+        armazenamento = ArmazenamentoSQLite(tmp_path, "economia.json")
+        with pytest.raises(ValueError):
+            async with armazenamento.transacao(123) as dados:
+                dados["10"]["carteira"] = 0
+                raise ValueError("saldo insuficiente")
+        await armazenamento.fechar()
+        outro_processo = ArmazenamentoSQLite(tmp_path, "economia.json")
+        dados = dict((await outro_processo.particao(123)).dados)
+        await outro_processo.fechar()
+        return dados
+
+    assert asyncio.run(cenario()) == {"10": {"carteira": 5}}
+    assert sorted(p.name for p in (tmp_path / "123").iterdir()) == ["economia.json.importado"]
+
+
+def test_transacao_confirmada_e_vista_por_outro_processo(tmp_path):
+    _particao_json(tmp_path, 1, {"10": {"carteira": 5}})
+
+    async def cenario():
+        a, b = ArmazenamentoSQLite(tmp_path, "economia.json"), ArmazenamentoSQLite(tmp_path, "economia.json")
+        await b.particao(1)
+        async with a.transacao(1) as dados:
+            dados["10"]["carteira"] += 10
+        async with b.transacao(1) as dados:
+            dados["10"]["carteira"] += 1
+        resultado = dict((await a.particao(1)).dados)
+        await a.fechar()
+        await b.fechar()
+        return resultado
+
+    assert asyncio.run(cenario()) == {"10": {"carteira": 16}}
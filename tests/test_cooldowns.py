@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+from cogs._cooldowns import consumir, cooldown_persistente, restante
+
+
+def test_cooldown_ativo_ate_expirar():
+    economia = {}
+    assert consumir(economia, "trabalhar", 10, 60, agora=1000.0) == 0
+    assert consumir(economia, "trabalhar", 10, 60, agora=1030.0) == 30
+    assert restante(economia, "trabalhar", 10, 1030.0) == 30
+    assert consumir(economia, "trabalhar", 10, 60, agora=1060.0) == 0  # expirou: inicia de novo
+    assert restante(economia, "trabalhar", 10, 1061.0) == 59
+
+
+def test_cooldown_por_usuario_e_por_comando():
+    economia = {}
+    consumir(economia, "trabalhar", 10, 60, agora=0.0)
+    assert consumir(economia, "trabalhar", 20, 60, agora=1.0) == 0
+    assert consumir(economia, "roubar", 10, 60, agora=1.0) == 0
+    assert restante(economia, "trabalhar", 30, 1.0) == 0
+    assert restante({}, "trabalhar", 10, 1.0) == 0
+
+
+def test_entradas_vencidas_saem_da_tabela():
+    economia = {}
+    for user_id in range(5):
+        consumir(economia, "trabalhar", user_id, 10 + user_id, agora=0.0)
+    consumir(economia, "trabalhar", 99, 10, agora=12.0)
+    tabela = economia["cooldowns"]["trabalhar"]
+    assert set(tabela["expira"]) == {"3", "4", "99"}
+    assert len(tabela["heap"]) == 3
+
+
+def test_entrada_renovada_nao_e_removida_pela_antiga():
+    economia = {}
+    consumir(economia, "trabalhar", 10, 10, agora=0.0)
+    consumir(economia, "trabalhar", 10, 10, agora=10.0)  # renovado: [10, "10"] fica no heap até ser varrido
+    consumir(economia, "trabalhar", 20, 10, agora=15.0)
+    assert restante(economia, "trabalhar", 10, 15.0) == 5
+
+
+def test_check_levanta_command_on_cooldown():
+    class DataManagerFalso:
+        def __init__(self):
+            self.economia = {}
+
+        async def consumir_cooldown(self, guild_id, comando, user_id, segundos):
+            return consumir(self.economia, comando, user_id, segundos, agora=0.0)
+
+    predicado = cooldown_persistente(60).predicate
+    ctx = SimpleNamespace(cog=SimpleNamespace(data_manager=DataManagerFalso()), guild=SimpleNamespace(id=1),
+                          command=SimpleNamespace(qualified_name="trabalhar"), author=SimpleNamespace(id=10))
+    assert asyncio.run(predicado(ctx)) is True
+    with pytest.raises(commands.CommandOnCooldown) as erro:
+        asyncio.run(predicado(ctx))
+    assert erro.value.retry_after == 60
@@ -0,0 +1,51 @@
+from cogs._extrato import MAX_LANCAMENTOS, RETENCAO_DIAS, anexar, compactar, lancamento, pagina
+
+
+def _lancamentos(user_id, quantidade, inicio=0):
+    return [(user_id, [inicio + i, "trabalho", "c", 100, 100 * (i + 1)]) for i in range(quantidade)]
+
+
+def test_paginas_do_mais_recente_para_o_mais_antigo():
+    extrato = {}
+    anexar(extrato, _lancamentos("10", 25))
+    primeira, total = pagina(extrato, 10, 1, 10)
+    assert total == 3
+    assert [entrada[0] for entrada in primeira] == list(range(24, 14, -1))
+    ultima, _ = pagina(extrato, 10, 3, 10)
+    assert [entrada[0] for entrada in ultima] == [4, 3, 2, 1, 0]
+
+
+def test_pagina_fora_do_intervalo():
+    extrato = {}
+    anexar(extrato, _lancamentos("10", 5))
+    assert pagina(extrato, 10, 2, 10) == ([], 1)
+    assert pagina(extrato, 10, 0, 10) == ([], 1)
+    assert pagina(extrato, 20, 1, 10) == ([], 1)
+
+
+def test_lista_aparada_so_depois_da_folga():
+    extrato = {}
+    limite = MAX_LANCAMENTOS + MAX_LANCAMENTOS // 4
+    anexar(extrato, _lancamentos("10", limite))
+    assert len(extrato["10"]) == limite
+    anexar(extrato, _lancamentos("10", 1, inicio=limite))
+    assert len(extrato["10"]) == MAX_LANCAMENTOS
+    assert extrato["10"][-1][0] == limite and extrato["10"][0][0] == limite + 1 - MAX_LANCAMENTOS
+
+
+def test_compactar_aplica_retencao_e_remove_usuarios_vazios():
+    agora = 100 * 86400
+    antigo = agora - RETENCAO_DIAS * 86400 - 1
+    extrato = {"_meta": {"versao_schema": 1}}
+    anexar(extrato, _lancamentos("10", 3, inicio=antigo) + _lancamentos("10", 2, inicio=agora))
+    anexar(extrato, _lancamentos("20", 2, inicio=antigo - 10))
+    anexar(extrato, _lancamentos("30", MAX_LANCAMENTOS + 10, inicio=agora))
+    assert compactar(extrato, agora=agora) == 1 + 2 + 10  # dos três antigos de "10", só o primeiro passou do limite
+    assert [entrada[0] for entrada in extrato["10"]] == [antigo + 1, antigo + 2, agora, agora + 1]
+    assert "20" not in extrato and "_meta" in extrato
+    assert len(extrato["30"]) == MAX_LANCAMENTOS
+
+
+def test_lancamento_usa_o_codigo_da_conta():
+    entrada = lancamento("deposito", "banco", 150.0, 300)
+    assert entrada[1:] == ["deposito", "b", 150, 300]
@@ -0,0 +1,74 @@
+import asyncio
+import copy
+import json
+
+import pytest
+
+from cogs._armazenamento import ArmazenamentoParticionado
+from cogs._migracoes import Migracoes
+from cogs.economia import MIGRACOES_ECONOMIA
+
+ECONOMIA_ANTIGA = {
+    "10": {"carteira": 12.5, "banco": 100, "acoes": {"DMS": 3}, "cc_stats": {"jogos": 1, "total_apostado": 2.25}},
+    "cofre_impostos": 7.1,
+    "impostos_diarios": {"jogos": 1.5, "mercado": 0},
+}
+
+
+def test_registro_fora_de_ordem():
+    migracoes = Migracoes("teste")
+    with pytest.raises(ValueError):
+        migracoes.registrar(2)(lambda dados: None)
+
+
+def test_aplicar_so_as_pendentes():
+    migracoes, chamadas = Migracoes("teste"), []
+    migracoes.registrar(1)(lambda dados: chamadas.append(1))
+    dados = {}
+    assert migracoes.aplicar(dados) is True
+    assert migracoes.aplicar(dados) is False
+    migracoes.registrar(2)(lambda dados: chamadas.append(2))
+    assert migracoes.aplicar(dados) is True
+    assert chamadas == [1, 2]
+    assert dados["_meta"]["versao_schema"] == 2
+
+
+def test_economia_migrada_uma_unica_vez():
+    dados = copy.deepcopy(ECONOMIA_ANTIGA)
+    assert MIGRACOES_ECONOMIA.aplicar(dados) is True
+    migrada = copy.deepcopy(dados)
+    assert MIGRACOES_ECONOMIA.aplicar(dados) is False
+    assert dados == migrada
+
+    conta = dados["10"]
+    assert (conta["carteira"], conta["banco"]) == (1250, 10000)
+    assert conta["acoes"] == {"DMS": {"quantidade": 3, "preco_medio_compra": 0}}
+    assert conta["cc_stats"]["total_apostado"] == 225 and conta["cc_stats"]["vitorias"] == 0
+    assert dados["cofre_impostos"] == 710 and dados["impostos_diarios"]["jogos"] == 150
+
+
+def test_migracoes_repetidas_sobre_dados_ja_migrados():
+    # Cada passo, reaplicado sobre o próprio resultado (ex: versão perdida), não muda os dados de novo
+    dados = copy.deepcopy(ECONOMIA_ANTIGA)
+    MIGRACOES_ECONOMIA.aplicar(dados)
+    migrada = copy.deepcopy(dados)
+    dados["_meta"]["versao_schema"] = 0
+    MIGRACOES_ECONOMIA.aplicar(dados)
+    assert dados == migrada
+
+
+def test_particao_recarregada_nao_e_migrada_de_novo(tmp_path):
+    (tmp_path / "1").mkdir()
+    (tmp_path / "1" / "economia.json").write_text(json.dumps(ECONOMIA_ANTIGA), encoding="utf-8")
+
+    async def carregar():
+        armazenamento = ArmazenamentoParticionado(tmp_path, "economia.json", ao_carregar=MIGRACOES_ECONOMIA.aplicar)
+        particao = await armazenamento.particao(1)
+        sujo = particao.sujo
+        await armazenamento.fechar()
+        return sujo, json.loads((tmp_path / "1" / "economia.json").read_text(encoding="utf-8"))
+
+    primeira_sujo, primeira = asyncio.run(carregar())
+    segunda_sujo, segunda = asyncio.run(carregar())
+    assert (primeira_sujo, segunda_sujo) == (True, False)
+    assert primeira == segunda
@@ -0,0 +1,86 @@
+from cogs._ordens import TIPOS_ORDEM, alguma_dispara, cancelar, disparadas, do_usuario, inserir
+
+
+def _livro():
+    return {"seq": 0, "por_id": {}, "livros": {}}
+
+
+def _ordem(ordens, tipo, gatilho, simbolo="DMS", usuario="10"):
+    lado, heap = TIPOS_ORDEM[tipo]
+    return inserir(ordens, {"simbolo": simbolo, "tipo": tipo, "lado": lado, "heap": heap, "gatilho": gatilho, "usuario": usuario})
+
+
+def _ids(ordens_disparadas):
+    return [ordem["id"] for ordem in ordens_disparadas]
+
+
+def test_compra_limitada_dispara_quando_o_preco_cai_ate_o_gatilho():
+    ordens = _livro()
+    barata, cara = _ordem(ordens, "compra", 900), _ordem(ordens, "compra", 1000)
+    assert disparadas(ordens, "DMS", 1001) == []
+    assert _ids(disparadas(ordens, "DMS", 950)) == [cara]
+    assert _ids(disparadas(ordens, "DMS", 100)) == [barata]
+    assert ordens["por_id"] == {}
+
+
+def test_venda_limitada_dispara_quando_o_preco_sobe_ate_o_gatilho():
+    ordens = _livro()
+    alta, baixa = _ordem(ordens, "venda", 1200), _ordem(ordens, "venda", 1100)
+    assert disparadas(ordens, "DMS", 1099) == []
+    assert _ids(disparadas(ordens, "DMS", 5000)) == [baixa, alta]
+
+
+def test_stop_fica_no_mesmo_heap_da_compra():
+    ordens = _livro()
+    stop, venda = _ordem(ordens, "stop", 800), _ordem(ordens, "venda", 1500)
+    assert _ids(disparadas(ordens, "DMS", 800)) == [stop]
+    assert _ids(ordens["por_id"].values()) == [venda]
+    assert disparadas(ordens, "OUTRA", 1) == []
+
+
+def test_empates_saem_na_ordem_de_criacao():
+    ordens = _livro()
+    ids = [_ordem(ordens, "compra", 1000) for _ in range(5)]
+    assert _ids(disparadas(ordens, "DMS", 1000)) == ids
+
+
+def test_cancelamento_preguicoso_e_reconstrucao_do_heap():
+    ordens = _livro()
+    ids = [_ordem(ordens, "compra", 1000 + i) for i in range(4)]
+    livro = ordens["livros"]["DMS"]
+    assert cancelar(ordens, ids[3])["id"] == ids[3]
+    assert len(livro["abaixo"]) == 4 and livro["canceladas"]["abaixo"] == 1  # entrada fica no heap
+    assert cancelar(ordens, ids[3]) is None
+    cancelar(ordens, ids[2])
+    cancelar(ordens, ids[1])  # mais da metade é lixo: reconstrói
+    assert [entrada[1] for entrada in livro["abaixo"]] == [ids[0]] and livro["canceladas"]["abaixo"] == 0
+    assert _ids(disparadas(ordens, "DMS", 0)) == [ids[0]]
+
+
+def test_cancelada_no_topo_e_descartada_ao_disparar():
+    ordens = _livro()
+    primeira, segunda, terceira = (_ordem(ordens, "compra", gatilho) for gatilho in (1000, 900, 800))
+    cancelar(ordens, primeira)
+    assert _ids(disparadas(ordens, "DMS", 850)) == [segunda]
+    assert ordens["livros"]["DMS"]["canceladas"]["abaixo"] == 0
+    assert _ids(ordens["por_id"].values()) == [terceira]
+
+
+def test_alguma_dispara_olha_a_serie_inteira_sem_alterar_o_livro():
+    ordens = _livro()
+    _ordem(ordens, "compra", 900)
+    _ordem(ordens, "venda", 1100, simbolo="ABC")
+    assert not alguma_dispara(ordens, {"DMS": [1000, 950], "ABC": [1000, 1050], "XYZ": [1]})
+    assert alguma_dispara(ordens, {"DMS": [1000, 899, 1000]})
+    assert alguma_dispara(ordens, {"ABC": [1000, 1100]})
+    assert not alguma_dispara(ordens, {"DMS": []})
+    assert len(ordens["por_id"]) == 2
+
+
+def test_ordens_do_usuario():
+    ordens = _livro()
+    minha = _ordem(ordens, "compra", 900, usuario="10")
+    _ordem(ordens, "venda", 1100, usuario="20")
+    outra_minha = _ordem(ordens, "stop", 500, simbolo="ABC", usuario="10")
+    assert _ids(do_usuario(ordens, 10)) == [minha, outra_minha]
+    assert do_usuario(None, 10) == [] and do_usuario(ordens, 30) == []
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from cogs._contas import Conta
+from cogs._serializacao import MAGICO_MSGPACK, carregar, carregar_arquivo, msgpack, serializar
+
+DADOS = {
+    "10": {"carteira": 123, "banco": -5, "acoes": {"DMS": {"quantidade": 2, "preco_medio_compra": 2993}},
+           "cc_stats": {"jogos": 1, "vitorias": 0, "total_apostado": 10, "lucro_total": -10}},
+    "_meta": {"versao_schema": 3, "moeda": "centavos"},
+    "impostos_diarios": {"jogos": 0, "mercado": 0},
+    "nome": "Ação com acentuação ✓",
+    "lista": [1, 2, [3]],
+}
+
+FORMATOS = ["json", "indexado"] + (["msgpack"] if msgpack is not None else [])
+
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_ida_e_volta(formato):
+    assert carregar(serializar(DADOS, formato)) == DADOS
+
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_contas_compactas_gravadas_como_dicts(formato):
+    dados = {"10": Conta.de_dict(DADOS["10"])}
+    assert carregar(serializar(dados, formato)) == {"10": DADOS["10"]}
+
+
+def test_json_com_inteiro_maior_que_64_bits():
+    # O orjson recusa, e a gravação passa para o json da biblioteca padrão
+    dados = dict(DADOS, grande=2**70)
+    assert carregar(serializar(dados, "json")) == dados
+
+
+def test_json_indentado_antigo(tmp_path):
+    arquivo = tmp_path / "economia.json"
+    arquivo.write_text(json.dumps(DADOS, indent=4), encoding="utf-8")
+    assert carregar_arquivo(arquivo) == DADOS
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack não instalado")
+def test_msgpack_identificado_pelo_cabecalho():
+    assert serializar(DADOS, "msgpack").startswith(MAGICO_MSGPACK)
+
+
+def test_arquivo_vazio(tmp_path):
+    arquivo = tmp_path / "economia.json"
+    arquivo.write_bytes(b"")
+    assert carregar_arquivo(arquivo) == {}
+
+
+@pytest.mark.parametrize("conteudo", [b"{\"10\": ", MAGICO_MSGPACK + b"\xc1"])
+def test_conteudo_corrompido(conteudo):
+    with pytest.raises(ValueError):
+        carregar(conteudo)
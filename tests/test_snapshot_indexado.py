@@ -0,0 +1,66 @@
+from cogs._serializacao import carregar, preparar, serializar
+from cogs._snapshot_indexado import SnapshotIndexado, codificar
+
+
+def _economia(n):
+    dados = {str(10**17 + i): {"carteira": i, "banco": 2 * i} for i in range(n)}
+    dados.update({"_meta": {"versao_schema": 3}, "cofre_impostos": 5, "ordens": {"seq": 0, "por_id": {}, "livros": {}}})
+    return dados
+
+
+def _abrir(dados):
+    snapshot = carregar(codificar(dados))
+    assert isinstance(snapshot, SnapshotIndexado)
+    return snapshot
+
+
+def test_abre_sem_decodificar_os_registros():
+    dados = _economia(100)
+    snapshot = _abrir(dados)
+    assert snapshot.pendentes() == 101  # os usuários e 'ordens' (um objeto): tudo menos '_meta' e o escalar
+    assert snapshot[str(10**17 + 42)] == {"carteira": 42, "banco": 84}
+    assert snapshot.pendentes() == 100
+    assert len(snapshot) == len(dados)
+    assert str(10**17 + 99) in snapshot and "inexistente" not in snapshot
+    assert snapshot == dados
+    assert snapshot.pendentes() == 0
+
+
+def test_regravacao_copia_os_registros_nao_lidos():
+    dados = _economia(50)
+    snapshot = _abrir(dados)
+    snapshot[str(10**17 + 3)]["carteira"] = -1          # alterado
+    del snapshot[str(10**17 + 4)]                       # removido sem ser lido
+    snapshot.pop(str(10**17 + 5))                       # removido depois de lido
+    snapshot["7"] = {"carteira": 7, "banco": 0}         # novo, no meio da ordem do índice
+    snapshot["ordens"] = "agora um escalar"             # deixa o índice e vai para o bloco comum
+    assert snapshot.pendentes() == 47  # 51 menos os três usuários e "ordens"
+
+    esperado = dict(dados)
+    esperado[str(10**17 + 3)] = {"carteira": -1, "banco": 6}
+    del esperado[str(10**17 + 4)], esperado[str(10**17 + 5)]
+    esperado["7"] = {"carteira": 7, "banco": 0}
+    esperado["ordens"] = "agora um escalar"
+    regravado = _abrir(snapshot)
+    assert regravado == esperado
+    assert _abrir(regravado) == esperado  # e de novo, a partir de um arquivo já regravado
+
+
+def test_converter_aplicado_na_leitura():
+    snapshot = _abrir(_economia(3))
+    snapshot.converter = lambda chave, valor: ("convertido", valor["carteira"]) if chave.isdigit() else valor
+    assert snapshot[str(10**17 + 2)] == ("convertido", 2)
+
+
+def test_outros_formatos_gravam_o_snapshot_inteiro():
+    dados = _economia(20)
+    snapshot = _abrir(dados)
+    preparar(snapshot, "json")
+    assert snapshot.pendentes() == 0
+    assert carregar(serializar(snapshot, "json")) == dados
+
+
+def test_preparar_nao_le_o_arquivo_para_o_formato_indexado():
+    snapshot = _abrir(_economia(20))
+    preparar(snapshot, "indexado")
+    assert snapshot.pendentes() == 21